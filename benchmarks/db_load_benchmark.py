@@ -0,0 +1,190 @@
+"""
+Benchmark de charge : pile base de données synchrone contre asynchrone (DATABASE_ASYNC).
+
+Une base SQLite de test est créée et remplie une fois, puis copiée pour chaque
+mode afin que les deux mesures partent des mêmes données. Chaque mode tourne
+dans un sous-processus (la configuration est lue une seule fois par
+processus) : l'application est démarrée (lifespan) et interrogée en mémoire
+via httpx.ASGITransport, sans serveur HTTP ni réseau, par N clients
+simultanés qui enchaînent un mélange de requêtes :
+- GET /videos/catalog (page suivante via le curseur) ;
+- GET /videos/{id} ;
+- GET /videos/{id}/rating/summary ;
+- POST /progress/.
+
+Usage :
+    python -m benchmarks.db_load_benchmark [--videos 2000] [--concurrency 50] [--requests 4000]
+
+Le résultat (débit en requêtes/s, latences p50/p95/p99, erreurs) est affiché
+en JSON pour chaque mode. Le pilote aiosqlite doit être installé.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Racine du dépôt (contient main.py)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("sync", "async")
+
+
+def percentiles(values: list) -> dict:
+    """Latences p50, p95 et p99 (millisecondes) d'une série de mesures."""
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100)
+    return {"p50_ms": round(cuts[49], 2), "p95_ms": round(cuts[94], 2), "p99_ms": round(cuts[98], 2)}
+
+
+def seed_fixture(path: str, video_count: int):
+    """Crée la base SQLite de test : vidéos réparties en catégories, avec quelques avis."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from database import Base
+    from models import Review, Video
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with Session(engine) as db:
+        videos = []
+        for i in range(video_count):
+            videos.append(Video(
+                youtube_url=f"bench-{i}",
+                mentor_email=f"mentor{i % 20}@bench",
+                category=f"Catégorie {i % 10}",
+                title=f"Vidéo {i}",
+                description="",
+                publication_date=datetime(2024, 1, 1),
+                views=rng.randint(0, 100000),
+                likes=rng.randint(0, 1000),
+                order=i // 200 + 1,
+                stars=0,
+            ))
+        db.add_all(videos)
+        db.flush()
+        for video in videos[::5]:
+            stars = rng.randint(1, 5)
+            db.add(Review(video_id=video.id, mentee_email="seed@bench", stars=stars))
+            video.review_count, video.stars_sum, video.stars = 1, stars, float(stars)
+            setattr(video, f"stars_{stars}", 1)
+        db.commit()
+    engine.dispose()
+
+
+async def run_load(video_count: int, concurrency: int, total_requests: int) -> dict:
+    """Démarre l'application du processus courant et lui envoie la charge."""
+    import httpx
+
+    import main
+
+    latencies = {"catalog": [], "video": [], "rating": [], "progress": []}
+    errors = 0
+    remaining = total_requests
+
+    async def worker(client: httpx.AsyncClient, worker_id: int):
+        nonlocal errors, remaining
+        rng = random.Random(worker_id)
+        cursor = None
+        while remaining > 0:
+            remaining -= 1
+            video_id = rng.randint(1, video_count)
+            kind = rng.choice(tuple(latencies))
+            start = time.perf_counter()
+            if kind == "catalog":
+                response = await client.get("/videos/catalog", params={"limit": 20, **({"cursor": cursor} if cursor else {})})
+                if response.status_code == 200:
+                    cursor = response.json()["next_cursor"]
+            elif kind == "video":
+                response = await client.get(f"/videos/{video_id}")
+            elif kind == "rating":
+                response = await client.get(f"/videos/{video_id}/rating/summary")
+            else:
+                response = await client.post("/progress/", json={"video_id": video_id, "mentee_email": f"mentee{worker_id}@bench"})
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[worker(client, i) for i in range(concurrency)])
+            elapsed = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "requests": len(all_latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+        **percentiles(all_latencies),
+        "endpoints": {kind: {"requests": len(values), **percentiles(values)} for kind, values in latencies.items()},
+    }
+
+
+def run_mode(mode: str, fixture: str, args) -> dict:
+    """Lance le benchmark d'un mode dans un sous-processus, sur une copie de la base de test."""
+    database_path = os.path.join(os.path.dirname(fixture), f"{mode}.db")
+    shutil.copyfile(fixture, database_path)
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "DATABASE_ASYNC": "true" if mode == "async" else "false",
+        "YOUTUBE_API_KEY": os.environ.get("YOUTUBE_API_KEY", "benchmark"),
+        "PROGRESS_BUFFER_ENABLED": "false",
+        "STATS_REFRESH_ENABLED": "false",
+    }
+    env.pop("DATABASE_ASYNC_URL", None)
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.db_load_benchmark", "--worker",
+         "--videos", str(args.videos), "--concurrency", str(args.concurrency), "--requests", str(args.requests)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Le benchmark du mode {mode} a échoué :\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge : base de données synchrone contre asynchrone")
+    parser.add_argument("--videos", type=int, default=2000, help="Nombre de vidéos de la base de test")
+    parser.add_argument("--concurrency", type=int, default=50, help="Nombre de clients simultanés")
+    parser.add_argument("--requests", type=int, default=4000, help="Nombre total de requêtes par mode")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_load(args.videos, args.concurrency, args.requests))))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="elimu-bench-") as directory:
+        fixture = os.path.join(directory, "fixture.db")
+        seed_fixture(fixture, args.videos)
+        try:
+            results = {mode: run_mode(mode, fixture, args) for mode in MODES}
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+
+    print(json.dumps({
+        "benchmark": "db_load_sync_vs_async",
+        "videos": args.videos,
+        "concurrency": args.concurrency,
+        **results,
+        "async_speedup": round(results["async"]["throughput_rps"] / results["sync"]["throughput_rps"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Benchmark des endpoints des chemins chauds, à comparer d'un commit à l'autre.
+
+Une base SQLite de test est remplie avec des volumes configurables de vidéos,
+d'avis et de progressions, puis l'application est démarrée (lifespan) dans un
+sous-processus et interrogée en mémoire via httpx.ASGITransport. L'API
+YouTube est simulée (httpx.MockTransport) : aucun appel réseau.
+
+Chaque scénario est mesuré séparément, après quelques requêtes d'échauffement,
+par N clients simultanés :
+- catalog_first_page, catalog_walk (page suivante via le curseur), catalog_category ;
+- video_detail, rating, rating_summary, reviews_list, mentee_dashboard ;
+- track_progress, add_review, create_video (écritures, mesurées après les lectures).
+
+Usage :
+    python -m benchmarks.endpoint_benchmark [--videos 2000] [--reviews 10000] [--progress 50000]
+        [--requests 500] [--concurrency 10] [--scenarios catalog_walk,rating]
+        [--output resultats.json] [--compare reference.json] [--max-regression 0.2]
+
+Le résultat (latences p50/p95/p99, débit, erreurs par scénario, commit git,
+volumes) est affiché en JSON et, avec --output, écrit dans un fichier. Avec
+--compare, chaque scénario est comparé au fichier de référence : le code de
+sortie est non nul si un p95 dépasse celui de la référence de plus de
+--max-regression (20 % par défaut).
+
+La configuration de l'application est lue dans l'environnement (ex :
+RESPONSE_CACHE_ENABLED=false pour mesurer les lectures sans cache de réponses).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.db_load_benchmark import ROOT, percentiles
+
+CATEGORIES = 10
+MENTORS = 20
+
+# Scénarios, dans l'ordre d'exécution : les lectures avant les écritures
+SCENARIOS = (
+    "catalog_first_page",
+    "catalog_walk",
+    "catalog_category",
+    "video_detail",
+    "rating",
+    "rating_summary",
+    "reviews_list",
+    "mentee_dashboard",
+    "track_progress",
+    "add_review",
+    "create_video",
+)
+
+
+def seed_database(path: str, video_count: int, review_count: int, progress_count: int):
+    """
+    Crée la base SQLite de test. Les avis et progressions sont répartis sur les
+    vidéos (un seul par couple vidéo/mentee) ; les agrégats d'avis sont ensuite
+    recalculés par crud.reconcile_rating_aggregates.
+    """
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+
+    import crud
+    from database import Base
+    from models import Progress, Review, Video
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with Session(engine) as db:
+        db.execute(insert(Video), [{
+            "youtube_url": f"bench-{i}",
+            "mentor_email": f"mentor{i % MENTORS}@bench",
+            "category": f"Catégorie {i % CATEGORIES}",
+            "title": f"Vidéo {i}",
+            "description": "",
+            "publication_date": datetime(2024, 1, 1),
+            "views": rng.randint(0, 100000),
+            "likes": rng.randint(0, 1000),
+            "order": i // (MENTORS * CATEGORIES) + 1,
+            "stars": 0,
+        } for i in range(video_count)])
+        db.execute(insert(Review), [{
+            "video_id": i % video_count + 1,
+            "mentee_email": f"mentee{i // video_count}@bench",
+            "stars": rng.randint(1, 5),
+        } for i in range(review_count)])
+        db.execute(insert(Progress), [{
+            "video_id": i % video_count + 1,
+            "mentee_email": f"mentee{i // video_count}@bench",
+            "watched": rng.randint(1, 20),
+        } for i in range(progress_count)])
+        db.commit()
+        crud.reconcile_rating_aggregates(db)
+    engine.dispose()
+
+
+def stub_youtube_client():
+    """Client YouTube dont les requêtes sont servies localement (httpx.MockTransport)."""
+    import httpx
+
+    from youtube_async import AsyncYouTubeClient
+
+    def fake_videos_endpoint(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["id"].split(",")
+        return httpx.Response(200, json={"items": [{
+            "id": video_id,
+            "snippet": {"title": f"Vidéo {video_id}", "description": "", "publishedAt": "2024-01-01T00:00:00Z"},
+            "statistics": {"viewCount": "10", "likeCount": "1"},
+        } for video_id in ids]})
+
+    client = AsyncYouTubeClient(api_key="benchmark", cache=False, max_retries=0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(fake_videos_endpoint))
+    return client
+
+
+async def run_scenarios(args) -> dict:
+    """Démarre l'application du processus courant et mesure chaque scénario."""
+    import httpx
+
+    import main
+    import youtube_async
+
+    # Remplace le client global avant le démarrage (start_async_client le réutilise)
+    youtube_async._client = stub_youtube_client()
+    counter = iter(range(10 ** 9))
+
+    def request_for(scenario: str, rng: random.Random, state: dict):
+        video_id = rng.randint(1, args.videos)
+        if scenario == "catalog_first_page":
+            return "GET", "/videos/catalog", {"params": {"limit": 20}}
+        if scenario == "catalog_walk":
+            return "GET", "/videos/catalog", {"params": {"limit": 20, **({"cursor": state["cursor"]} if state.get("cursor") else {})}}
+        if scenario == "catalog_category":
+            return "GET", "/videos/catalog", {"params": {"limit": 20, "category": f"Catégorie {video_id % CATEGORIES}"}}
+        if scenario == "video_detail":
+            return "GET", f"/videos/{video_id}", {}
+        if scenario == "rating":
+            return "GET", f"/videos/{video_id}/rating", {}
+        if scenario == "rating_summary":
+            return "GET", f"/videos/{video_id}/rating/summary", {}
+        if scenario == "reviews_list":
+            return "GET", f"/reviews/{video_id}", {}
+        if scenario == "mentee_dashboard":
+            return "GET", f"/users/mentee{rng.randint(0, max(args.progress // args.videos - 1, 0))}@bench/progress", {}
+        if scenario == "track_progress":
+            return "POST", "/progress/", {"json": {"video_id": video_id, "mentee_email": f"bench{rng.randint(0, 99)}@bench"}}
+        if scenario == "add_review":
+            return "POST", "/reviews/", {"json": {"video_id": video_id, "mentee_email": f"reviewer{next(counter)}@bench", "stars": rng.randint(1, 5)}}
+        return "POST", "/videos/", {"json": {"youtube_url": f"new-{next(counter)}", "mentor_email": "mentor0@bench", "category": "Catégorie 0"}}
+
+    async def measure(client: httpx.AsyncClient, scenario: str, total: int) -> dict:
+        latencies = []
+        errors = 0
+        remaining = total
+
+        async def worker(worker_id: int):
+            nonlocal errors, remaining
+            rng = random.Random(f"{scenario}-{worker_id}")
+            state = {}
+            while remaining > 0:
+                remaining -= 1
+                method, url, kwargs = request_for(scenario, rng, state)
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+                elif scenario == "catalog_walk":
+                    state["cursor"] = response.json()["next_cursor"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            **percentiles(latencies),
+        }
+
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in args.scenarios:
+                await measure(client, scenario, args.warmup)
+                results[scenario] = await measure(client, scenario, args.requests)
+    return results
+
+
+def git_revision() -> dict:
+    """Commit git courant (et présence de modifications non validées), si disponible."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> dict:
+    """
+    Compare chaque scénario à la référence : rapports des p95 et des débits,
+    et liste des scénarios dont le p95 dépasse la référence de plus de max_regression.
+    """
+    scenarios = {}
+    regressions = []
+    for scenario, current in results.items():
+        reference = baseline.get("scenarios", {}).get(scenario)
+        if not reference or not reference.get("p95_ms") or not current.get("p95_ms"):
+            continue
+        p95_ratio = round(current["p95_ms"] / reference["p95_ms"], 3)
+        scenarios[scenario] = {
+            "p95_ms": current["p95_ms"],
+            "baseline_p95_ms": reference["p95_ms"],
+            "p95_ratio": p95_ratio,
+            "throughput_ratio": round(current["throughput_rps"] / reference["throughput_rps"], 3),
+        }
+        if p95_ratio > 1 + max_regression:
+            regressions.append(scenario)
+    return {"baseline_commit": baseline.get("git", {}).get("commit"), "scenarios": scenarios, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des endpoints des chemins chauds")
+    parser.add_argument("--videos", type=int, default=2000, help="Nombre de vidéos de la base de test")
+    parser.add_argument("--reviews", type=int, default=10000, help="Nombre d'avis de la base de test")
+    parser.add_argument("--progress", type=int, default=50000, help="Nombre de progressions de la base de test")
+    parser.add_argument("--requests", type=int, default=500, help="Nombre de requêtes mesurées par scénario")
+    parser.add_argument("--warmup", type=int, default=20, help="Nombre de requêtes d'échauffement par scénario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Nombre de clients simultanés")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scénarios à mesurer, séparés par des virgules")
+    parser.add_argument("--output", help="Fichier JSON où écrire le résultat")
+    parser.add_argument("--compare", help="Fichier JSON de référence (résultat d'un précédent --output)")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Hausse maximale tolérée du p95 (0.2 = 20 %%)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénario(s) inconnu(s) : {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_scenarios(args))))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="elimu-bench-") as directory:
+        database_path = os.path.join(directory, "bench.db")
+        seed_database(database_path, args.videos, args.reviews, args.progress)
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{database_path}",
+            "YOUTUBE_API_KEY": "benchmark",
+            "DATABASE_ASYNC": os.environ.get("DATABASE_ASYNC", "false"),
+            "PROGRESS_BUFFER_ENABLED": os.environ.get("PROGRESS_BUFFER_ENABLED", "false"),
+            "STATS_REFRESH_ENABLED": "false",
+        }
+        env.pop("DATABASE_ASYNC_URL", None)
+        worker = subprocess.run(
+            [sys.executable, "-m", "benchmarks.endpoint_benchmark", "--worker", *sys.argv[1:]],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+    if worker.returncode != 0:
+        print(f"Le benchmark a échoué :\n{worker.stderr}", file=sys.stderr)
+        sys.exit(1)
+
+    report = {
+        "benchmark": "endpoints",
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "date": datetime.utcnow().isoformat(timespec="seconds"),
+        "volumes": {"videos": args.videos, "reviews": args.reviews, "progress": args.progress},
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "database_async": env["DATABASE_ASYNC"],
+        "scenarios": json.loads(worker.stdout.strip().splitlines()[-1]),
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            report["comparison"] = compare(report["scenarios"], json.load(baseline), args.max_regression)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    if report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
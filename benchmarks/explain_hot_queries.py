@@ -0,0 +1,144 @@
+"""
+Vérifie par EXPLAIN que les requêtes fréquentes utilisent un index.
+
+Les fonctions CRUD des chemins chauds (catalogue, création de vidéo, suivi de
+progression, réordonnancement, avis, note moyenne, tableau de bord, pages
+de progressions et d'avis, export incrémental, recherche, classements) sont exécutées sur une base de
+test ; chaque requête SELECT/UPDATE réellement émise est capturée puis passée
+à EXPLAIN.
+Le script échoue si l'une d'elles parcourt une table entière :
+- SQLite : ligne de plan "SCAN <table>" sans index ;
+- MySQL : type d'accès "ALL".
+
+Usage :
+    python -m benchmarks.explain_hot_queries [--database-url sqlite://]
+
+Par défaut, une base SQLite en mémoire est créée à partir des modèles.
+Avec une URL MySQL, la base doit exister et être à jour des migrations ;
+elle est utilisée en lecture/écriture dans une transaction annulée à la fin.
+"""
+import argparse
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+import crud
+from database import Base
+from models import Video
+from schemas import ReviewCreate
+
+# Données YouTube factices utilisées pour créer les vidéos de test
+FAKE_VIDEO_DATA = {
+    "title": "Vidéo de test",
+    "description": "",
+    "publication_date": "2024-01-01T00:00:00Z",
+    "views": 0,
+    "likes": 0,
+}
+
+
+def run_hot_paths(db: Session):
+    """Exécute les fonctions CRUD des chemins chauds."""
+    for i in range(3):
+        crud._insert_video(db, {**FAKE_VIDEO_DATA, "video_id": f"explain-{i}"}, "mentor@explain", "Flutter")
+    video = db.query(Video).filter(Video.youtube_url == "explain-0").one()
+
+    _, cursor = crud.list_videos_page(db, 2)
+    crud.list_videos_page(db, 2, cursor=cursor)
+    track, _ = crud.list_videos_page(db, 3, mentor_email="mentor@explain")
+    crud.list_videos_page(db, 2, category="Flutter")
+    crud.reorder_videos(db, "mentor@explain", "Flutter", [v.id for v in reversed(track)])
+
+    crud.track_progress(db, video.id, "mentee@explain")
+    crud.add_review(db, ReviewCreate(video_id=video.id, mentee_email="mentee@explain", stars=4))
+    crud.get_reviews_for_video(db, video.id)
+    crud.get_average_rating(db, video.id)
+    crud.get_rating_summary(db, video.id)
+    crud.get_mentee_dashboard(db, "mentee@explain", category="Flutter")
+    crud.get_video_fields(db, video.id)
+    crud.get_video_progress_page(db, video.id, 20, cursor="0")
+    crud.get_video_reviews_page(db, video.id, 20, cursor="0")
+    for table in crud.EXPORT_TABLES:
+        db.execute(crud.export_statement(table, updated_since=datetime(2024, 1, 1), limit=1000)).all()
+        db.execute(crud.export_statement(table, datetime(2024, 1, 1), (datetime(2024, 6, 1), 1), 1000)).all()
+        db.execute(crud.export_statement(table, after=(1,), limit=1000)).all()
+    _, cursor = crud.search_videos(db, "vidéo test", 2, category="Flutter")
+    crud.search_videos(db, "vidéo", 2, cursor=cursor, mentor_email="mentor@explain")
+    crud.get_leaderboard(db, "trending", 10)
+    crud.get_leaderboard(db, "top-rated", 10, category="Flutter")
+
+
+def full_scans(connection, statement: str, parameters) -> list:
+    """
+    Renvoie les lignes du plan d'exécution qui correspondent à un parcours complet de table.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        details = [row[-1] for row in plan]
+        # Table FTS5 interrogée par MATCH ("VIRTUAL TABLE INDEX 0:M...") : l'index plein texte est utilisé
+        return [
+            d for d in details
+            if d.startswith("SCAN ") and " USING " not in d and "CONSTANT ROW" not in d
+            and not re.search(r"VIRTUAL TABLE INDEX \d+:\S*M", d)
+        ]
+    if dialect == "mysql":
+        result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        rows = [dict(zip(result.keys(), row)) for row in result.fetchall()]
+        return [f"{row['table']} (type=ALL)" for row in rows if row.get("type") == "ALL"]
+    raise NotImplementedError(f"EXPLAIN non supporté pour le dialecte {dialect}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie que les requêtes fréquentes utilisent un index")
+    parser.add_argument("--database-url", default="sqlite://", help="URL de la base à analyser")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE")) and not statement.lstrip().upper().startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    # Les commit() des fonctions CRUD deviennent des points de sauvegarde : tout est annulé à la fin
+    db = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        run_hot_paths(db)
+        event.remove(engine, "before_cursor_execute", capture)
+
+        failures = []
+        seen = set()
+        for statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            scans = full_scans(connection, statement, parameters)
+            status = "FULL SCAN" if scans else "ok"
+            print(f"[{status}] {' '.join(statement.split())[:140]}")
+            if scans:
+                failures.append((statement, scans))
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    if failures:
+        print(f"\n{len(failures)} requête(s) fréquente(s) sans index :", file=sys.stderr)
+        for statement, scans in failures:
+            print(f"- {' '.join(statement.split())}\n  -> {', '.join(scans)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\n{len(seen)} requête(s) vérifiée(s), aucun parcours complet de table.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark du temps de démarrage : mesure `import main` dans un processus neuf.
+
+Chaque mesure est faite dans un sous-processus Python où :
+- les variables d'environnement DATABASE_URL et YOUTUBE_API_KEY sont absentes ;
+- toute connexion réseau lève une exception (socket.connect bloqué).
+L'import doit donc réussir sans configuration ni réseau, et rester sous le budget.
+
+Usage :
+    python -m benchmarks.startup_benchmark [--runs 5] [--budget-ms 1500]
+
+Code de sortie non nul si l'import échoue, tente une connexion réseau
+ou si la médiane dépasse le budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Racine du dépôt (contient main.py)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Script exécuté dans le sous-processus : bloque le réseau puis chronomètre l'import
+PROBE = """
+import socket, time
+
+def _no_network(*args, **kwargs):
+    raise RuntimeError("Connexion réseau tentée pendant l'import")
+
+socket.socket.connect = _no_network
+socket.socket.connect_ex = _no_network
+socket.create_connection = _no_network
+
+start = time.perf_counter()
+import main
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure_import_ms() -> float:
+    """Lance un interpréteur neuf et renvoie la durée de `import main` en millisecondes."""
+    env = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "YOUTUBE_API_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"`import main` a échoué :\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import de l'application")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de mesures")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Budget (médiane) en millisecondes")
+    args = parser.parse_args()
+
+    try:
+        timings = [measure_import_ms() for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    median = statistics.median(timings)
+    print(json.dumps({
+        "benchmark": "startup_import_main",
+        "runs": args.runs,
+        "median_ms": round(median, 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "budget_ms": args.budget_ms,
+    }))
+    if median > args.budget_ms:
+        print(f"Import trop lent : {median:.1f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Import en masse d'utilisateurs et d'historiques de progression depuis un fichier CSV ou NDJSON.
+
+Utilisé par POST /users/import, POST /progress/import et les commandes
+`python manage.py import-users` / `import-progress` :
+- les lignes sont lues au fil de l'eau (fichier, pour manage.py) et validées
+  par lots de IMPORT_CHUNK_SIZE (schémas UserCreate et ProgressImport) ; par
+  HTTP, le corps est décodé au fur et à mesure de sa réception mais conservé
+  en mémoire pendant l'import : il est limité à IMPORT_MAX_BODY_BYTES octets
+  (au-delà : erreur 413) ;
+- les doublons du fichier sont écartés en mémoire (même email ; même couple
+  vidéo/mentee, dont on garde le plus grand `watched`) ;
+- chaque lot est écrit par un seul INSERT multi-lignes (utilisateurs) ou un
+  seul upsert (progressions, avec l'incrément des compteurs d'engagement des
+  vidéos concernées), dans sa propre transaction ;
+- une ligne refusée est signalée dans "errors" avec son numéro, sans
+  interrompre l'import ; un lot refusé par la base n'annule pas les précédents.
+  Seules les IMPORT_MAX_ERRORS premières erreurs sont renvoyées ; "error_count"
+  donne leur nombre total.
+"""
+import codecs
+import csv
+import io
+import json
+from functools import partial
+from itertools import islice
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from crud import progress_import_statement, write_progress_batch
+from models import User, Video
+from response_cache import invalidate_video_progress
+from schemas import ProgressImport, UserCreate
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+async def read_request_lines(request: Request, max_bytes: int = None) -> io.StringIO:
+    """
+    Lit le corps d'une requête d'import (UTF-8, BOM éventuel ignoré), décodé au
+    fur et à mesure de sa réception, et le renvoie ligne à ligne.
+
+    Raises:
+        HTTPException: Si le corps dépasse `max_bytes` (IMPORT_MAX_BODY_BYTES, erreur 413)
+            ou n'est pas du texte UTF-8 (erreur 400).
+    """
+    max_bytes = max_bytes or get_settings().IMPORT_MAX_BODY_BYTES
+    too_large = HTTPException(status_code=413, detail=f"Fichier trop volumineux (au plus {max_bytes} octets)")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise too_large
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    text = io.StringIO(newline="")
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise too_large
+            text.write(decoder.decode(chunk))
+        text.write(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le fichier doit être encodé en UTF-8")
+    text.seek(0)
+    return text
+
+
+class ImportErrors:
+    """
+    Lignes refusées d'un import : toutes sont comptées, seules les `max_errors`
+    premières (par numéro de ligne) sont conservées.
+    """
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.count = 0
+        self._errors = []
+
+    def append(self, error: dict):
+        self.count += 1
+        self._errors.append(error)
+        # Les lots sont lus dans l'ordre du fichier : trier puis tronquer garde les premières
+        if len(self._errors) > 2 * self.max_errors:
+            self._truncate()
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
+
+    def _truncate(self):
+        self._errors.sort(key=lambda error: error["line"])
+        del self._errors[self.max_errors:]
+
+    def first(self) -> list:
+        """Les `max_errors` premières erreurs, triées par numéro de ligne."""
+        self._truncate()
+        return self._errors
+
+
+def read_records(lines, import_format: str):
+    """
+    Lit les enregistrements d'un fichier CSV (avec ligne d'en-tête) ou NDJSON.
+
+    Args:
+        lines: Itérable des lignes du fichier (fichier ouvert, io.StringIO...).
+        import_format (str): "csv" ou "ndjson".
+
+    Yields:
+        Tuples (numéro de ligne, enregistrement ou None, erreur ou None).
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Une cellule vide prend la valeur par défaut du schéma
+            yield reader.line_num, {key: value for key, value in record.items() if value not in ("", None)}, None
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "JSON invalide"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Un objet JSON est attendu"
+        else:
+            yield line_number, record, None
+
+
+def _chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))} : {e['msg']}" for e in error.errors())
+
+
+def _validated(chunk: list, schema, errors: ImportErrors):
+    """Valide les enregistrements d'un lot ; renvoie les couples (numéro de ligne, données)."""
+    valid = []
+    for line, record, error in chunk:
+        if error is None:
+            try:
+                valid.append((line, schema(**record).dict()))
+                continue
+            except ValidationError as e:
+                error = _validation_detail(e)
+        errors.append({"line": line, "detail": error})
+    return valid
+
+
+def _write_chunk(db: Session, write, lines: list, errors: ImportErrors) -> bool:
+    """
+    Exécute l'écriture d'un lot (`write(db)`) dans sa propre transaction ; en
+    cas d'échec, signale chacune de ses lignes.
+    """
+    try:
+        write(db)
+        db.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        detail = f"Lot refusé par la base de données : {e.__class__.__name__}"
+        errors.extend({"line": line, "detail": detail} for line in lines)
+        return False
+
+
+def import_users(db: Session, lines, import_format: str, chunk_size: int = None) -> dict:
+    """
+    Importe des utilisateurs (champs de UserCreate) ; les emails déjà
+    enregistrés ou en double dans le fichier sont refusés.
+
+    Returns:
+        Dictionnaire {"imported": n, "errors": [{"line", "detail"}], "error_count": n}.
+    """
+    chunk_size = chunk_size or get_settings().IMPORT_CHUNK_SIZE
+    imported = 0
+    errors = ImportErrors(get_settings().IMPORT_MAX_ERRORS)
+    seen_emails = set()
+
+    for chunk in _chunks(read_records(lines, import_format), chunk_size):
+        rows = []
+        for line, user in _validated(chunk, UserCreate, errors):
+            if user["email"] in seen_emails:
+                errors.append({"line": line, "detail": "Email en double dans le fichier"})
+            else:
+                seen_emails.add(user["email"])
+                rows.append((line, user))
+        if not rows:
+            continue
+
+        existing = set(db.scalars(select(User.email).where(User.email.in_([user["email"] for _, user in rows]))))
+        errors.extend({"line": line, "detail": "Email déjà enregistré"} for line, user in rows if user["email"] in existing)
+        rows = [(line, user) for line, user in rows if user["email"] not in existing]
+        users = [user for _, user in rows]
+        if users and _write_chunk(db, lambda db: db.execute(insert(User).values(users)), [line for line, _ in rows], errors):
+            imported += len(rows)
+
+    return {"imported": imported, "errors": errors.first(), "error_count": errors.count}
+
+
+def import_progress(db: Session, lines, import_format: str, chunk_size: int = None) -> dict:
+    """
+    Importe un historique de progression (video_id, mentee_email, watched).
+
+    Pour chaque couple (vidéo, mentee), la valeur conservée est la plus grande
+    entre celle en base et celle du fichier (crud.progress_import_statement) :
+    réimporter un fichier est sans effet. Les lignes d'une vidéo inexistante
+    sont refusées.
+
+    Returns:
+        Dictionnaire {"imported": n, "errors": [{"line", "detail"}], "error_count": n}.
+    """
+    chunk_size = chunk_size or get_settings().IMPORT_CHUNK_SIZE
+    imported = 0
+    errors = ImportErrors(get_settings().IMPORT_MAX_ERRORS)
+
+    for chunk in _chunks(read_records(lines, import_format), chunk_size):
+        merged = {}  # (video_id, mentee_email) -> (lignes, données)
+        for line, progress in _validated(chunk, ProgressImport, errors):
+            key = (progress["video_id"], progress["mentee_email"])
+            if key in merged:
+                merged[key][0].append(line)
+                merged[key][1]["watched"] = max(merged[key][1]["watched"], progress["watched"])
+            else:
+                merged[key] = ([line], progress)
+        if not merged:
+            continue
+
+        video_ids = {video_id for video_id, _ in merged}
+        existing = set(db.scalars(select(Video.id).where(Video.id.in_(video_ids))))
+        for (video_id, _), (lines_of_key, _) in merged.items():
+            if video_id not in existing:
+                errors.extend({"line": line, "detail": "Vidéo non trouvée"} for line in lines_of_key)
+        rows = [progress for (video_id, _), (_, progress) in merged.items() if video_id in existing]
+        if not rows:
+            continue
+
+        row_lines = [line for (video_id, _), (lines_of_key, _) in merged.items() if video_id in existing for line in lines_of_key]
+        write = partial(
+            write_progress_batch, rows=rows, statement=progress_import_statement, merge=max, chunk_size=len(rows)
+        )
+        if _write_chunk(db, write, row_lines, errors):
+            imported += len(row_lines)
+            invalidate_video_progress(*{row["video_id"] for row in rows})
+
+    return {"imported": imported, "errors": errors.first(), "error_count": errors.count}
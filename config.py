@@ -1,16 +1,172 @@
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
-# Charge les variables d'environnement depuis le fichier .env
-load_dotenv()
 
-# URL de la base de données avec une valeur par défaut pour le développement local
-DATABASE_URL = os.getenv("DATABASE_URL")
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+# Pilote asynchrone utilisé pour chaque SGBD lorsque DATABASE_ASYNC_URL n'est pas fournie
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Convertit une URL SQLAlchemy synchrone en URL pour le pilote asynchrone du même SGBD.
+    """
+    scheme, separator, rest = database_url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Aucun pilote asynchrone connu pour {scheme} : définissez DATABASE_ASYNC_URL.")
+    return f"{ASYNC_DRIVERS[backend]}{separator}{rest}"
+
+
+class Settings:
+    """
+    Configuration de l'application, lue depuis les variables d'environnement.
+
+    Les paramètres sont résolus au premier appel de get_settings() et non à
+    l'import : importer l'application ne lit pas le fichier .env et n'échoue
+    pas si une variable obligatoire manque. Les variables obligatoires
+    (DATABASE_URL, YOUTUBE_API_KEY) ne sont vérifiées qu'à leur utilisation.
+    """
+
+    def __init__(self):
+        # Charge les variables d'environnement depuis le fichier .env
+        load_dotenv()
+
+        # URL de la base de données
+        self._database_url = os.getenv("DATABASE_URL")
+        # Clé API YouTube : essentielle pour les appels à l'API YouTube
+        self._youtube_api_key = os.getenv("YOUTUBE_API_KEY")
+
+        # Pool de connexions (MySQL/PostgreSQL), par processus : à dimensionner par worker uvicorn
+        # Nombre de connexions conservées ouvertes dans le pool
+        self.DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+        # Connexions supplémentaires autorisées au-delà de DATABASE_POOL_SIZE en cas de pic
+        self.DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "20"))
+        # Âge maximal (secondes) d'une connexion avant renouvellement (inférieur au wait_timeout MySQL)
+        self.DATABASE_POOL_RECYCLE_SECONDS = int(os.getenv("DATABASE_POOL_RECYCLE_SECONDS", "1800"))
+        # Vérifie qu'une connexion est vivante avant de la fournir (évite "MySQL server has gone away")
+        self.DATABASE_POOL_PRE_PING = _env_bool("DATABASE_POOL_PRE_PING", "true")
+        # Délai maximal (secondes) d'attente d'une connexion libre avant erreur
+        self.DATABASE_POOL_TIMEOUT_SECONDS = float(os.getenv("DATABASE_POOL_TIMEOUT_SECONDS", "30"))
+
+        # Pile base de données asynchrone (AsyncSession, endpoints `async def`) : désactivée par défaut
+        self.DATABASE_ASYNC = _env_bool("DATABASE_ASYNC")
+        # URL du moteur asynchrone ; déduite de DATABASE_URL si absente
+        # (ex : mysql+mysqlconnector:// -> mysql+aiomysql://, sqlite:// -> sqlite+aiosqlite://)
+        self._database_async_url = os.getenv("DATABASE_ASYNC_URL")
+
+        # Mode tampon (write-behind) du suivi de progression : désactivé par défaut.
+        # Les incréments sont regroupés en mémoire puis écrits en un seul upsert groupé.
+        self.PROGRESS_BUFFER_ENABLED = _env_bool("PROGRESS_BUFFER_ENABLED")
+        # Délai maximal (en millisecondes) pendant lequel un incrément reste en mémoire
+        self.PROGRESS_BUFFER_FLUSH_INTERVAL_MS = int(os.getenv("PROGRESS_BUFFER_FLUSH_INTERVAL_MS", "500"))
+        # Nombre d'incréments en attente qui déclenche une écriture immédiate
+        self.PROGRESS_BUFFER_MAX_EVENTS = int(os.getenv("PROGRESS_BUFFER_MAX_EVENTS", "1000"))
+        # Nombre maximal d'incréments en attente (base indisponible) avant refus en 503 ; vide : 2 x MAX_EVENTS
+        max_pending = os.getenv("PROGRESS_BUFFER_MAX_PENDING")
+        self.PROGRESS_BUFFER_MAX_PENDING = int(max_pending) if max_pending else None
+        # Part de la durée d'une vidéo à partir de laquelle un battement de lecture la marque comme terminée
+        self.PROGRESS_COMPLETION_RATIO = float(os.getenv("PROGRESS_COMPLETION_RATIO", "0.9"))
+
+        # Cache des métadonnées YouTube : "memory" (LRU en mémoire) ou "sqlite" (fichier local persistant)
+        self.YOUTUBE_CACHE_BACKEND = os.getenv("YOUTUBE_CACHE_BACKEND", "memory")
+        # Chemin du fichier de cache lorsque YOUTUBE_CACHE_BACKEND=sqlite
+        self.YOUTUBE_CACHE_PATH = os.getenv("YOUTUBE_CACHE_PATH", "youtube_cache.sqlite3")
+        # Nombre maximal d'entrées du cache (mémoire ou fichier SQLite)
+        self.YOUTUBE_CACHE_MAX_ENTRIES = int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", "1024"))
+        # Durée de vie (secondes) des métadonnées d'une vidéo trouvée
+        self.YOUTUBE_CACHE_TTL_SECONDS = int(os.getenv("YOUTUBE_CACHE_TTL_SECONDS", "86400"))
+        # Durée de vie (secondes) d'une vidéo introuvable (cache négatif)
+        self.YOUTUBE_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("YOUTUBE_CACHE_NEGATIVE_TTL_SECONDS", "3600"))
+
+        # Client YouTube asynchrone : nombre maximal de requêtes simultanées vers l'API
+        self.YOUTUBE_MAX_CONCURRENCY = int(os.getenv("YOUTUBE_MAX_CONCURRENCY", "10"))
+        # Nombre de nouvelles tentatives sur erreur 429/5xx ou erreur réseau
+        self.YOUTUBE_MAX_RETRIES = int(os.getenv("YOUTUBE_MAX_RETRIES", "3"))
+        # Délai de base (secondes) de l'attente exponentielle entre deux tentatives
+        self.YOUTUBE_RETRY_BACKOFF_SECONDS = float(os.getenv("YOUTUBE_RETRY_BACKOFF_SECONDS", "0.5"))
+
+        # Cache des réponses des endpoints de lecture (vidéos, avis, notes), invalidé à chaque écriture
+        self.RESPONSE_CACHE_ENABLED = _env_bool("RESPONSE_CACHE_ENABLED", "true")
+        # Nombre maximal de réponses en cache
+        self.RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+        # Durée de vie (secondes) d'une réponse en cache ; borne aussi le retard entre workers uvicorn
+        self.RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+        # max-age (secondes) de l'en-tête Cache-Control ; 0 : le client revalide à chaque fois (ETag)
+        self.RESPONSE_CACHE_MAX_AGE_SECONDS = int(os.getenv("RESPONSE_CACHE_MAX_AGE_SECONDS", "0"))
+
+        # Nombre de lignes lues par lot lors des exports en flux (GET /export/...)
+        self.EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+        # Recul (secondes) de X-Export-Started-At, supérieur à la durée maximale d'une transaction d'écriture
+        self.EXPORT_WATERMARK_LAG_SECONDS = int(os.getenv("EXPORT_WATERMARK_LAG_SECONDS", "60"))
+        # Jeton exigé par GET /export/... (Authorization: Bearer <jeton>) ; vide : export désactivé
+        self.EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN") or None
+
+        # Nombre de lignes validées et écrites par transaction lors des imports en masse
+        self.IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+        # Taille maximale (octets) du corps d'une requête d'import (POST /users/import, /progress/import)
+        self.IMPORT_MAX_BODY_BYTES = int(os.getenv("IMPORT_MAX_BODY_BYTES", str(50 * 1024 * 1024)))
+        # Nombre maximal d'erreurs détaillées renvoyées par un import (toutes sont comptées)
+        self.IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+        # Garde-fou de requêtes SQL par requête HTTP (debug/test) : "off", "warn" (journalise) ou "raise" (erreur)
+        self.QUERY_GUARD_MODE = os.getenv("QUERY_GUARD_MODE", "off").lower()
+        if self.QUERY_GUARD_MODE not in ("off", "warn", "raise"):
+            raise ValueError("QUERY_GUARD_MODE doit valoir off, warn ou raise.")
+        # Nombre maximal de requêtes SQL par requête HTTP
+        self.QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+        # Budgets propres à certaines routes : "gabarit=budget,...", ex : "/videos/{video_id}=2"
+        self.QUERY_BUDGET_ROUTES = os.getenv("QUERY_BUDGET_ROUTES", "")
+        # Nombre d'exécutions d'une même requête, dans une requête HTTP, signalé comme motif N+1
+        self.QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+        # Rafraîchissement en tâche de fond des statistiques (vues, likes) des vidéos
+        self.STATS_REFRESH_ENABLED = _env_bool("STATS_REFRESH_ENABLED")
+        # Délai (secondes) entre deux passes de rafraîchissement
+        self.STATS_REFRESH_INTERVAL_SECONDS = int(os.getenv("STATS_REFRESH_INTERVAL_SECONDS", "600"))
+        # Nombre maximal d'appels à l'API YouTube par passe (50 vidéos par appel)
+        self.STATS_REFRESH_MAX_CALLS_PER_RUN = int(os.getenv("STATS_REFRESH_MAX_CALLS_PER_RUN", "20"))
+        # Budget quotidien d'appels à l'API YouTube consacré au rafraîchissement
+        self.STATS_REFRESH_DAILY_QUOTA = int(os.getenv("STATS_REFRESH_DAILY_QUOTA", "2000"))
+
+        # Calcul en tâche de fond des classements de vidéos (GET /leaderboards/...)
+        self.LEADERBOARD_REFRESH_ENABLED = _env_bool("LEADERBOARD_REFRESH_ENABLED")
+        # Délai (secondes) entre deux calculs des classements
+        self.LEADERBOARD_REFRESH_INTERVAL_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_INTERVAL_SECONDS", "300"))
+        # Nombre de vidéos conservées par classement (et par catégorie)
+        self.LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "50"))
+        # Nombre d'avis fictifs à la note moyenne globale ajoutés à chaque vidéo (note bayésienne)
+        self.LEADERBOARD_RATING_PRIOR = float(os.getenv("LEADERBOARD_RATING_PRIOR", "5"))
+        # Demi-vie (jours) du poids d'un visionnage dans le classement "trending"
+        self.LEADERBOARD_TRENDING_HALF_LIFE_DAYS = float(os.getenv("LEADERBOARD_TRENDING_HALF_LIFE_DAYS", "2"))
+
+    @property
+    def DATABASE_URL(self) -> str:
+        if not self._database_url:
+            raise ValueError("La variable d'environnement DATABASE_URL doit être définie.")
+        return self._database_url
+
+    @property
+    def DATABASE_ASYNC_URL(self) -> str:
+        return self._database_async_url or async_database_url(self.DATABASE_URL)
+
+    @property
+    def YOUTUBE_API_KEY(self) -> str:
+        if not self._youtube_api_key:
+            raise ValueError("La variable d'environnement YOUTUBE_API_KEY doit être définie")
+        return self._youtube_api_key
 
-if not DATABASE_URL:
-    raise ValueError("La variable d'environnement DATABASE_URL doit être définie.")
 
-# Clé API YouTube : essentielle pour les appels à l'API YouTube
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-if not YOUTUBE_API_KEY:
-    raise ValueError("La variable d'environnement YOUTUBE_API_KEY doit être définie")
+@lru_cache()
+def get_settings() -> Settings:
+    """Renvoie la configuration, lue une seule fois au premier appel."""
+    return Settings()
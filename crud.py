@@ -1,8 +1,27 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+import operator
+import re
+
+from sqlalchemy import (
+    Float, Integer, and_, bindparam, case, cast, exists, func, insert, or_, select, text, update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert, match as mysql_match
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only
 from fastapi import HTTPException
-from models import Video, Progress, Review, User  # Pour la gestion des vidéos, de la progression, des avis et des utilisateurs
-from schemas import ReviewCreate
-from youtube_api import get_youtube_video_data
+from config import get_settings
+from starlette.concurrency import run_in_threadpool
+from leaderboards import ALL_CATEGORIES, CURSOR_NAME as LEADERBOARDS_CURSOR_NAME, watch_activity
+from progress_buffer import ProgressBuffer, ProgressBufferFull
+from response_cache import invalidate_video_progress, invalidate_videos
+from models import Video, Progress, Review, User, JobCursor, LeaderboardEntry  # Pour la gestion des vidéos, de la progression, des avis et des utilisateurs
+from schemas import ReviewCreate, VideoSummary
+from stats_refresher import recent_views
+from youtube_api import get_youtube_video_data, get_youtube_videos_data
+from youtube_async import get_async_client
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs
 
@@ -22,51 +41,57 @@ def extract_video_id(youtube_url: str) -> str:
     return None
 
 
-def create_video(db: Session, youtube_input: str, mentor_email: str, category: str, order: int = None):
+def parse_youtube_input(youtube_input: str) -> str:
     """
-    Crée une vidéo dans la BDD en extrayant les infos depuis YouTube.
-    L'ordre d'affichage est calculé en fonction du mentor et de la catégorie.
+    Renvoie l'ID YouTube d'une entrée qui peut être une URL ou directement un ID.
 
-    Étapes :
-    1. Vérifie si la vidéo est déjà enregistrée (évite les doublons).
-    2. Détermine si l'entrée est une URL ou un ID.
-    3. Récupère les données de la vidéo via l'API YouTube.
-    4. Calcule dynamiquement l'ordre si non fourni.
-    5. Crée et enregistre l'objet Video dans la base de données.
+    Raises:
+        HTTPException: Si l'ID ne peut pas être extrait de l'URL.
+    """
+    if "youtu" in youtube_input:
+        video_id = extract_video_id(youtube_input)
+        if not video_id:
+            raise HTTPException(status_code=400, detail="Impossible d'extraire l'ID de la vidéo depuis l'URL fournie")
+        return video_id
+    return youtube_input  # On considère que c'est déjà un ID
+
+
+def _resolve_video_id(db: Session, youtube_input: str) -> str:
+    """
+    Vérifie que la vidéo n'est pas déjà enregistrée et renvoie son ID YouTube.
 
     Raises:
-        HTTPException: En cas d'erreur d'extraction de l'ID, de récupération des données ou si la vidéo existe déjà.
+        HTTPException: Si la vidéo existe déjà ou si l'ID ne peut pas être extrait de l'URL.
     """
     # Vérification si la vidéo existe déjà dans la BDD
     existing_video = db.query(Video).filter(Video.youtube_url == youtube_input).first()
     if existing_video:
         raise HTTPException(status_code=400, detail="Cette vidéo est déjà enregistrée")
+    return parse_youtube_input(youtube_input)
 
-    # Détermine si on a une URL ou directement un ID
-    if "youtu" in youtube_input:
-        video_id = extract_video_id(youtube_input)
-        if not video_id:
-            raise HTTPException(status_code=400, detail="Impossible d'extraire l'ID de la vidéo depuis l'URL fournie")
-    else:
-        video_id = youtube_input  # On considère que c'est déjà un ID
 
-    # Récupérer les données de la vidéo via l'API YouTube
-    video_data = get_youtube_video_data(video_id)
+def last_order_statement(mentor_email: str, category: str):
+    """
+    Requête renvoyant le dernier ordre d'affichage du couple (mentor_email, category).
+    """
+    return select(func.max(Video.order)).where(Video.mentor_email == mentor_email, Video.category == category)
+
+
+def video_from_youtube_data(video_data: dict, mentor_email: str, category: str, order: int) -> Video:
+    """
+    Construit une instance Video (non enregistrée) à partir des données YouTube.
+
+    Raises:
+        HTTPException: Si les données YouTube n'ont pas pu être récupérées.
+    """
     if video_data is None:
         raise HTTPException(status_code=400, detail="Impossible de récupérer les données de la vidéo depuis YouTube")
+    return Video(**video_values(video_data, mentor_email, category, order))
 
-    # Calculer l'ordre si non fourni en fonction du dernier enregistrement pour le couple (mentor_email, category)
-    if order is None:
-        last_video = (
-            db.query(Video)
-            .filter(Video.mentor_email == mentor_email, Video.category == category)
-            .order_by(Video.order.desc())
-            .first()
-        )
-        order = last_video.order + 1 if last_video and last_video.order is not None else 1
 
-    # Création de l'instance Video avec les données récupérées
-    video = Video(
+def video_values(video_data: dict, mentor_email: str, category: str, order: int) -> dict:
+    """Valeurs des colonnes d'une vidéo construite à partir des données YouTube."""
+    return dict(
         youtube_url=video_data["video_id"],  # On stocke uniquement l'ID de la vidéo
         mentor_email=mentor_email,
         category=category,
@@ -78,41 +103,545 @@ def create_video(db: Session, youtube_input: str, mentor_email: str, category: s
         order=order,
         stars=0  # Initialisation de la note moyenne à 0
     )
+
+
+def _insert_video(db: Session, video_data: dict, mentor_email: str, category: str, order: int = None):
+    """
+    Enregistre une vidéo à partir des données YouTube, en calculant l'ordre si non fourni.
+
+    Raises:
+        HTTPException: Si les données YouTube n'ont pas pu être récupérées.
+    """
+    if video_data is None:
+        raise HTTPException(status_code=400, detail="Impossible de récupérer les données de la vidéo depuis YouTube")
+
+    # Calculer l'ordre si non fourni en fonction du dernier enregistrement pour le couple (mentor_email, category)
+    if order is None:
+        order = (db.scalar(last_order_statement(mentor_email, category)) or 0) + 1
+
+    video = video_from_youtube_data(video_data, mentor_email, category, order)
     db.add(video)
     db.commit()
+    invalidate_videos()
     db.refresh(video)
     return video
 
 
-def track_progress(db: Session, video_id: int, mentee_email: str):
+def create_video(db: Session, youtube_input: str, mentor_email: str, category: str, order: int = None):
     """
-    Met à jour ou crée une nouvelle progression de visionnage pour une vidéo donnée.
+    Crée une vidéo dans la BDD en extrayant les infos depuis YouTube.
+    L'ordre d'affichage est calculé en fonction du mentor et de la catégorie.
 
     Étapes :
-    1. Vérifie que la vidéo existe dans la BDD.
-    2. Cherche une progression existante pour le couple (video_id, mentee_email).
-    3. Incrémente la progression si elle existe, sinon crée un nouvel enregistrement.
+    1. Vérifie si la vidéo est déjà enregistrée (évite les doublons).
+    2. Détermine si l'entrée est une URL ou un ID.
+    3. Récupère les données de la vidéo via l'API YouTube.
+    4. Calcule dynamiquement l'ordre si non fourni.
+    5. Crée et enregistre l'objet Video dans la base de données.
 
     Raises:
-        HTTPException: Si la vidéo n'est pas trouvée.
+        HTTPException: En cas d'erreur d'extraction de l'ID, de récupération des données ou si la vidéo existe déjà.
     """
-    # Vérifier l'existence de la vidéo
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
-        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+    video_id = _resolve_video_id(db, youtube_input)
+    # Récupérer les données de la vidéo via l'API YouTube
+    video_data = get_youtube_video_data(video_id)
+    return _insert_video(db, video_data, mentor_email, category, order)
 
-    # Rechercher une progression existante pour ce mentee
-    progress = db.query(Progress).filter(
-        Progress.video_id == video_id,
-        Progress.mentee_email == mentee_email
-    ).first()
-    if progress:
-        progress.watched += 1
-    else:
-        progress = Progress(video_id=video_id, mentee_email=mentee_email, watched=1)
-        db.add(progress)
+
+async def create_video_async(
+    db: Session, youtube_input: str, mentor_email: str, category: str, order: int = None, client=None
+):
+    """
+    Version asynchrone de create_video, pour les endpoints `async def`.
+
+    L'appel à YouTube est attendu via le client asynchrone (aucun thread
+    bloqué pendant l'attente réseau) ; les accès à la base, synchrones,
+    sont exécutés dans le threadpool pour ne pas bloquer la boucle d'événements.
+
+    Args:
+        client (AsyncYouTubeClient, optionnel): Client à utiliser (client global par défaut).
+
+    Raises:
+        HTTPException: En cas d'erreur d'extraction de l'ID, de récupération des données ou si la vidéo existe déjà.
+    """
+    client = client or get_async_client()
+    video_id = await run_in_threadpool(_resolve_video_id, db, youtube_input)
+    video_data = await client.get_video_data(video_id)
+    return await run_in_threadpool(_insert_video, db, video_data, mentor_email, category, order)
+
+
+def create_videos_bulk(db: Session, videos: list):
+    """
+    Crée plusieurs vidéos en un minimum d'appels à l'API YouTube et en une seule transaction.
+
+    Étapes :
+    1. Extrait l'ID YouTube de chaque entrée et écarte les doublons de la requête.
+    2. Écarte, en une requête, les vidéos déjà enregistrées.
+    3. Récupère les métadonnées par paquets de 50 IDs (get_youtube_videos_data).
+    4. Calcule l'ordre d'affichage à partir du dernier ordre de chaque couple
+       (mentor_email, category), obtenu en une seule requête GROUP BY.
+    5. Insère toutes les vidéos en un seul INSERT groupé et valide une seule fois.
+
+    Args:
+        videos (list[VideoCreate]): Vidéos à créer, dans l'ordre souhaité.
+
+    Returns:
+        Dictionnaire {"created": [...], "errors": [{"youtube_url", "detail"}]}.
+    """
+    errors = []
+    pending = []  # (entrée, ID YouTube)
+    seen = set()
+    for item in videos:
+        try:
+            video_id = parse_youtube_input(item.youtube_url)
+        except HTTPException as e:
+            errors.append({"youtube_url": item.youtube_url, "detail": e.detail})
+            continue
+        if video_id in seen:
+            errors.append({"youtube_url": item.youtube_url, "detail": "Vidéo en double dans la requête"})
+        else:
+            seen.add(video_id)
+            pending.append((item, video_id))
+
+    existing = {
+        youtube_url for (youtube_url,) in
+        db.query(Video.youtube_url).filter(Video.youtube_url.in_([video_id for _, video_id in pending]))
+    } if pending else set()
+
+    fetched, fetch_errors = get_youtube_videos_data([video_id for _, video_id in pending if video_id not in existing])
+
+    # Dernier ordre connu pour chaque couple (mentor_email, category) concerné
+    pairs = {(item.mentor_email, item.category) for item, _ in pending}
+    last_orders = {}
+    if pairs:
+        rows = (
+            db.query(Video.mentor_email, Video.category, func.max(Video.order))
+            .filter(or_(*[and_(Video.mentor_email == m, Video.category == c) for m, c in pairs]))
+            .group_by(Video.mentor_email, Video.category)
+            .all()
+        )
+        last_orders = {(m, c): last_order or 0 for m, c, last_order in rows}
+
+    created = []
+    for item, video_id in pending:
+        if video_id in existing:
+            errors.append({"youtube_url": item.youtube_url, "detail": "Cette vidéo est déjà enregistrée"})
+            continue
+        video_data = fetched.get(video_id)
+        if video_data is None:
+            errors.append({"youtube_url": item.youtube_url, "detail": fetch_errors.get(
+                video_id, "Impossible de récupérer les données de la vidéo depuis YouTube")})
+            continue
+
+        pair = (item.mentor_email, item.category)
+        order = item.order
+        if order is None:
+            order = last_orders.get(pair, 0) + 1
+        last_orders[pair] = max(last_orders.get(pair, 0), order)
+
+        created.append(video_values(video_data, item.mentor_email, item.category, order))
+
+    summaries = []
+    if created:
+        # Un seul INSERT groupé (executemany), puis une lecture des vidéos créées :
+        # via l'ORM, chaque vidéo serait insérée séparément pour obtenir sa clé
+        # primaire (MySQL ne connaît pas INSERT ... RETURNING)
+        db.execute(insert(Video), created)
+        urls = [values["youtube_url"] for values in created]
+        videos = {video.youtube_url: video for video in db.scalars(select(Video).where(Video.youtube_url.in_(urls)))}
+        # Sérialisation avant le commit, qui expire les objets (évite un rechargement par vidéo)
+        summaries = [VideoSummary.from_orm(videos[url]) for url in urls]
     db.commit()
-    return progress
+    if created:
+        invalidate_videos()
+    return {"created": summaries, "errors": errors}
+
+
+def progress_upsert_statement(db: Session, rows: list):
+    """
+    Construit une requête INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE qui
+    ajoute `watched` à la progression existante du couple (video_id, mentee_email),
+    ou crée la ligne si elle n'existe pas encore.
+
+    L'incrément est calculé par la base de données (watched = watched + n) :
+    aucune lecture préalable, aucune perte d'incrément en cas d'accès concurrents.
+    updated_at est repris de la ligne insérée (onupdate ne s'applique pas à la
+    partie UPDATE d'un upsert).
+    Repose sur la contrainte unique uq_progress_video_mentee.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql_insert(Progress).values(rows)
+        return stmt.on_duplicate_key_update(
+            watched=Progress.watched + stmt.inserted.watched, updated_at=stmt.inserted.updated_at
+        )
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(Progress).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[Progress.video_id, Progress.mentee_email],
+            set_={"watched": Progress.watched + stmt.excluded.watched, "updated_at": stmt.excluded.updated_at},
+        )
+    raise NotImplementedError(f"Upsert de progression non supporté pour le dialecte {dialect}")
+
+
+def progress_import_statement(db: Session, rows: list):
+    """
+    Construit l'upsert d'un import d'historique de progression : la valeur
+    `watched` conservée est la plus grande entre celle en base et celle importée,
+    si bien que réimporter le même fichier ne change rien.
+    """
+    dialect = db.get_bind().dialect.name
+    # max() à deux arguments est la fonction scalaire de SQLite, GREATEST() celle de MySQL/PostgreSQL
+    greatest = func.max if dialect == "sqlite" else func.greatest
+    if dialect == "mysql":
+        stmt = mysql_insert(Progress).values(rows)
+        return stmt.on_duplicate_key_update(
+            watched=greatest(Progress.watched, stmt.inserted.watched), updated_at=stmt.inserted.updated_at
+        )
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(Progress).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[Progress.video_id, Progress.mentee_email],
+            set_={"watched": greatest(Progress.watched, stmt.excluded.watched), "updated_at": stmt.excluded.updated_at},
+        )
+    raise NotImplementedError(f"Upsert de progression non supporté pour le dialecte {dialect}")
+
+
+def engagement_update(video_id: int, mentee_email: str, watched: int = 1):
+    """
+    Requête UPDATE qui ajoute `watched` visionnages aux compteurs d'engagement
+    d'une vidéo : watch_count augmente de `watched`, et viewer_count de 1 si le
+    mentee n'avait encore rien regardé (aucune progression avec watched > 0).
+
+    À exécuter avant l'upsert de la progression, dans la même transaction : la
+    ligne de la vidéo est verrouillée en premier, ce qui sérialise les
+    visionnages simultanés d'une même vidéo (le test du nouveau spectateur
+    reste exact) et donne l'ordre de verrouillage suivi par write_progress_batch.
+    """
+    already_viewer = exists().where(
+        Progress.video_id == video_id, Progress.mentee_email == mentee_email, Progress.watched > 0
+    )
+    return (
+        update(Video)
+        .where(Video.id == video_id)
+        .values(
+            watch_count=Video.watch_count + watched,
+            viewer_count=Video.viewer_count + case((already_viewer, 0), else_=1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def engagement_counts_statement(video_ids=None):
+    """
+    Requête GROUP BY qui calcule les compteurs d'engagement à partir de la table
+    progress, pour les vidéos `video_ids` (toutes si None) ; lignes
+    (video_id, viewer_count, watch_count).
+    """
+    stmt = select(
+        Progress.video_id,
+        func.count(case((Progress.watched > 0, 1))).label("viewer_count"),
+        func.coalesce(func.sum(Progress.watched), 0).label("watch_count"),
+    ).group_by(Progress.video_id)
+    if video_ids is not None:
+        stmt = stmt.where(Progress.video_id.in_(video_ids))
+    return stmt
+
+
+# Incrément des compteurs d'engagement d'une vidéo (exécuté en lot par write_progress_batch)
+engagement_increment = (
+    update(Video.__table__)
+    .where(Video.__table__.c.id == bindparam("b_id"))
+    .values(
+        watch_count=Video.__table__.c.watch_count + bindparam("b_watched"),
+        viewer_count=Video.__table__.c.viewer_count + bindparam("b_viewers"),
+    )
+)
+
+
+def previous_watched_statement(keys):
+    """
+    Requête qui lit la valeur de `watched` des progressions existantes pour les
+    couples (video_id, mentee_email) de `keys` ; à filtrer par
+    engagement_increments, qui écarte les couples lus en trop.
+
+    Deux listes IN (index uq_progress_video_mentee) plutôt qu'un IN sur le
+    couple, que SQLite ne sait pas résoudre par l'index.
+    """
+    return select(Progress.video_id, Progress.mentee_email, Progress.watched).where(
+        Progress.video_id.in_({video_id for video_id, _ in keys}),
+        Progress.mentee_email.in_({mentee_email for _, mentee_email in keys}),
+    )
+
+
+def engagement_increments(increments: dict, chunk: list, keys: set, previous_rows, merge):
+    """
+    Ajoute à `increments` (video_id -> [visionnages, nouveaux spectateurs]) les
+    incréments dus à l'écriture des lignes `chunk` : watch_count augmente de
+    l'écart entre ancienne et nouvelle valeur de `watched`, viewer_count de 1
+    pour chaque mentee qui n'avait encore rien regardé (watched passe de 0 à
+    une valeur positive).
+
+    Args:
+        keys: Couples (video_id, mentee_email) des lignes à compter (vidéos existantes).
+        previous_rows: Lignes de previous_watched_statement(keys).
+    """
+    previous = {
+        (video_id, mentee_email): watched
+        for video_id, mentee_email, watched in previous_rows
+        if (video_id, mentee_email) in keys
+    }
+    for row in chunk:
+        key = (row["video_id"], row["mentee_email"])
+        if key not in keys:
+            continue
+        old = previous.get(key) or 0
+        new = merge(old, row["watched"])
+        counts = increments.setdefault(row["video_id"], [0, 0])
+        counts[0] += new - old
+        counts[1] += 1 if old <= 0 < new else 0
+    return increments
+
+
+def engagement_increment_params(increments: dict) -> list:
+    """Paramètres de engagement_increment (executemany), par ID croissant."""
+    return [
+        {"b_id": video_id, "b_watched": watched, "b_viewers": viewers}
+        for video_id, (watched, viewers) in sorted(increments.items()) if watched or viewers
+    ]
+
+
+def write_progress_batch(
+    db: Session, rows: list, statement=progress_upsert_statement, merge=operator.add, chunk_size: int = 500
+) -> dict:
+    """
+    Écrit un lot de progressions (tampon de progression, import, battements de
+    lecture) par upserts de `chunk_size` lignes et incrémente les compteurs
+    d'engagement des vidéos concernées ; dans la transaction en cours (sans commit).
+
+    Avant chaque upsert, une lecture par clé (video_id, mentee_email) des
+    progressions existantes donne les incréments (voir engagement_increments).
+    Le coût ne dépend que de la taille du lot, pas de l'historique des vidéos
+    (le recalcul complet est réservé à reconcile_engagement_counters).
+
+    Les lignes des vidéos sont d'abord verrouillées par ID croissant : comme
+    track_progress, une écriture groupée verrouille la vidéo avant ses
+    progressions, ce qui évite les interblocages MySQL entre les deux, et les
+    valeurs lues ne peuvent pas changer avant l'upsert.
+
+    Args:
+        statement: Constructeur de l'upsert (progress_upsert_statement, progress_import_statement
+            ou progress_heartbeat_statement).
+        merge: Calcul de la nouvelle valeur de `watched` à partir de l'ancienne et de celle
+            de la ligne, identique à celui de `statement` (operator.add ou max).
+
+    Returns:
+        Les incréments appliqués : {video_id: [visionnages, nouveaux spectateurs]}.
+    """
+    video_ids = sorted({row["video_id"] for row in rows})
+    existing = set(db.scalars(
+        select(Video.id).where(Video.id.in_(video_ids)).order_by(Video.id).with_for_update()
+    ))
+    increments = {}
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        keys = {(row["video_id"], row["mentee_email"]) for row in chunk if row["video_id"] in existing}
+        previous_rows = db.execute(previous_watched_statement(keys)).all() if keys else []
+        db.execute(statement(db, chunk))
+        engagement_increments(increments, chunk, keys, previous_rows, merge)
+    changes = engagement_increment_params(increments)
+    if changes:
+        db.execute(engagement_increment, changes)
+    return increments
+
+
+# Colonnes d'une progression renvoyées par POST /progress/ (schemas.ProgressResponse)
+PROGRESS_RESPONSE_COLUMNS = (
+    Progress.id, Progress.video_id, Progress.mentee_email, Progress.watched,
+    Progress.last_position, Progress.max_position, Progress.completed, Progress.updated_at,
+)
+
+
+def track_progress(db: Session, video_id: int, mentee_email: str, buffer: ProgressBuffer = None):
+    """
+    Incrémente (ou crée) la progression de visionnage d'un mentee pour une vidéo.
+
+    Dans une même transaction, les compteurs d'engagement de la vidéo sont
+    mis à jour (engagement_update, qui révèle aussi une vidéo inexistante),
+    puis la progression est incrémentée par un upsert atomique : l'incrément
+    est fait par la base de données. Sur les SGBD qui supportent RETURNING, la
+    progression à jour est renvoyée par la même requête ; sinon (MySQL) elle est relue.
+
+    Si un tampon (ProgressBuffer) est fourni, l'incrément y est simplement
+    ajouté et sera écrit plus tard en lot ; la base n'est pas sollicitée et
+    l'existence de la vidéo n'est vérifiée qu'à l'écriture.
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée, ou si le tampon est plein (503).
+    """
+    # Les statistiques YouTube des vidéos regardées sont rafraîchies en priorité
+    recent_views.mark(video_id)
+    # Compté pour les classements (leaderboards.py), écrit en base par la tâche de fond
+    watch_activity.add(video_id)
+
+    if buffer is not None:
+        try:
+            pending = buffer.add(video_id, mentee_email)
+        except ProgressBufferFull:
+            raise HTTPException(status_code=503, detail="Suivi de progression temporairement saturé, réessayez plus tard")
+        return {"video_id": video_id, "mentee_email": mentee_email, "pending": pending}
+
+    stmt = progress_upsert_statement(db, [{"video_id": video_id, "mentee_email": mentee_email, "watched": 1}])
+    returning = db.get_bind().dialect.insert_returning
+    if returning:
+        stmt = stmt.returning(*PROGRESS_RESPONSE_COLUMNS)
+    try:
+        # Aucune ligne mise à jour : la vidéo n'existe pas
+        found = db.execute(engagement_update(video_id, mentee_email)).rowcount == 1
+        if found:
+            result = db.execute(stmt)
+            row = result.one() if returning else None
+            db.commit()
+    except IntegrityError:
+        # Violation de la clé étrangère : la vidéo a été supprimée entre-temps
+        found = False
+    if not found:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+    # Les progressions et compteurs font partie de la réponse de GET /videos/{id}
+    invalidate_video_progress(video_id)
+
+    if row is None:
+        row = db.query(*PROGRESS_RESPONSE_COLUMNS).filter(
+            Progress.video_id == video_id,
+            Progress.mentee_email == mentee_email
+        ).one()
+    return dict(row._mapping)
+
+
+def merge_heartbeats(mentee_email: str, samples: list, completion_ratio: float = None) -> list:
+    """
+    Fusionne les battements de lecture d'un mentee en une ligne de progression
+    par vidéo : position du dernier échantillon (reprise), position maximale,
+    et fin de lecture si un échantillon l'a signalée ou atteint
+    `completion_ratio` de la durée de la vidéo.
+
+    Args:
+        samples: Échantillons (schemas.HeartbeatSample) dans l'ordre où ils ont été relevés.
+
+    Returns:
+        Les lignes à écrire (voir progress_heartbeat_statement), triées par vidéo.
+    """
+    completion_ratio = completion_ratio or get_settings().PROGRESS_COMPLETION_RATIO
+    now = datetime.utcnow()
+    rows = {}
+    for sample in samples:
+        position = int(sample.position)
+        completed = sample.completed or (
+            sample.duration is not None and sample.position >= completion_ratio * sample.duration
+        )
+        row = rows.get(sample.video_id)
+        if row is None:
+            rows[sample.video_id] = {
+                "video_id": sample.video_id, "mentee_email": mentee_email, "watched": 1,
+                "last_position": position, "max_position": position, "completed": completed, "updated_at": now,
+            }
+        else:
+            row["last_position"] = position
+            row["max_position"] = max(row["max_position"], position)
+            row["completed"] = row["completed"] or completed
+    # Tri par clé : ordre de verrouillage stable, comme le tampon de progression
+    return [rows[video_id] for video_id in sorted(rows)]
+
+
+def progress_heartbeat_statement(db: Session, rows: list):
+    """
+    Construit l'upsert des battements de lecture (lignes de merge_heartbeats),
+    en une seule requête pour toutes les vidéos :
+    - last_position prend la valeur reçue (le mentee peut revenir en arrière) ;
+    - max_position ne diminue jamais (plus grande des deux valeurs) ;
+    - completed ne repasse jamais à faux ;
+    - watched (nombre de POST /progress/) passe à 1 au moins, sans être
+      incrémenté : la vidéo compte comme regardée par le mentee (watched > 0).
+    Repose sur la contrainte unique uq_progress_video_mentee.
+    """
+    dialect = db.get_bind().dialect.name
+    # max() à deux arguments est la fonction scalaire de SQLite, GREATEST() celle de MySQL/PostgreSQL
+    greatest = func.max if dialect == "sqlite" else func.greatest
+    if dialect == "mysql":
+        stmt = mysql_insert(Progress).values(rows)
+        return stmt.on_duplicate_key_update(
+            watched=greatest(Progress.watched, stmt.inserted.watched),
+            last_position=stmt.inserted.last_position,
+            max_position=greatest(Progress.max_position, stmt.inserted.max_position),
+            completed=or_(Progress.completed, stmt.inserted.completed),
+            updated_at=stmt.inserted.updated_at,
+        )
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(Progress).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[Progress.video_id, Progress.mentee_email],
+            set_={
+                "watched": greatest(Progress.watched, stmt.excluded.watched),
+                "last_position": stmt.excluded.last_position,
+                "max_position": greatest(Progress.max_position, stmt.excluded.max_position),
+                "completed": or_(Progress.completed, stmt.excluded.completed),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+    raise NotImplementedError(f"Upsert de progression non supporté pour le dialecte {dialect}")
+
+
+def record_heartbeats(db: Session, mentee_email: str, samples: list) -> dict:
+    """
+    Enregistre un lot de battements de lecture d'un mentee (plusieurs vidéos,
+    plusieurs échantillons par vidéo) en un seul upsert, par write_progress_batch.
+
+    Un battement suffit à compter la vidéo comme regardée (watched passe à 1
+    au moins) : la première fois, viewer_count et watch_count de la vidéo
+    augmentent de 1 et le visionnage est compté pour les classements, comme
+    pour POST /progress/.
+
+    Comme pour le tampon de progression, l'existence des vidéos est garantie
+    par la clé étrangère : si l'une d'elles n'existe pas, ses échantillons sont
+    écartés et l'écriture est rejouée pour les autres.
+
+    Returns:
+        Dictionnaire {"updated": nombre de progressions écrites, "unknown_video_ids": [...]}.
+    """
+    rows = merge_heartbeats(mentee_email, samples)
+    unknown = []
+    try:
+        increments = write_progress_batch(db, rows, statement=progress_heartbeat_statement, merge=max)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        video_ids = [row["video_id"] for row in rows]
+        existing = set(db.scalars(select(Video.id).where(Video.id.in_(video_ids))))
+        unknown = [video_id for video_id in video_ids if video_id not in existing]
+        rows = [row for row in rows if row["video_id"] in existing]
+        increments = {}
+        if rows:
+            increments = write_progress_batch(db, rows, statement=progress_heartbeat_statement, merge=max)
+            db.commit()
+    record_heartbeat_views(increments)
+    # Les progressions font partie de la réponse de GET /videos/{id}
+    invalidate_video_progress(*[row["video_id"] for row in rows])
+    return {"updated": len(rows), "unknown_video_ids": unknown}
+
+
+def record_heartbeat_views(increments: dict):
+    """
+    Compte pour les classements (et le rafraîchissement des statistiques) les
+    vidéos qu'un battement de lecture vient de marquer comme regardées.
+    """
+    for video_id, (watched, _) in sorted(increments.items()):
+        if watched > 0:
+            recent_views.mark(video_id)
+            watch_activity.add(video_id, watched)
 
 
 def update_video(db: Session, video_id: int, title: str = None, description: str = None, category: str = None):
@@ -139,6 +668,7 @@ def update_video(db: Session, video_id: int, title: str = None, description: str
         video.category = category
 
     db.commit()
+    invalidate_videos(video_id)
     db.refresh(video)
     return video
 
@@ -156,9 +686,427 @@ def delete_video(db: Session, video_id: int):
 
     db.delete(video)
     db.commit()
+    invalidate_videos(video_id)
     return video
 
 
+def reorder_statement(orders: dict):
+    """
+    UPDATE unique attribuant à chaque vidéo de `orders` ({id: ordre}) son nouvel
+    ordre : UPDATE videos SET order = CASE id WHEN ... THEN ... END WHERE id IN (...).
+    """
+    return (
+        update(Video)
+        .where(Video.id.in_(orders))
+        .values(order=case(orders, value=Video.id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reorder_videos(db: Session, mentor_email: str, category: str, video_ids: list):
+    """
+    Réordonne toutes les vidéos d'un parcours (mentor_email, category) : la
+    vidéo video_ids[0] reçoit l'ordre 1, la suivante 2, etc., si bien que les
+    ordres du parcours sont uniques et sans trou.
+
+    Les vidéos du parcours sont lues (et verrouillées, FOR UPDATE) en une
+    requête, puis seules celles dont l'ordre change sont mises à jour par un
+    seul UPDATE ... CASE, dans la même transaction.
+
+    Returns:
+        dict: Le parcours, les IDs dans leur nouvel ordre et le nombre de vidéos modifiées.
+
+    Raises:
+        HTTPException: Si la liste contient des doublons, des vidéos hors du
+            parcours, ou n'en contient pas toutes les vidéos (erreur 400).
+    """
+    if len(set(video_ids)) != len(video_ids):
+        raise HTTPException(status_code=400, detail="La liste contient des vidéos en double")
+
+    current = dict(db.execute(
+        select(Video.id, Video.order)
+        .where(Video.mentor_email == mentor_email, Video.category == category)
+        .with_for_update()
+    ).all())
+
+    unknown = [video_id for video_id in video_ids if video_id not in current]
+    if unknown:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Vidéo(s) absente(s) du parcours : {', '.join(map(str, unknown))}",
+        )
+    missing = sorted(set(current) - set(video_ids))
+    if missing:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Vidéo(s) du parcours manquante(s) dans la liste : {', '.join(map(str, missing))}",
+        )
+
+    changes = {
+        video_id: position
+        for position, video_id in enumerate(video_ids, start=1)
+        if current[video_id] != position
+    }
+    if changes:
+        db.execute(reorder_statement(changes))
+    db.commit()
+    if changes:
+        invalidate_videos(*changes)
+    return {"mentor_email": mentor_email, "category": category, "video_ids": video_ids, "updated": len(changes)}
+
+
+def encode_catalog_cursor(video: Video) -> str:
+    """
+    Encode la position (category, order, id) d'une vidéo en un curseur opaque.
+    """
+    payload = json.dumps([video.category, video.order, video.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_catalog_cursor(cursor: str):
+    """
+    Décode un curseur produit par encode_catalog_cursor.
+
+    Raises:
+        HTTPException: Si le curseur est mal formé.
+    """
+    try:
+        category, order, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(category, str) or not isinstance(order, int) or not isinstance(video_id, int):
+            raise ValueError(cursor)
+        return category, order, video_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def catalog_page_statement(limit: int, cursor: str = None, mentor_email: str = None, category: str = None):
+    """
+    Construit la requête d'une page du catalogue triée par (category, order, id).
+
+    Une ligne de plus que `limit` est demandée pour savoir s'il existe une page
+    suivante (voir split_catalog_page).
+
+    Raises:
+        HTTPException: Si le curseur est invalide.
+    """
+    stmt = select(Video)
+    if mentor_email:
+        stmt = stmt.where(Video.mentor_email == mentor_email)
+    if category:
+        stmt = stmt.where(Video.category == category)
+
+    if cursor:
+        last_category, last_order, last_id = decode_catalog_cursor(cursor)
+        # Équivalent portable de (category, order, id) > (:c, :o, :i)
+        stmt = stmt.where(
+            or_(
+                Video.category > last_category,
+                and_(
+                    Video.category == last_category,
+                    or_(
+                        Video.order > last_order,
+                        and_(Video.order == last_order, Video.id > last_id),
+                    ),
+                ),
+            )
+        )
+    return stmt.order_by(Video.category, Video.order, Video.id).limit(limit + 1)
+
+
+def split_catalog_page(videos: list, limit: int):
+    """
+    Sépare le résultat de catalog_page_statement en (vidéos de la page, curseur suivant ou None).
+    """
+    if len(videos) > limit:
+        videos = videos[:limit]
+        return videos, encode_catalog_cursor(videos[-1])
+    return videos, None
+
+
+def list_videos_page(db: Session, limit: int, cursor: str = None, mentor_email: str = None, category: str = None):
+    """
+    Récupère une page du catalogue triée par (category, order, id).
+
+    La pagination se fait par curseur (keyset) : la page suivante commence
+    strictement après la dernière vidéo renvoyée, ce qui évite un OFFSET
+    coûteux. Une page ne coûte qu'une seule requête, quelle que soit la
+    taille du catalogue.
+
+    Returns:
+        Tuple (vidéos de la page, curseur suivant ou None).
+    """
+    videos = db.scalars(catalog_page_statement(limit, cursor, mentor_email, category)).all()
+    return split_catalog_page(videos, limit)
+
+
+# Nombre maximal de mots pris en compte dans une recherche
+SEARCH_MAX_TERMS = 10
+
+
+def search_terms(query: str) -> list:
+    """
+    Découpe une recherche en mots (lettres et chiffres), sans doublons.
+
+    Raises:
+        HTTPException: Si la recherche ne contient aucun mot (erreur 400).
+    """
+    terms = list(dict.fromkeys(word.lower() for word in re.findall(r"\w+", query)))
+    if not terms:
+        raise HTTPException(status_code=400, detail="La recherche doit contenir au moins un mot")
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def search_hits_subquery(db: Session, terms: list):
+    """
+    Sous-requête (id, score) des vidéos dont le titre ou la description
+    contient tous les mots (ou des mots qui commencent par eux), avec leur
+    pertinence : plus le score est grand, plus la vidéo est pertinente.
+
+    - MySQL : MATCH ... AGAINST en mode booléen sur l'index FULLTEXT ix_videos_search ;
+    - SQLite : MATCH sur la table FTS5 videos_fts, score = -bm25.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        score = mysql_match(Video.title, Video.description, against=" ".join(f"+{term}*" for term in terms))
+        score = score.in_boolean_mode()
+        return select(Video.id.label("id"), score.label("score")).where(score).subquery("hits")
+    if dialect == "sqlite":
+        return (
+            text("SELECT rowid AS id, -bm25(videos_fts) AS score FROM videos_fts WHERE videos_fts MATCH :search")
+            .bindparams(search=" ".join(f'"{term}"*' for term in terms))
+            .columns(id=Integer, score=Float)
+            .subquery("hits")
+        )
+    raise NotImplementedError(f"Recherche plein texte non supportée pour le dialecte {dialect}")
+
+
+def encode_search_cursor(score: float, video_id: int) -> str:
+    """Encode la position (score, id) d'un résultat de recherche en un curseur opaque."""
+    payload = json.dumps([score, video_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_search_cursor(cursor: str):
+    """
+    Décode un curseur produit par encode_search_cursor.
+
+    Raises:
+        HTTPException: Si le curseur est mal formé.
+    """
+    try:
+        score, video_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(score, (int, float)) or not isinstance(video_id, int):
+            raise ValueError(cursor)
+        return score, video_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def search_page_statement(
+    db: Session, query: str, limit: int, cursor: str = None, mentor_email: str = None, category: str = None
+):
+    """
+    Construit la requête d'une page de résultats de recherche, triés par
+    pertinence décroissante puis par ID ; lignes (Video, score).
+
+    Comme pour le catalogue, une ligne de plus que `limit` est demandée pour
+    savoir s'il existe une page suivante.
+
+    Raises:
+        HTTPException: Si la recherche ne contient aucun mot ou si le curseur est invalide (erreur 400).
+    """
+    hits = search_hits_subquery(db, search_terms(query))
+    stmt = select(Video, hits.c.score).join(hits, hits.c.id == Video.id)
+    if mentor_email:
+        stmt = stmt.where(Video.mentor_email == mentor_email)
+    if category:
+        stmt = stmt.where(Video.category == category)
+    if cursor:
+        last_score, last_id = decode_search_cursor(cursor)
+        stmt = stmt.where(or_(hits.c.score < last_score, and_(hits.c.score == last_score, Video.id > last_id)))
+    return stmt.order_by(hits.c.score.desc(), Video.id).limit(limit + 1)
+
+
+def split_search_page(rows: list, limit: int):
+    """
+    Sépare le résultat de search_page_statement en (lignes (Video, score) de la page, curseur suivant ou None).
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_search_cursor(rows[-1][1], rows[-1][0].id)
+    return rows, None
+
+
+def search_videos(
+    db: Session, query: str, limit: int, cursor: str = None, mentor_email: str = None, category: str = None
+):
+    """
+    Recherche plein texte dans les titres et descriptions des vidéos.
+
+    L'index (FULLTEXT sous MySQL, FTS5 sous SQLite) est tenu à jour par la base
+    à chaque création, modification ou suppression de vidéo. La pagination se
+    fait par curseur (score, id), en une seule requête par page.
+
+    Returns:
+        Tuple (lignes (Video, score) de la page, curseur suivant ou None).
+    """
+    rows = db.execute(search_page_statement(db, query, limit, cursor, mentor_email, category)).all()
+    return split_search_page(rows, limit)
+
+
+def leaderboard_statement(board: str, limit: int, category: str = None):
+    """
+    Construit la requête des `limit` premiers rangs d'un classement précalculé
+    (toutes catégories si `category` est absente) ; lignes (rang, score, Video).
+    Servie par la clé primaire (board, category, rank) de leaderboard_entries.
+    """
+    return (
+        select(LeaderboardEntry.rank, LeaderboardEntry.score, Video)
+        .join(Video, Video.id == LeaderboardEntry.video_id)
+        .where(LeaderboardEntry.board == board, LeaderboardEntry.category == (category or ALL_CATEGORIES))
+        .order_by(LeaderboardEntry.rank)
+        .limit(limit)
+    )
+
+
+def leaderboard_refreshed_at_statement():
+    """Date du dernier calcul des classements (None s'ils n'ont jamais été calculés)."""
+    return select(JobCursor.updated_at).where(JobCursor.name == LEADERBOARDS_CURSOR_NAME)
+
+
+def get_leaderboard(db: Session, board: str, limit: int, category: str = None):
+    """
+    Lit les `limit` premières vidéos d'un classement, calculé par la tâche de
+    fond de leaderboards.py : le coût ne dépend que de `limit`, pas du nombre
+    de vidéos ni de progressions.
+
+    Returns:
+        Tuple (lignes (rang, score, Video), date du dernier calcul ou None).
+    """
+    rows = db.execute(leaderboard_statement(board, limit, category)).all()
+    return rows, db.scalar(leaderboard_refreshed_at_statement())
+
+
+def rating_aggregate_update(video_id: int, stars: int):
+    """
+    Requête UPDATE qui ajoute une note aux agrégats d'avis d'une vidéo
+    (nombre d'avis, somme des étoiles, histogramme et moyenne).
+    """
+    # La moyenne est assignée en premier : MySQL évalue les assignations de
+    # gauche à droite, elle doit donc être calculée à partir des anciennes valeurs.
+    histogram_column = getattr(Video, f"stars_{stars}")
+    return (
+        update(Video)
+        .where(Video.id == video_id)
+        .ordered_values(
+            (Video.stars, func.round(cast(Video.stars_sum + stars, Float) / (Video.review_count + 1), 2)),
+            (Video.review_count, Video.review_count + 1),
+            (Video.stars_sum, Video.stars_sum + stars),
+            (histogram_column, histogram_column + 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Champs scalaires d'une vidéo sélectionnables via ?fields=
+VIDEO_FIELDS = (
+    "id", "youtube_url", "mentor_email", "category", "order", "title", "description",
+    "publication_date", "views", "likes", "stars", "review_count", "viewer_count", "watch_count",
+)
+# Champs renvoyés par défaut : tout sauf les textes longs et les compteurs
+DEFAULT_VIDEO_FIELDS = tuple(
+    field for field in VIDEO_FIELDS if field not in ("description", "review_count", "viewer_count", "watch_count")
+)
+
+
+def video_fields_statement(fields):
+    """
+    Requête sur les vidéos ne chargeant que les colonnes `fields` (load_only) ;
+    les autres colonnes et les relations ne sont pas lues.
+    """
+    return select(Video).options(load_only(*[getattr(Video, field) for field in fields], raiseload=True))
+
+
+def video_to_dict(video: Video, fields) -> dict:
+    """Sérialise les champs `fields` d'une vidéo chargée par video_fields_statement."""
+    return {field: getattr(video, field) for field in fields}
+
+
+def get_video_fields(db: Session, video_id: int, fields=DEFAULT_VIDEO_FIELDS):
+    """
+    Récupère une vidéo en ne lisant que les colonnes demandées.
+
+    Returns:
+        La vidéo, ou None si elle n'existe pas.
+    """
+    return db.scalar(video_fields_statement(fields).where(Video.id == video_id))
+
+
+def list_videos_fields(db: Session, fields=DEFAULT_VIDEO_FIELDS):
+    """
+    Récupère toutes les vidéos (triées par catégorie puis ordre) en ne lisant que les colonnes demandées.
+    """
+    return db.scalars(video_fields_statement(fields).order_by(Video.category, Video.order)).all()
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """
+    Décode le curseur d'une page de progressions ou d'avis (dernier ID renvoyé).
+
+    Raises:
+        HTTPException: Si le curseur est mal formé.
+    """
+    try:
+        return int(cursor)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def video_children_page_statement(model, video_id: int, limit: int, cursor: str = None):
+    """
+    Requête d'une page des progressions (Progress) ou des avis (Review) d'une
+    vidéo, triée par ID ; une ligne de plus est demandée pour détecter la page suivante.
+    """
+    stmt = select(model).where(model.video_id == video_id)
+    if cursor:
+        stmt = stmt.where(model.id > decode_id_cursor(cursor))
+    return stmt.order_by(model.id).limit(limit + 1)
+
+
+def split_children_page(items: list, limit: int):
+    """
+    Sépare le résultat de video_children_page_statement en (éléments de la page, curseur suivant ou None).
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        return items, str(items[-1].id)
+    return items, None
+
+
+def get_video_progress_page(db: Session, video_id: int, limit: int, cursor: str = None):
+    """
+    Récupère une page des progressions d'une vidéo.
+
+    Returns:
+        Tuple (progressions de la page, curseur suivant ou None).
+    """
+    items = db.scalars(video_children_page_statement(Progress, video_id, limit, cursor)).all()
+    return split_children_page(items, limit)
+
+
+def get_video_reviews_page(db: Session, video_id: int, limit: int, cursor: str = None):
+    """
+    Récupère une page des avis d'une vidéo.
+
+    Returns:
+        Tuple (avis de la page, curseur suivant ou None).
+    """
+    items = db.scalars(video_children_page_statement(Review, video_id, limit, cursor)).all()
+    return split_children_page(items, limit)
+
+
 def add_review(db: Session, review_data: ReviewCreate):
     """
     Ajoute un avis à une vidéo et met à jour la note moyenne (stars) de la vidéo.
@@ -167,7 +1115,13 @@ def add_review(db: Session, review_data: ReviewCreate):
     1. Vérifie que la vidéo existe.
     2. Vérifie qu'un avis n'a pas déjà été laissé par ce même utilisateur pour éviter les doublons.
     3. Crée l'avis et l'enregistre dans la base de données.
-    4. Recalcule la note moyenne de la vidéo en additionnant toutes les cotations (stars) et en divisant par le nombre total d'avis.
+    4. Met à jour les agrégats de la vidéo (nombre d'avis, somme des étoiles,
+       histogramme et moyenne) par une seule requête UPDATE atomique, dans la
+       même transaction que l'insertion de l'avis : aucun avis n'est relu.
+
+    Deux envois simultanés du même avis peuvent passer tous deux l'étape 2 :
+    l'index unique ix_reviews_video_mentee rejette alors le second, dont la
+    transaction (avis et agrégats) est annulée, avec la même erreur 400.
     """
     try:
         # Vérifier si la vidéo existe
@@ -191,23 +1145,21 @@ def add_review(db: Session, review_data: ReviewCreate):
             comment=review_data.comment
         )
         db.add(review)
+        db.execute(rating_aggregate_update(review_data.video_id, review_data.stars))
         db.commit()
+        invalidate_videos(review_data.video_id)
         db.refresh(review)
-
-        # Mise à jour de la note moyenne de la vidéo
-        reviews = db.query(Review).filter(Review.video_id == review_data.video_id).all()
-        total_stars = sum(r.stars for r in reviews)
-        # Calcul de la moyenne (arrondi à 2 décimales)
-        average_rating = round(total_stars / len(reviews), 2)
-        video.stars = average_rating  # Mise à jour de l'attribut 'stars' de la vidéo
-        db.commit()
-        db.refresh(video)
+        db.expire(video)
 
         return review
 
     except HTTPException as he:
         raise he
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Vous avez déjà laissé un avis pour cette vidéo")
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Erreur interne lors de l'ajout de l'avis: {e}")
 
 
@@ -227,21 +1179,262 @@ def get_reviews_for_video(db: Session, video_id: int):
 
 def get_average_rating(db: Session, video_id: int):
     """
-    Calcule la note moyenne d'une vidéo à partir de tous ses avis.
+    Calcule la note moyenne d'une vidéo à partir de ses agrégats d'avis.
 
     Returns:
         Note moyenne arrondie à 2 décimales. Retourne 0 s'il n'y a pas d'avis.
     """
     try:
-        reviews = db.query(Review).filter(Review.video_id == video_id).all()
-        if not reviews:
+        row = db.query(Video.review_count, Video.stars_sum).filter(Video.id == video_id).first()
+        if not row or not row.review_count:
             return 0
-        total_stars = sum(review.stars for review in reviews)
-        return round(total_stars / len(reviews), 2)
+        return round(row.stars_sum / row.review_count, 2)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne lors du calcul de la note moyenne: {e}")
 
 
+def get_rating_summary(db: Session, video_id: int):
+    """
+    Renvoie le résumé des notes d'une vidéo (nombre d'avis, moyenne, histogramme)
+    à partir d'une seule ligne de la table videos.
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée.
+    """
+    row = db.execute(rating_summary_statement(video_id)).first()
+    return rating_summary_from_row(video_id, row)
+
+
+def rating_summary_statement(video_id: int):
+    """
+    Requête renvoyant les agrégats d'avis d'une vidéo.
+    """
+    return select(
+        Video.review_count, Video.stars_sum,
+        Video.stars_1, Video.stars_2, Video.stars_3, Video.stars_4, Video.stars_5
+    ).where(Video.id == video_id)
+
+
+def rating_summary_from_row(video_id: int, row):
+    """
+    Construit le résumé des notes à partir d'une ligne de rating_summary_statement.
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée.
+    """
+    if not row:
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+    return {
+        "video_id": video_id,
+        "review_count": row.review_count,
+        "average": round(row.stars_sum / row.review_count, 2) if row.review_count else 0,
+        "histogram": {str(n): getattr(row, f"stars_{n}") for n in range(1, 6)},
+    }
+
+
+def reconcile_rating_aggregates(db: Session) -> int:
+    """
+    Recalcule les agrégats d'avis de toutes les vidéos à partir de la table reviews.
+
+    Sert de rattrapage ponctuel (données antérieures aux agrégats) ou de
+    vérification. Une seule requête GROUP BY lit les avis ; seules les vidéos
+    dont les agrégats diffèrent sont mises à jour, en lot.
+
+    Returns:
+        Le nombre de vidéos corrigées.
+    """
+    histogram_columns = [f"stars_{n}" for n in range(1, 6)]
+    grouped = db.query(
+        Review.video_id,
+        func.count(Review.id).label("review_count"),
+        func.coalesce(func.sum(Review.stars), 0).label("stars_sum"),
+        *[func.sum(case((Review.stars == n, 1), else_=0)).label(f"stars_{n}") for n in range(1, 6)],
+    ).group_by(Review.video_id).all()
+    expected = {row.video_id: row for row in grouped}
+
+    current = db.query(
+        Video.id, Video.stars, Video.review_count, Video.stars_sum, *[getattr(Video, c) for c in histogram_columns]
+    ).all()
+
+    changes = []
+    for row in current:
+        source = expected.get(row.id)
+        values = {
+            "review_count": source.review_count if source else 0,
+            "stars_sum": int(source.stars_sum) if source else 0,
+            **{c: int(getattr(source, c)) if source else 0 for c in histogram_columns},
+        }
+        values["stars"] = round(values["stars_sum"] / values["review_count"], 2) if values["review_count"] else 0.0
+        if any(getattr(row, key) != value for key, value in values.items()):
+            changes.append({"id": row.id, **values})
+
+    if changes:
+        db.execute(update(Video), changes)
+    db.commit()
+    invalidate_videos(*[change["id"] for change in changes])
+    return len(changes)
+
+
+def reconcile_engagement_counters(db: Session) -> int:
+    """
+    Recalcule les compteurs d'engagement (viewer_count, watch_count) de toutes
+    les vidéos à partir de la table progress.
+
+    Sert de rattrapage (données antérieures aux compteurs, écritures faites
+    hors de l'application) ou de vérification. Une seule requête GROUP BY lit
+    les progressions ; seules les vidéos dont les compteurs diffèrent sont
+    mises à jour, en lot.
+
+    Returns:
+        Le nombre de vidéos corrigées.
+    """
+    expected = {row.video_id: row for row in db.execute(engagement_counts_statement())}
+    changes = []
+    for row in db.query(Video.id, Video.viewer_count, Video.watch_count).all():
+        source = expected.get(row.id)
+        values = {
+            "viewer_count": source.viewer_count if source else 0,
+            "watch_count": int(source.watch_count) if source else 0,
+        }
+        if any(getattr(row, key) != value for key, value in values.items()):
+            changes.append({"id": row.id, **values})
+
+    if changes:
+        db.execute(update(Video), changes)
+    db.commit()
+    invalidate_videos(*[change["id"] for change in changes])
+    return len(changes)
+
+
+def mentee_dashboard_statement(mentee_email: str, category: str = None):
+    """
+    Requête unique du tableau de bord d'un mentee : une ligne par vidéo du
+    catalogue, avec sa progression et sa note éventuelles (jointures externes
+    sur progress et reviews, restreintes au mentee).
+    """
+    stmt = (
+        select(
+            Video.id, Video.title, Video.category, Video.order,
+            Progress.watched, Progress.last_position, Progress.max_position, Progress.completed, Review.stars,
+        )
+        .outerjoin(Progress, and_(Progress.video_id == Video.id, Progress.mentee_email == mentee_email))
+        .outerjoin(Review, and_(Review.video_id == Video.id, Review.mentee_email == mentee_email))
+    )
+    if category:
+        stmt = stmt.where(Video.category == category)
+    return stmt.order_by(Video.category, Video.order, Video.id)
+
+
+def build_mentee_dashboard(mentee_email: str, rows) -> dict:
+    """
+    Agrège les lignes de mentee_dashboard_statement par catégorie.
+    """
+    categories = {}
+    videos = []
+    for row in rows:
+        counts = categories.setdefault(
+            row.category, {"total_videos": 0, "watched_videos": 0, "completed_videos": 0, "reviewed_videos": 0}
+        )
+        counts["total_videos"] += 1
+        if row.watched:
+            counts["watched_videos"] += 1
+            if row.completed:
+                counts["completed_videos"] += 1
+            videos.append({
+                "video_id": row.id,
+                "title": row.title,
+                "category": row.category,
+                "order": row.order,
+                "watched": row.watched,
+                "last_position": row.last_position,
+                "max_position": row.max_position,
+                "completed": row.completed,
+                "review_stars": row.stars,
+            })
+        if row.stars is not None:
+            counts["reviewed_videos"] += 1
+
+    return {
+        "mentee_email": mentee_email,
+        "total_videos": sum(c["total_videos"] for c in categories.values()),
+        "watched_videos": sum(c["watched_videos"] for c in categories.values()),
+        "completed_videos": sum(c["completed_videos"] for c in categories.values()),
+        "reviewed_videos": sum(c["reviewed_videos"] for c in categories.values()),
+        "categories": [
+            {"category": name, **counts, "completion": round(counts["watched_videos"] / counts["total_videos"], 4)}
+            for name, counts in sorted(categories.items())
+        ],
+        "videos": videos,
+    }
+
+
+def get_mentee_dashboard(db: Session, mentee_email: str, category: str = None) -> dict:
+    """
+    Renvoie le tableau de bord d'un mentee : avancement par catégorie, vidéos
+    regardées et notes laissées, calculé en une seule requête.
+
+    Args:
+        mentee_email (str): Email du mentee.
+        category (str, optionnel): Limite le tableau de bord à une catégorie.
+    """
+    rows = db.execute(mentee_dashboard_statement(mentee_email, category)).all()
+    return build_mentee_dashboard(mentee_email, rows)
+
+
+# -------------------------------------------------------------------
+# Export des tables (GET /export/<table>)
+# -------------------------------------------------------------------
+# Tables exportables : modèle et colonne de date du filtre updated_since
+EXPORT_TABLES = {
+    "videos": (Video, Video.updated_at),
+    "reviews": (Review, Review.created_at),
+    "progress": (Progress, Progress.updated_at),
+}
+
+
+def export_columns(table: str) -> list:
+    """Noms des colonnes exportées d'une table, dans l'ordre de export_statement."""
+    model, _ = EXPORT_TABLES[table]
+    return [column.name for column in model.__table__.columns]
+
+
+def export_statement(table: str, updated_since: datetime = None, after: tuple = None, limit: int = None):
+    """
+    Requête d'un lot d'export d'une table (toutes ses colonnes, sans passer par
+    l'ORM), paginée par clé : `after` est la clé (export_key) de la dernière
+    ligne du lot précédent, None pour le premier lot.
+
+    Sans filtre, les lignes sont triées par ID (WHERE id > :after). Avec
+    `updated_since`, seules les lignes modifiées depuis cette date sont
+    renvoyées, triées par date de modification puis ID (parcours de l'index sur
+    la colonne de date, qui se termine par la clé primaire).
+    """
+    model, changed_at = EXPORT_TABLES[table]
+    stmt = select(*model.__table__.columns)
+    if updated_since is None:
+        if after is not None:
+            stmt = stmt.where(model.id > after[0])
+        stmt = stmt.order_by(model.id)
+    else:
+        stmt = stmt.where(changed_at >= updated_since)
+        if after is not None:
+            last_changed_at, last_id = after
+            stmt = stmt.where(or_(
+                changed_at > last_changed_at,
+                and_(changed_at == last_changed_at, model.id > last_id),
+            ))
+        stmt = stmt.order_by(changed_at, model.id)
+    return stmt.limit(limit) if limit else stmt
+
+
+def export_key(table: str, row, updated_since: datetime = None) -> tuple:
+    """Clé de pagination d'une ligne exportée (paramètre `after` de export_statement)."""
+    _, changed_at = EXPORT_TABLES[table]
+    if updated_since is None:
+        return (row.id,)
+    return (row._mapping[changed_at.name], row.id)
+
+
 # -------------------------------------------------------------------
 # Fonctions CRUD pour les utilisateurs
 # -------------------------------------------------------------------
@@ -0,0 +1,449 @@
+"""
+Versions asynchrones (AsyncSession) des fonctions de crud.py.
+
+Utilisées par les endpoints `async def` de routers/async_db.py lorsque
+DATABASE_ASYNC est activé : une requête n'occupe aucun thread pendant ses
+allers-retours avec la base. Les requêtes SQL sont construites par les mêmes
+fonctions que la pile synchrone (crud.catalog_page_statement,
+crud.progress_upsert_statement, crud.rating_aggregate_update, ...), seule
+leur exécution diffère.
+
+Avec AsyncSession, aucun chargement paresseux n'est possible : les relations
+nécessaires à la réponse (progressions, avis) sont chargées explicitement,
+ou par pages (get_video_progress_page, get_video_reviews_page).
+"""
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from crud import (
+    catalog_page_statement,
+    engagement_increment,
+    engagement_increment_params,
+    engagement_increments,
+    engagement_update,
+    last_order_statement,
+    merge_heartbeats,
+    parse_youtube_input,
+    previous_watched_statement,
+    progress_heartbeat_statement,
+    progress_upsert_statement,
+    rating_aggregate_update,
+    rating_summary_from_row,
+    rating_summary_statement,
+    record_heartbeat_views,
+    search_page_statement,
+    split_catalog_page,
+    split_search_page,
+    split_children_page,
+    video_children_page_statement,
+    video_fields_statement,
+    video_from_youtube_data,
+    DEFAULT_VIDEO_FIELDS,
+    PROGRESS_RESPONSE_COLUMNS,
+)
+from leaderboards import watch_activity
+from models import Progress, Review, User, Video
+from progress_buffer import ProgressBuffer, ProgressBufferFull
+from response_cache import invalidate_video_progress, invalidate_videos
+from schemas import ReviewCreate
+from stats_refresher import recent_views
+from youtube_async import get_async_client
+
+
+# ==============================================================================
+# Vidéos
+# ==============================================================================
+async def get_video(db: AsyncSession, video_id: int):
+    """
+    Récupère une vidéo avec ses progressions et ses avis (chargés en lot).
+
+    Returns:
+        La vidéo, ou None si elle n'existe pas.
+    """
+    stmt = (
+        select(Video)
+        .options(selectinload(Video.progresses), selectinload(Video.reviews))
+        .where(Video.id == video_id)
+        # Recharge les collections même si la vidéo est déjà dans la session
+        .execution_options(populate_existing=True)
+    )
+    return await db.scalar(stmt)
+
+
+async def get_video_fields(db: AsyncSession, video_id: int, fields=DEFAULT_VIDEO_FIELDS):
+    """
+    Récupère une vidéo en ne lisant que les colonnes demandées (voir crud.get_video_fields).
+
+    Returns:
+        La vidéo, ou None si elle n'existe pas.
+    """
+    return await db.scalar(video_fields_statement(fields).where(Video.id == video_id))
+
+
+async def list_videos_fields(db: AsyncSession, fields=DEFAULT_VIDEO_FIELDS):
+    """
+    Récupère toutes les vidéos (triées par catégorie puis ordre) en ne lisant que les colonnes demandées.
+    """
+    return (await db.scalars(video_fields_statement(fields).order_by(Video.category, Video.order))).all()
+
+
+async def get_video_progress_page(db: AsyncSession, video_id: int, limit: int, cursor: str = None):
+    """
+    Récupère une page des progressions d'une vidéo.
+
+    Returns:
+        Tuple (progressions de la page, curseur suivant ou None).
+    """
+    items = (await db.scalars(video_children_page_statement(Progress, video_id, limit, cursor))).all()
+    return split_children_page(items, limit)
+
+
+async def get_video_reviews_page(db: AsyncSession, video_id: int, limit: int, cursor: str = None):
+    """
+    Récupère une page des avis d'une vidéo.
+
+    Returns:
+        Tuple (avis de la page, curseur suivant ou None).
+    """
+    items = (await db.scalars(video_children_page_statement(Review, video_id, limit, cursor))).all()
+    return split_children_page(items, limit)
+
+
+async def create_video(
+    db: AsyncSession, youtube_input: str, mentor_email: str, category: str, order: int = None, client=None
+):
+    """
+    Crée une vidéo à partir des données YouTube (voir crud.create_video).
+
+    Raises:
+        HTTPException: En cas d'erreur d'extraction de l'ID, de récupération des données ou si la vidéo existe déjà.
+    """
+    existing = await db.scalar(select(Video.id).where(Video.youtube_url == youtube_input))
+    if existing:
+        raise HTTPException(status_code=400, detail="Cette vidéo est déjà enregistrée")
+    video_id = parse_youtube_input(youtube_input)
+
+    client = client or get_async_client()
+    video_data = await client.get_video_data(video_id)
+    if video_data is None:
+        raise HTTPException(status_code=400, detail="Impossible de récupérer les données de la vidéo depuis YouTube")
+
+    if order is None:
+        order = (await db.scalar(last_order_statement(mentor_email, category)) or 0) + 1
+
+    video = video_from_youtube_data(video_data, mentor_email, category, order)
+    db.add(video)
+    await db.commit()
+    invalidate_videos()
+    return await get_video(db, video.id)
+
+
+async def update_video(
+    db: AsyncSession, video_id: int, title: str = None, description: str = None, category: str = None
+):
+    """
+    Met à jour les informations d'une vidéo existante.
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée.
+    """
+    video = await db.get(Video, video_id)
+    if not video:
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+
+    if title:
+        video.title = title
+    if description:
+        video.description = description
+    if category:
+        video.category = category
+
+    await db.commit()
+    invalidate_videos(video_id)
+    return await get_video(db, video_id)
+
+
+async def update_video_order(db: AsyncSession, video_id: int, new_order: int):
+    """
+    Met à jour l'ordre d'affichage d'une vidéo.
+
+    Returns:
+        La vidéo mise à jour, ou None si elle n'existe pas.
+    """
+    video = await db.get(Video, video_id)
+    if not video:
+        return None
+    video.order = new_order
+    await db.commit()
+    invalidate_videos(video_id)
+    return await get_video(db, video_id)
+
+
+async def delete_video(db: AsyncSession, video_id: int):
+    """
+    Supprime une vidéo existante, avec ses progressions et ses avis.
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée.
+    """
+    # Les collections sont chargées pour que la cascade ORM puisse les supprimer
+    video = await get_video(db, video_id)
+    if not video:
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+
+    await db.delete(video)
+    await db.commit()
+    invalidate_videos(video_id)
+    return video
+
+
+async def list_videos_page(
+    db: AsyncSession, limit: int, cursor: str = None, mentor_email: str = None, category: str = None
+):
+    """
+    Récupère une page du catalogue triée par (category, order, id), paginée par curseur.
+
+    Returns:
+        Tuple (vidéos de la page, curseur suivant ou None).
+    """
+    videos = (await db.scalars(catalog_page_statement(limit, cursor, mentor_email, category))).all()
+    return split_catalog_page(videos, limit)
+
+
+async def search_videos(
+    db: AsyncSession, query: str, limit: int, cursor: str = None, mentor_email: str = None, category: str = None
+):
+    """
+    Recherche plein texte dans les titres et descriptions des vidéos (voir crud.search_videos).
+
+    Returns:
+        Tuple (lignes (Video, score) de la page, curseur suivant ou None).
+    """
+    rows = (await db.execute(search_page_statement(db, query, limit, cursor, mentor_email, category))).all()
+    return split_search_page(rows, limit)
+
+
+# ==============================================================================
+# Progression
+# ==============================================================================
+async def track_progress(db: AsyncSession, video_id: int, mentee_email: str, buffer: ProgressBuffer = None):
+    """
+    Incrémente (ou crée) la progression de visionnage d'un mentee pour une vidéo,
+    et ses compteurs d'engagement, par un upsert atomique (voir crud.track_progress).
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée, ou si le tampon est plein (503).
+    """
+    recent_views.mark(video_id)
+    watch_activity.add(video_id)
+
+    if buffer is not None:
+        try:
+            pending = buffer.add(video_id, mentee_email)
+        except ProgressBufferFull:
+            raise HTTPException(status_code=503, detail="Suivi de progression temporairement saturé, réessayez plus tard")
+        return {"video_id": video_id, "mentee_email": mentee_email, "pending": pending}
+
+    stmt = progress_upsert_statement(db, [{"video_id": video_id, "mentee_email": mentee_email, "watched": 1}])
+    returning = db.get_bind().dialect.insert_returning
+    if returning:
+        stmt = stmt.returning(*PROGRESS_RESPONSE_COLUMNS)
+    try:
+        # Compteurs d'engagement d'abord ; aucune ligne mise à jour : la vidéo n'existe pas
+        found = (await db.execute(engagement_update(video_id, mentee_email))).rowcount == 1
+        if found:
+            result = await db.execute(stmt)
+            row = result.one() if returning else None
+            await db.commit()
+    except IntegrityError:
+        # Violation de la clé étrangère : la vidéo a été supprimée entre-temps
+        found = False
+    if not found:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+    invalidate_video_progress(video_id)
+
+    if row is None:
+        row = (await db.execute(
+            select(*PROGRESS_RESPONSE_COLUMNS).where(
+                Progress.video_id == video_id,
+                Progress.mentee_email == mentee_email
+            )
+        )).one()
+    return dict(row._mapping)
+
+
+async def write_progress_batch(db: AsyncSession, rows: list, statement, merge) -> dict:
+    """
+    Écrit un lot de progressions et incrémente les compteurs d'engagement des
+    vidéos concernées, sans commit (voir crud.write_progress_batch) ; en un
+    seul upsert, les lots de battements de lecture comptant au plus 500 lignes.
+    """
+    video_ids = sorted({row["video_id"] for row in rows})
+    existing = set((await db.scalars(
+        select(Video.id).where(Video.id.in_(video_ids)).order_by(Video.id).with_for_update()
+    )).all())
+    keys = {(row["video_id"], row["mentee_email"]) for row in rows if row["video_id"] in existing}
+    previous_rows = (await db.execute(previous_watched_statement(keys))).all() if keys else []
+    await db.execute(statement(db, rows))
+    increments = engagement_increments({}, rows, keys, previous_rows, merge)
+    changes = engagement_increment_params(increments)
+    if changes:
+        await db.execute(engagement_increment, changes)
+    return increments
+
+
+async def record_heartbeats(db: AsyncSession, mentee_email: str, samples: list) -> dict:
+    """
+    Enregistre un lot de battements de lecture d'un mentee en un seul upsert
+    (voir crud.record_heartbeats).
+    """
+    rows = merge_heartbeats(mentee_email, samples)
+    unknown = []
+    try:
+        increments = await write_progress_batch(db, rows, progress_heartbeat_statement, max)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        video_ids = [row["video_id"] for row in rows]
+        existing = set((await db.scalars(select(Video.id).where(Video.id.in_(video_ids)))).all())
+        unknown = [video_id for video_id in video_ids if video_id not in existing]
+        rows = [row for row in rows if row["video_id"] in existing]
+        increments = {}
+        if rows:
+            increments = await write_progress_batch(db, rows, progress_heartbeat_statement, max)
+            await db.commit()
+    record_heartbeat_views(increments)
+    invalidate_video_progress(*[row["video_id"] for row in rows])
+    return {"updated": len(rows), "unknown_video_ids": unknown}
+
+
+# ==============================================================================
+# Avis
+# ==============================================================================
+async def add_review(db: AsyncSession, review_data: ReviewCreate):
+    """
+    Ajoute un avis à une vidéo et met à jour ses agrégats d'avis dans la même
+    transaction (voir crud.add_review).
+
+    Raises:
+        HTTPException: Si la vidéo n'existe pas (404) ou si l'avis est un doublon (400).
+    """
+    try:
+        video_exists = await db.scalar(select(Video.id).where(Video.id == review_data.video_id))
+        if not video_exists:
+            raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+
+        existing_review = await db.scalar(select(Review.id).where(
+            Review.video_id == review_data.video_id,
+            Review.mentee_email == review_data.mentee_email
+        ))
+        if existing_review:
+            raise HTTPException(status_code=400, detail="Vous avez déjà laissé un avis pour cette vidéo")
+
+        review = Review(
+            video_id=review_data.video_id,
+            mentee_email=review_data.mentee_email,
+            stars=review_data.stars,
+            comment=review_data.comment
+        )
+        db.add(review)
+        await db.execute(rating_aggregate_update(review_data.video_id, review_data.stars))
+        await db.commit()
+        invalidate_videos(review_data.video_id)
+        await db.refresh(review)
+        return review
+
+    except HTTPException as he:
+        raise he
+    except IntegrityError:
+        # Doublon simultané rejeté par l'index unique ix_reviews_video_mentee
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Vous avez déjà laissé un avis pour cette vidéo")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de l'ajout de l'avis: {e}")
+
+
+async def get_reviews_for_video(db: AsyncSession, video_id: int):
+    """
+    Récupère les avis d'une vidéo.
+    """
+    return (await db.scalars(select(Review).where(Review.video_id == video_id))).all()
+
+
+async def get_average_rating(db: AsyncSession, video_id: int):
+    """
+    Renvoie la note moyenne d'une vidéo à partir de ses agrégats (0 s'il n'y a pas d'avis).
+    """
+    row = (await db.execute(select(Video.review_count, Video.stars_sum).where(Video.id == video_id))).first()
+    if not row or not row.review_count:
+        return 0
+    return round(row.stars_sum / row.review_count, 2)
+
+
+async def get_rating_summary(db: AsyncSession, video_id: int):
+    """
+    Renvoie le résumé des notes d'une vidéo (nombre d'avis, moyenne, histogramme).
+
+    Raises:
+        HTTPException: Si la vidéo n'est pas trouvée.
+    """
+    row = (await db.execute(rating_summary_statement(video_id))).first()
+    return rating_summary_from_row(video_id, row)
+
+
+# ==============================================================================
+# Utilisateurs
+# ==============================================================================
+async def get_user_by_email(db: AsyncSession, email: str):
+    """
+    Récupère un utilisateur par son email, ou None.
+    """
+    return await db.scalar(select(User).where(User.email == email))
+
+
+async def create_user(db: AsyncSession, user_data: dict):
+    """
+    Crée un nouvel utilisateur.
+    """
+    user = User(**user_data)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    """
+    Récupère un utilisateur par son ID.
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    return user
+
+
+async def update_user(db: AsyncSession, user_id: int, update_data: dict):
+    """
+    Met à jour les informations d'un utilisateur.
+    """
+    user = await get_user(db, user_id)
+    for key, value in update_data.items():
+        setattr(user, key, value)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def delete_user(db: AsyncSession, user_id: int):
+    """
+    Supprime un utilisateur de la base de données.
+    """
+    user = await get_user(db, user_id)
+    await db.delete(user)
+    await db.commit()
+    return user
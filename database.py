@@ -1,42 +1,175 @@
+import threading
+
 # Importation des fonctions nécessaires depuis SQLAlchemy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-# Importation de l'URL de la base de données depuis le fichier de configuration
-from config import DATABASE_URL
+# Importation de la configuration (résolue au premier appel, pas à l'import)
+from config import get_settings
+import metrics
+import query_guard
+from pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_stats
 
 # ======================================================================
 # Configuration du moteur SQLAlchemy en fonction du type de base de données
 # ======================================================================
 
-# Vérification si l'URL de la base de données concerne SQLite.
-# SQLite nécessite un argument spécifique "check_same_thread" pour permettre
-# l'utilisation de la base de données dans un contexte multi-thread.
-if "sqlite" in DATABASE_URL.lower():
-    engine = create_engine(
-        DATABASE_URL,  # URL de connexion à la base de données SQLite
-        connect_args={"check_same_thread": False}  # Permet l'accès multi-thread
-    )
-else:
+_engine = None
+_async_engine = None
+# Création des moteurs : une requête (threadpool) et un thread de fond peuvent
+# demander le moteur en même temps, il ne doit être créé et instrumenté qu'une fois
+_engine_lock = threading.Lock()
+
+
+def _enable_sqlite_foreign_keys(engine):
+    # SQLite n'applique les clés étrangères (et ON DELETE CASCADE) que si on
+    # l'active explicitement sur chaque connexion.
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _pool_options() -> dict:
+    """
+    Paramètres du pool de connexions, lus dans la configuration (DATABASE_POOL_*).
+    Les valeurs s'appliquent à chaque processus (worker uvicorn).
+    """
+    settings = get_settings()
+    return {
+        "pool_size": settings.DATABASE_POOL_SIZE,  # Connexions maintenues dans le pool
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,  # Connexions supplémentaires en cas de pic
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,  # Renouvellement des connexions anciennes
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,  # Détection des connexions coupées
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,  # Attente maximale d'une connexion libre
+    }
+
+
+def _create_engine(database_url: str):
+    # Vérification si l'URL de la base de données concerne SQLite.
+    # SQLite nécessite un argument spécifique "check_same_thread" pour permettre
+    # l'utilisation de la base de données dans un contexte multi-thread.
+    if "sqlite" in database_url.lower():
+        engine = create_engine(
+            database_url,  # URL de connexion à la base de données SQLite
+            connect_args={"check_same_thread": False}  # Permet l'accès multi-thread
+        )
+        _enable_sqlite_foreign_keys(engine)
+        return engine
+
     # Pour les autres SGBD (ex : PostgreSQL, MySQL, etc.), on configure le pooling
-    engine = create_engine(
-        DATABASE_URL,  # URL de connexion à la base de données
-        pool_size=10,  # Nombre maximum de connexions à maintenir dans le pool
-        max_overflow=20  # Nombre maximum de connexions supplémentaires en cas de charge élevée
-    )
+    return create_engine(database_url, poolclass=TimedQueuePool, **_pool_options())
+
+
+def get_engine():
+    """
+    Renvoie le moteur SQLAlchemy, créé à la première utilisation.
+
+    Aucune connexion ni lecture de configuration n'a lieu à l'import du module.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine(get_settings().DATABASE_URL)
+                metrics.instrument_engine(engine)
+                query_guard.instrument_engine(engine)
+                _session_factory.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def _create_async_engine(database_url: str):
+    # Même configuration que le moteur synchrone, avec un pilote asynchrone
+    # (aiosqlite, aiomysql/asyncmy, asyncpg)
+    if "sqlite" in database_url.lower():
+        engine = create_async_engine(database_url)
+        _enable_sqlite_foreign_keys(engine.sync_engine)
+        return engine
+
+    return create_async_engine(database_url, poolclass=TimedAsyncAdaptedQueuePool, **_pool_options())
+
+
+def get_async_engine():
+    """
+    Renvoie le moteur SQLAlchemy asynchrone (DATABASE_ASYNC), créé à la première utilisation.
+
+    Le pilote asynchrone (ex : aiosqlite, aiomysql) n'est importé qu'à ce moment-là.
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                engine = _create_async_engine(get_settings().DATABASE_ASYNC_URL)
+                metrics.instrument_engine(engine.sync_engine)
+                query_guard.instrument_engine(engine.sync_engine)
+                _async_session_factory.configure(bind=engine)
+                _async_engine = engine
+    return _async_engine
+
+
+def get_pool_stats() -> dict:
+    """
+    Renvoie l'état des pools de connexions déjà créés (moteur synchrone et, le cas échéant, asynchrone).
+    """
+    stats = {}
+    if _engine is not None:
+        stats["sync"] = pool_stats(_engine)
+    if _async_engine is not None:
+        stats["async"] = pool_stats(_async_engine)
+    return stats
+
+
+async def dispose_async_engine():
+    """Ferme les connexions du moteur asynchrone s'il a été créé (arrêt de l'application)."""
+    global _async_engine
+    if _async_engine is not None:
+        engine, _async_engine = _async_engine, None
+        await engine.dispose()
+
+
+def __getattr__(name):
+    # Compatibilité : `database.engine` crée le moteur à la demande
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ======================================================================
 # Création d'une instance de session pour interagir avec la base de données
 # ======================================================================
 
-# SessionLocal est une usine (factory) qui crée de nouvelles sessions
-# SQLAlchemy configurées avec le moteur ci-dessus.
-SessionLocal = sessionmaker(
+# Usine (factory) de sessions, liée au moteur lors de sa création
+_session_factory = sessionmaker(
     autocommit=False,  # Désactive l'autocommit, il faut explicitement valider les transactions
     autoflush=False,  # Désactive l'autoflush pour un meilleur contrôle sur la synchronisation des objets avec la base
-    bind=engine  # Lie la session au moteur configuré
 )
 
+
+def SessionLocal():
+    """
+    Crée une nouvelle session SQLAlchemy, en créant le moteur au besoin.
+    """
+    get_engine()
+    return _session_factory()
+
+
+# Usine de sessions asynchrones. Les objets ne sont pas expirés au commit :
+# avec AsyncSession, un attribut expiré ne peut pas être rechargé implicitement
+# (pas d'accès paresseux à la base en dehors d'un `await`).
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def AsyncSessionLocal():
+    """
+    Crée une nouvelle session asynchrone (AsyncSession), en créant le moteur au besoin.
+    """
+    get_async_engine()
+    return _async_session_factory()
+
+
 # ======================================================================
 # Définition de la base de déclaration pour les modèles
 # ======================================================================
@@ -54,9 +187,9 @@ def get_db():
     """
     Générateur de sessions de base de données.
 
-    Ce générateur est utile dans un contexte d'injection de dépendances,
-    par exemple dans des applications FastAPI, afin de fournir une session
-    pour chaque requête et de garantir sa fermeture après utilisation.
+    Dépendance FastAPI unique de tous les routeurs synchrones : fournit une
+    session pour chaque requête et garantit sa fermeture (retour de la
+    connexion au pool) après utilisation.
 
     Yields:
         db: Une instance de session SQLAlchemy.
@@ -69,3 +202,14 @@ def get_db():
     finally:
         # Assure la fermeture de la session même en cas d'exception
         db.close()
+
+
+async def get_async_db():
+    """
+    Équivalent asynchrone de get_db, pour les endpoints `async def` (DATABASE_ASYNC).
+
+    Yields:
+        db: Une instance d'AsyncSession.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
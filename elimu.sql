@@ -20,7 +20,17 @@ CREATE TABLE IF NOT EXISTS videos (
     views INT DEFAULT 0,                            -- Nombre de vues
     likes INT DEFAULT 0,                            -- Nombre de likes
     stars FLOAT DEFAULT 0.0,                        -- Évaluation en étoiles (optionnelle si calculée dynamiquement)
-    `order` INT NOT NULL                           -- Ordre d'affichage ; important pour le tri
+    review_count INT NOT NULL DEFAULT 0,            -- Nombre total d'avis (agrégat maintenu à chaque avis)
+    stars_sum INT NOT NULL DEFAULT 0,               -- Somme des étoiles de tous les avis
+    stars_1 INT NOT NULL DEFAULT 0,                 -- Histogramme : nombre d'avis à 1 étoile
+    stars_2 INT NOT NULL DEFAULT 0,                 -- Histogramme : nombre d'avis à 2 étoiles
+    stars_3 INT NOT NULL DEFAULT 0,                 -- Histogramme : nombre d'avis à 3 étoiles
+    stars_4 INT NOT NULL DEFAULT 0,                 -- Histogramme : nombre d'avis à 4 étoiles
+    stars_5 INT NOT NULL DEFAULT 0,                 -- Histogramme : nombre d'avis à 5 étoiles
+    viewer_count INT NOT NULL DEFAULT 0,            -- Nombre de mentees ayant regardé la vidéo
+    watch_count INT NOT NULL DEFAULT 0,             -- Nombre total de visionnages (somme des progressions)
+    `order` INT NOT NULL,                          -- Ordre d'affichage ; important pour le tri
+    updated_at DATETIME NULL                        -- Date de la dernière modification (export incrémental)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- ======================================================================
@@ -33,6 +43,11 @@ CREATE TABLE IF NOT EXISTS progress (
     video_id INT NOT NULL,                          -- Référence à l'ID de la vidéo dans la table "videos"
     mentee_email VARCHAR(100) NOT NULL,             -- Email du mentee (utilisateur) suivant la vidéo
     watched INT DEFAULT 0,                          -- Quantité de vidéo visionnée (par exemple, en secondes ou en pourcentage)
+    last_position INT NOT NULL DEFAULT 0,           -- Position du dernier battement de lecture (secondes)
+    max_position INT NOT NULL DEFAULT 0,            -- Position la plus avancée atteinte (secondes)
+    completed BOOLEAN NOT NULL DEFAULT FALSE,       -- Vidéo regardée jusqu'au bout
+    updated_at DATETIME NULL,                       -- Date de la dernière modification (export incrémental)
+    CONSTRAINT uq_progress_video_mentee UNIQUE (video_id, mentee_email),  -- Une progression par couple (vidéo, mentee)
     CONSTRAINT fk_video_progress FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -67,10 +82,56 @@ CREATE TABLE IF NOT EXISTS users (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP      -- Date de création du compte
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- ======================================================================
+-- Création de la table "job_cursors"
+-- Position de reprise des tâches de fond (ex : rafraîchissement des statistiques).
+-- ======================================================================
+CREATE TABLE IF NOT EXISTS job_cursors (
+    name VARCHAR(100) PRIMARY KEY,                  -- Nom de la tâche
+    position INT NOT NULL DEFAULT 0,                -- Dernier identifiant traité
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- Date de la dernière mise à jour
+    quota_day DATE NULL,                            -- Jour auquel se rapporte quota_used
+    quota_used INT NOT NULL DEFAULT 0               -- Appels à une API externe déjà effectués ce jour-là
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ======================================================================
+-- Création de la table "video_activity"
+-- Nombre de visionnages par vidéo et par jour (classements, 31 jours conservés).
+-- ======================================================================
+CREATE TABLE IF NOT EXISTS video_activity (
+    video_id INT NOT NULL,                          -- Vidéo regardée
+    day DATE NOT NULL,                              -- Journée (UTC)
+    watched INT NOT NULL DEFAULT 0,                 -- Nombre de visionnages ce jour-là
+    PRIMARY KEY (video_id, day),
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ======================================================================
+-- Création de la table "leaderboard_entries"
+-- Classements précalculés des vidéos (GET /leaderboards/{board}).
+-- ======================================================================
+CREATE TABLE IF NOT EXISTS leaderboard_entries (
+    board VARCHAR(30) NOT NULL,                     -- Nom du classement (ex : top-rated, trending)
+    category VARCHAR(100) NOT NULL,                 -- Catégorie ('' : toutes catégories)
+    `rank` INT NOT NULL,                            -- Rang, à partir de 1
+    video_id INT NOT NULL,                          -- Vidéo classée
+    score FLOAT NOT NULL,                           -- Score ayant déterminé le rang
+    PRIMARY KEY (board, category, `rank`),
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- ======================================================================
 -- Création d'index pour optimiser les requêtes sur les emails
+-- et les requêtes fréquentes (création de vidéo, catalogue, avis)
 -- ======================================================================
-CREATE INDEX idx_mentor_email ON videos(mentor_email);
+CREATE INDEX ix_videos_mentor_category_order ON videos(mentor_email, category, `order`);
+CREATE INDEX ix_videos_category_order_id ON videos(category, `order`, id);
+CREATE UNIQUE INDEX ix_reviews_video_mentee ON reviews(video_id, mentee_email);   -- Un avis par mentee et par vidéo
+CREATE INDEX ix_videos_updated_at ON videos(updated_at);
+CREATE INDEX ix_progress_updated_at ON progress(updated_at);
+CREATE INDEX ix_reviews_created_at ON reviews(created_at);
+CREATE INDEX ix_video_activity_day_video ON video_activity(day, video_id);   -- Classements (leaderboards.py)
+CREATE FULLTEXT INDEX ix_videos_search ON videos(title, description);   -- Recherche (GET /videos/search)
 CREATE INDEX idx_mentee_email_progress ON progress(mentee_email);
 CREATE INDEX idx_mentee_email_reviews ON reviews(mentee_email);
 CREATE INDEX idx_user_email ON users(email);
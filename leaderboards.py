@@ -0,0 +1,371 @@
+"""
+Classements précalculés des vidéos (GET /leaderboards/{board}).
+
+- "top-rated" : meilleure note, en note bayésienne (les agrégats d'avis tenus
+  à jour par crud.add_review, complétés par LEADERBOARD_RATING_PRIOR avis
+  fictifs à la note moyenne globale : une vidéo n'est pas en tête sur un seul
+  avis 5 étoiles) ;
+- "most-watched-7d" / "most-watched-30d" : nombre de visionnages
+  (POST /progress/) sur les 7 / 30 derniers jours ;
+- "trending" : visionnages des 7 derniers jours, dont le poids diminue de
+  moitié tous les LEADERBOARD_TRENDING_HALF_LIFE_DAYS jours (vitesse de
+  progression récente).
+
+Chaque classement existe toutes catégories confondues et par catégorie.
+
+Les visionnages sont comptés en mémoire par crud.track_progress, par vidéo et
+par jour (aucune requête supplémentaire sur le chemin de POST /progress/), et
+seulement pendant que la tâche de fond tourne dans le processus : c'est elle
+qui les écrit. Une tâche de fond les ajoute périodiquement à la table video_activity, puis
+recalcule les classements et les écrit dans la table leaderboard_entries,
+d'où une lecture ne coûte qu'une requête sur les k premiers rangs (clé
+primaire board, category, rank).
+
+Avec plusieurs workers uvicorn, chacun écrit ses propres visionnages ; un seul
+recalcule les classements par intervalle (verrou optimiste sur la ligne
+"leaderboards" de job_cursors). La tâche tourne dans un thread démarré par le
+lifespan FastAPI si LEADERBOARD_REFRESH_ENABLED est activé (désactivé par
+défaut, comme les autres tâches de fond), ou ponctuellement
+via `python manage.py refresh-leaderboards`. Les classements de visionnages
+("most-watched-*", "trending") exigent la tâche de fond des workers :
+manage.py, lancé dans un autre processus, ne fait que recalculer les
+classements à partir des visionnages déjà écrits par les workers.
+"""
+import heapq
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from config import get_settings
+from database import SessionLocal
+from models import JobCursor, LeaderboardEntry, Video, VideoActivity
+from response_cache import get_response_cache, leaderboard_key
+
+logger = logging.getLogger(__name__)
+
+# Nom de la tâche dans la table job_cursors (date du dernier calcul)
+CURSOR_NAME = "leaderboards"
+
+# Classements disponibles
+BOARDS = ("top-rated", "most-watched-7d", "most-watched-30d", "trending")
+# Catégorie des classements toutes catégories confondues
+ALL_CATEGORIES = ""
+
+# Fenêtre (jours) des classements de visionnages
+WATCH_WINDOWS_DAYS = {"most-watched-7d": 7, "most-watched-30d": 30, "trending": 7}
+# Durée de conservation (jours) des compteurs de video_activity
+ACTIVITY_RETENTION_DAYS = 31
+
+
+class ActivityCounter:
+    """
+    Visionnages pas encore écrits en base, par couple (ID de vidéo, jour UTC).
+
+    Les visionnages ne sont comptés que lorsque `enabled` est vrai (tâche de
+    fond démarrée : personne d'autre ne vide le compteur), et au plus
+    `max_keys` couples sont en attente : au-delà (écritures en échec), les
+    visionnages de nouveaux couples sont ignorés et comptés dans `dropped`.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.enabled = False
+        self.dropped = 0
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, video_id: int, watched: int = 1):
+        if not self.enabled:
+            return
+        key = (video_id, datetime.utcnow().date())
+        with self._lock:
+            if key not in self._counts and len(self._counts) >= self.max_keys:
+                self.dropped += watched
+                return
+            self._counts[key] += watched
+
+    def drain(self) -> Counter:
+        """Retire et renvoie tous les compteurs en attente."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            return counts
+
+    def restore(self, counts: Counter):
+        """Remet en attente des compteurs dont l'écriture a échoué (dans la limite de max_keys)."""
+        with self._lock:
+            for key, watched in counts.items():
+                if key in self._counts or len(self._counts) < self.max_keys:
+                    self._counts[key] += watched
+                else:
+                    self.dropped += watched
+
+    def __len__(self):
+        return len(self._counts)
+
+
+# Visionnages depuis la dernière passe (alimenté par crud.track_progress,
+# activé par LeaderboardRefresher.start())
+watch_activity = ActivityCounter()
+
+
+def activity_upsert_statement(db, rows: list):
+    """
+    Construit l'upsert qui ajoute `watched` au compteur (video_id, day) de
+    video_activity, ou crée la ligne (même principe que crud.progress_upsert_statement).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql_insert(VideoActivity).values(rows)
+        return stmt.on_duplicate_key_update(watched=VideoActivity.watched + stmt.inserted.watched)
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(VideoActivity).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[VideoActivity.video_id, VideoActivity.day],
+            set_={"watched": VideoActivity.watched + stmt.excluded.watched},
+        )
+    raise NotImplementedError(f"Upsert d'activité non supporté pour le dialecte {dialect}")
+
+
+def top(scores: dict, size: int) -> list:
+    """Les `size` meilleurs couples (score, -ID de vidéo) ; à score égal, la vidéo la plus ancienne d'abord."""
+    return heapq.nlargest(size, ((score, -video_id) for video_id, score in scores.items() if score > 0))
+
+
+class LeaderboardRefresher:
+    """
+    Écrit les visionnages en attente et recalcule les classements.
+
+    Les paramètres non fournis sont lus dans la configuration (get_settings).
+
+    Args:
+        session_factory: Fabrique de sessions SQLAlchemy.
+        size (int): Nombre de vidéos par classement.
+        rating_prior (float): Nombre d'avis fictifs de la note bayésienne.
+        half_life_days (float): Demi-vie (jours) d'un visionnage dans "trending".
+        interval_seconds (float): Délai entre deux calculs.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        size: int = None,
+        rating_prior: float = None,
+        half_life_days: float = None,
+        interval_seconds: float = None,
+    ):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.size = settings.LEADERBOARD_SIZE if size is None else size
+        self.rating_prior = settings.LEADERBOARD_RATING_PRIOR if rating_prior is None else rating_prior
+        self.half_life_days = settings.LEADERBOARD_TRENDING_HALF_LIFE_DAYS if half_life_days is None else half_life_days
+        self.interval_seconds = (
+            settings.LEADERBOARD_REFRESH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # --------------------------------------------------------------------------
+    # Visionnages
+    # --------------------------------------------------------------------------
+    def flush_activity(self, db) -> int:
+        """
+        Ajoute les visionnages en attente à video_activity, en un seul upsert ;
+        ceux de vidéos supprimées entre-temps sont ignorés.
+
+        Returns:
+            Le nombre de couples (vidéo, jour) écrits.
+        """
+        counts = watch_activity.drain()
+        if not counts:
+            return 0
+        try:
+            existing = set(db.scalars(select(Video.id).where(Video.id.in_({video_id for video_id, _ in counts}))))
+            rows = [
+                {"video_id": video_id, "day": day, "watched": watched}
+                for (video_id, day), watched in counts.items() if video_id in existing
+            ]
+            if rows:
+                db.execute(activity_upsert_statement(db, rows))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Réessayé à la passe suivante
+            watch_activity.restore(counts)
+            raise
+        return len(rows)
+
+    # --------------------------------------------------------------------------
+    # Calcul des classements
+    # --------------------------------------------------------------------------
+    def _claim(self, db, now: datetime, force: bool) -> bool:
+        """
+        Réserve le calcul pour ce worker : la date du dernier calcul n'est avancée
+        que si elle est plus ancienne que la moitié de l'intervalle (ou si `force`).
+        """
+        if db.get(JobCursor, CURSOR_NAME) is None:
+            try:
+                db.add(JobCursor(name=CURSOR_NAME, position=0, updated_at=datetime(1970, 1, 1)))
+                db.commit()
+            except IntegrityError:
+                # Créée au même moment par un autre worker
+                db.rollback()
+        stmt = update(JobCursor).where(JobCursor.name == CURSOR_NAME).values(updated_at=now)
+        if not force:
+            stmt = stmt.where(JobCursor.updated_at <= now - timedelta(seconds=self.interval_seconds / 2))
+        claimed = db.execute(stmt).rowcount == 1
+        db.commit()
+        return claimed
+
+    def compute(self, db, today: date = None) -> dict:
+        """
+        Calcule les classements à partir des agrégats d'avis des vidéos et de video_activity.
+
+        Returns:
+            Dictionnaire {(classement, catégorie): [(score, -ID de vidéo)] du premier au dernier rang}.
+        """
+        today = today or datetime.utcnow().date()
+        categories = {}
+        ratings = {}
+        review_total = stars_total = 0
+        for video_id, category, review_count, stars_sum in db.execute(
+            select(Video.id, Video.category, Video.review_count, Video.stars_sum)
+        ):
+            categories[video_id] = category
+            if review_count:
+                ratings[video_id] = (review_count, stars_sum)
+                review_total += review_count
+                stars_total += stars_sum
+
+        # Note bayésienne : moyenne des avis de la vidéo et de `rating_prior` avis à la moyenne globale
+        prior_sum = self.rating_prior * stars_total / review_total if review_total else 0.0
+        scores = {"top-rated": {
+            video_id: (prior_sum + stars_sum) / (self.rating_prior + review_count)
+            for video_id, (review_count, stars_sum) in ratings.items()
+        }}
+        scores.update({board: defaultdict(float) for board in WATCH_WINDOWS_DAYS})
+        for video_id, day, watched in db.execute(
+            select(VideoActivity.video_id, VideoActivity.day, VideoActivity.watched)
+            .where(VideoActivity.day > today - timedelta(days=max(WATCH_WINDOWS_DAYS.values())))
+        ):
+            age = (today - day).days
+            for board, window in WATCH_WINDOWS_DAYS.items():
+                if age < window:
+                    weight = 0.5 ** (age / self.half_life_days) if board == "trending" else 1
+                    scores[board][video_id] += watched * weight
+
+        boards = {}
+        for board, board_scores in scores.items():
+            by_category = defaultdict(dict)
+            for video_id, score in board_scores.items():
+                if video_id in categories:
+                    by_category[categories[video_id]][video_id] = score
+            boards[(board, ALL_CATEGORIES)] = top(board_scores, self.size)
+            for category, category_scores in by_category.items():
+                boards[(board, category)] = top(category_scores, self.size)
+        return boards
+
+    def _write(self, db, boards: dict, now: datetime) -> int:
+        """Remplace le contenu de leaderboard_entries, dans une seule transaction."""
+        rows = [
+            {"board": board, "category": category, "rank": rank, "video_id": -negative_id, "score": score}
+            for (board, category), entries in boards.items()
+            for rank, (score, negative_id) in enumerate(entries, start=1)
+        ]
+        db.execute(delete(LeaderboardEntry))
+        if rows:
+            db.execute(insert(LeaderboardEntry), rows)
+        db.execute(update(JobCursor).where(JobCursor.name == CURSOR_NAME).values(updated_at=now))
+        db.commit()
+        get_response_cache().invalidate(*[leaderboard_key(board) for board in BOARDS])
+        return len(rows)
+
+    def run_once(self, force: bool = False) -> dict:
+        """
+        Écrit les visionnages en attente puis, si aucun autre worker ne l'a fait
+        depuis moins d'un demi-intervalle (ou si `force`), recalcule les classements.
+
+        Returns:
+            Résumé de la passe : couples (vidéo, jour) écrits, classements recalculés ou non, lignes écrites.
+        """
+        summary = {"activity": 0, "computed": False, "entries": 0}
+        db = self.session_factory()
+        try:
+            summary["activity"] = self.flush_activity(db)
+            now = datetime.utcnow()
+            if not self._claim(db, now, force):
+                return summary
+            db.execute(delete(VideoActivity).where(
+                VideoActivity.day < now.date() - timedelta(days=ACTIVITY_RETENTION_DAYS)
+            ))
+            summary["entries"] = self._write(db, self.compute(db, now.date()), datetime.utcnow())
+            summary["computed"] = True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return summary
+
+    # --------------------------------------------------------------------------
+    # Exécution périodique
+    # --------------------------------------------------------------------------
+    def start(self):
+        """Démarre les passes périodiques dans un thread de fond, et le comptage des visionnages."""
+        self._stopped.clear()
+        watch_activity.enabled = True
+        self._thread = threading.Thread(target=self._run, name="leaderboard-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de fond et le comptage, puis écrit les visionnages encore en mémoire."""
+        watch_activity.enabled = False
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        db = self.session_factory()
+        try:
+            self.flush_activity(db)
+        except Exception:
+            logger.exception("Échec de l'écriture des derniers visionnages")
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                summary = self.run_once()
+                logger.info("Calcul des classements : %s", summary)
+            except Exception:
+                logger.exception("Échec du calcul des classements des vidéos")
+
+
+# ==============================================================================
+# Instance globale, créée au démarrage de l'application si la tâche est activée
+# ==============================================================================
+_refresher = None
+
+
+def start_leaderboard_refresher():
+    """Crée et démarre la tâche de fond si LEADERBOARD_REFRESH_ENABLED est activé."""
+    global _refresher
+    if get_settings().LEADERBOARD_REFRESH_ENABLED and _refresher is None:
+        _refresher = LeaderboardRefresher()
+        _refresher.start()
+    return _refresher
+
+
+def stop_leaderboard_refresher():
+    """Arrête la tâche de fond si elle a été démarrée."""
+    global _refresher
+    if _refresher is not None:
+        refresher, _refresher = _refresher, None
+        refresher.stop()
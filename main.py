@@ -1,9 +1,64 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import video, progress, reviews, user
+import database
+import leaderboards
+import metrics
+import progress_buffer
+import query_guard
+import stats_refresher
+import youtube_api
+import youtube_async
+from config import get_settings
+from routers import async_db, export, leaderboard, monitoring, video, progress, reviews, user
+
+
+def use_async_routes(app: FastAPI):
+    """
+    Place les endpoints asynchrones (routers/async_db.py) devant les routes
+    synchrones de mêmes chemins, qu'ils remplacent. Sans effet si c'est déjà fait.
+    """
+    if getattr(app.state, "async_routes", False):
+        return
+    first_new = len(app.router.routes)
+    app.include_router(async_db.router)
+    async_routes = app.router.routes[first_new:]
+    del app.router.routes[first_new:]
+    app.router.routes[0:0] = async_routes
+    app.openapi_schema = None
+    app.state.async_routes = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Les clients et tâches de fond sont créés ici, et non à l'import des modules :
+    # importer l'application ne fait ni appel réseau ni connexion à la base.
+    # Pile base de données asynchrone (si DATABASE_ASYNC est activé)
+    if get_settings().DATABASE_ASYNC:
+        use_async_routes(app)
+    # Démarrage : client YouTube asynchrone
+    youtube_async.start_async_client()
+    # Démarrage : tampon de progression (si activé)
+    progress_buffer.start_progress_buffer()
+    # Démarrage : rafraîchissement des statistiques YouTube (si activé)
+    stats_refresher.start_stats_refresher()
+    # Démarrage : calcul périodique des classements (si activé)
+    leaderboards.start_leaderboard_refresher()
+    yield
+    # Arrêt : écrit les visionnages encore en mémoire
+    leaderboards.stop_leaderboard_refresher()
+    stats_refresher.stop_stats_refresher()
+    # Arrêt : écrit les incréments de progression encore en mémoire
+    progress_buffer.stop_progress_buffer()
+    # Ferme les connexions des clients YouTube
+    await youtube_async.close_async_client()
+    youtube_api.close_session()
+    await database.dispose_async_engine()
+
 
-app = FastAPI(title="Elimu Backend")
+app = FastAPI(title="Elimu Backend", lifespan=lifespan)
 
 # Maintenant on autorise aussi localhost:4200 (Angular dev) et, si besoin, l'URL de ton front en production
 ALLOWED_ORIGINS = [
@@ -23,11 +78,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],   # tu peux élargir à "*" pour ne rien bloquer
 )
+# Budget de requêtes SQL et détection des N+1 (QUERY_GUARD_MODE, désactivé par défaut)
+app.add_middleware(query_guard.QueryGuardMiddleware)
+# Mesure de chaque requête (latence, statut, requêtes SQL), exposée sur GET /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(video.router, prefix="/videos", tags=["Videos"])
 app.include_router(progress.router, prefix="/progress", tags=["Progression"])
 app.include_router(reviews.router, prefix="", tags=["Reviews"])
 app.include_router(user.router, prefix="/users", tags=["Users"])
+app.include_router(monitoring.router, prefix="/monitoring", tags=["Monitoring"])
+app.include_router(monitoring.metrics_router, tags=["Monitoring"])
+app.include_router(export.router, prefix="/export", tags=["Export"])
+app.include_router(leaderboard.router, prefix="/leaderboards", tags=["Leaderboards"])
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,160 @@
+"""
+Commandes d'administration ponctuelles.
+
+Usage :
+    python manage.py reconcile-ratings
+    python manage.py reconcile-counters
+    python manage.py refresh-stats [--max-calls N]
+    python manage.py import-users FICHIER [--format csv|ndjson]
+    python manage.py import-progress FICHIER [--format csv|ndjson]
+    python manage.py rebuild-search-index
+    python manage.py refresh-leaderboards
+"""
+import argparse
+import os
+
+from sqlalchemy import func, select, text
+
+import bulk_import
+import crud
+from database import SessionLocal
+from leaderboards import LeaderboardRefresher
+from models import VIDEO_SEARCH_SQLITE_DDL, VIDEO_SEARCH_SQLITE_REBUILD, Video
+from stats_refresher import StatsRefresher
+
+
+def reconcile_ratings(args):
+    """
+    Recalcule les agrégats d'avis (nombre, somme, histogramme, moyenne) de toutes les vidéos.
+    """
+    db = SessionLocal()
+    try:
+        updated = crud.reconcile_rating_aggregates(db)
+        print(f"{updated} vidéo(s) corrigée(s)")
+    finally:
+        db.close()
+
+
+def reconcile_counters(args):
+    """
+    Recalcule les compteurs dénormalisés de toutes les vidéos : nombre de
+    spectateurs et de visionnages (table progress), agrégats d'avis (table reviews).
+    """
+    db = SessionLocal()
+    try:
+        engagement = crud.reconcile_engagement_counters(db)
+        ratings = crud.reconcile_rating_aggregates(db)
+        print(f"{engagement} vidéo(s) corrigée(s) (visionnages), {ratings} vidéo(s) corrigée(s) (avis)")
+    finally:
+        db.close()
+
+
+def refresh_stats(args):
+    """
+    Effectue une passe de rafraîchissement des vues et likes des vidéos depuis YouTube.
+    """
+    summary = StatsRefresher().run_once(max_calls=args.max_calls)
+    print(
+        f"{summary['calls']} appel(s) à l'API, {summary['checked']} vidéo(s) vérifiée(s), "
+        f"{summary['updated']} mise(s) à jour, curseur : {summary['cursor']}"
+    )
+
+
+def import_file(args):
+    """
+    Importe en masse des utilisateurs ou un historique de progression depuis un
+    fichier CSV ou NDJSON (format déduit de l'extension si --format est absent).
+    """
+    import_format = args.format or ("csv" if os.path.splitext(args.path)[1].lower() == ".csv" else "ndjson")
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            result = args.importer(db, lines, import_format)
+    finally:
+        db.close()
+    for error in result["errors"]:
+        print(f"ligne {error['line']} : {error['detail']}")
+    if result["error_count"] > len(result["errors"]):
+        print(f"... ({result['error_count'] - len(result['errors'])} autre(s) erreur(s) non détaillée(s))")
+    print(f"{result['imported']} ligne(s) importée(s), {result['error_count']} ligne(s) refusée(s)")
+
+
+def rebuild_search_index(args):
+    """
+    Crée au besoin puis reconstruit l'index de recherche des vidéos d'une base
+    SQLite (table FTS5 videos_fts), par exemple pour une base créée avant son
+    introduction. Sous MySQL, l'index FULLTEXT est créé par la migration 006
+    et tenu à jour par MySQL.
+    """
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "sqlite":
+            print("Rien à faire : l'index FULLTEXT est tenu à jour par MySQL (voir migrations/006_video_search.sql)")
+            return
+        for statement in VIDEO_SEARCH_SQLITE_DDL + (VIDEO_SEARCH_SQLITE_REBUILD,):
+            db.execute(text(statement))
+        db.commit()
+        print(f"Index de recherche reconstruit : {db.scalar(select(func.count(Video.id)))} vidéo(s)")
+    finally:
+        db.close()
+
+
+def refresh_leaderboards(args):
+    """
+    Recalcule immédiatement les classements des vidéos (GET /leaderboards/...),
+    même si la tâche de fond d'un worker vient de le faire.
+    """
+    summary = LeaderboardRefresher().run_once(force=True)
+    print(f"{summary['entries']} ligne(s) de classement écrite(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commandes d'administration Elimu")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-ratings",
+        help="Recalcule les agrégats d'avis des vidéos à partir de la table reviews",
+    )
+    reconcile.set_defaults(func=reconcile_ratings)
+
+    counters = subparsers.add_parser(
+        "reconcile-counters",
+        help="Recalcule les compteurs des vidéos (spectateurs, visionnages, avis) à partir des tables progress et reviews",
+    )
+    counters.set_defaults(func=reconcile_counters)
+
+    refresh = subparsers.add_parser(
+        "refresh-stats",
+        help="Rafraîchit les vues et likes des vidéos depuis YouTube (reprend au dernier curseur)",
+    )
+    refresh.add_argument("--max-calls", type=int, default=None, help="Nombre maximal d'appels à l'API YouTube")
+    refresh.set_defaults(func=refresh_stats)
+
+    for name, importer, help_text in (
+        ("import-users", bulk_import.import_users, "Importe des utilisateurs depuis un fichier CSV ou NDJSON"),
+        ("import-progress", bulk_import.import_progress, "Importe un historique de progression depuis un fichier CSV ou NDJSON"),
+    ):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("path", help="Chemin du fichier à importer")
+        command.add_argument("--format", choices=bulk_import.IMPORT_FORMATS, default=None, help="Format du fichier")
+        command.set_defaults(func=import_file, importer=importer)
+
+    search_index = subparsers.add_parser(
+        "rebuild-search-index",
+        help="Crée et reconstruit l'index de recherche plein texte des vidéos (SQLite)",
+    )
+    search_index.set_defaults(func=rebuild_search_index)
+
+    leaderboards = subparsers.add_parser(
+        "refresh-leaderboards",
+        help="Recalcule les classements des vidéos (meilleures notes, plus regardées, tendances)",
+    )
+    leaderboards.set_defaults(func=refresh_leaderboards)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
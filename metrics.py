@@ -0,0 +1,359 @@
+"""
+Métriques de l'application au format texte de Prometheus (GET /metrics).
+
+- Requêtes HTTP : nombre par route et code de statut, histogramme des
+  latences par route (gabarit de chemin, ex : /videos/{video_id}), requêtes
+  en cours (MetricsMiddleware, middleware ASGI sans BaseHTTPMiddleware).
+- Base de données : nombre et durée des requêtes SQL, au total et par requête
+  HTTP (événements before/after_cursor_execute des moteurs, voir
+  instrument_engine), état des pools de connexions.
+- API YouTube : nombre d'appels par client (sync/async) et par issue
+  (ok, retry, error), histogramme de leur durée.
+- Caches de réponses et de métadonnées YouTube : succès, échecs, entrées.
+
+Les métriques sont propres au processus : avec plusieurs workers uvicorn,
+chaque worker expose les siennes (Prometheus les distingue par instance).
+Le coût sur le chemin chaud se limite à quelques perf_counter() et
+incréments sous verrou par requête ; les états (pools, caches) ne sont lus
+qu'au moment de la collecte.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Bornes (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes des histogrammes du nombre de requêtes SQL par requête HTTP
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone, éventuellement ventilé par étiquettes."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Histogramme à bornes fixes, éventuellement ventilé par étiquettes."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # étiquettes -> [effectif de chaque intervalle (dernier : au-delà de la dernière borne), somme]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels(self.labelnames + ("le",), labels + (_format_value(float(bound)),)),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class Gauge:
+    """Valeur instantanée, éventuellement ventilée par étiquettes."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Collected:
+    """
+    Métrique lue au moment de la collecte : `collect()` renvoie {étiquettes: valeur}.
+    Sert à exposer des compteurs ou états tenus ailleurs (pools, caches).
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: tuple, collect):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+# ==============================================================================
+# Métriques de l'application
+# ==============================================================================
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Nombre de requêtes HTTP traitées.", ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Durée de traitement des requêtes HTTP.", ("method", "route")
+)
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "Requêtes HTTP en cours de traitement.", ("method",))
+
+DB_QUERIES = Counter("db_queries_total", "Nombre de requêtes SQL exécutées.")
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "Durée d'exécution des requêtes SQL.")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "Nombre de requêtes SQL par requête HTTP.", ("route",), QUERY_COUNT_BUCKETS
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request", "Temps passé en requêtes SQL par requête HTTP.", ("route",)
+)
+
+# Dépassements signalés par query_guard (QUERY_GUARD_MODE)
+DB_QUERY_BUDGET_EXCEEDED = Counter(
+    "db_query_budget_exceeded_total",
+    "Requêtes HTTP ayant dépassé leur budget de requêtes SQL (budget) ou répété une requête (n_plus_one).",
+    ("route", "reason"),
+)
+YOUTUBE_REQUESTS = Counter(
+    "youtube_api_requests_total",
+    "Appels à l'API YouTube, par client et par issue (ok, retry : échec temporaire, error).",
+    ("client", "outcome"),
+)
+YOUTUBE_LATENCY = Histogram("youtube_api_request_duration_seconds", "Durée des appels à l'API YouTube.", ("client",))
+
+
+def _pool_values(key: str, scale: float = 1):
+    def collect():
+        import database
+
+        return {(engine,): stats[key] * scale for engine, stats in database.get_pool_stats().items() if key in stats}
+    return collect
+
+
+def _cache_values(get_stats, key: str):
+    def collect():
+        stats = get_stats()
+        return {(): stats[key]} if stats else {}
+    return collect
+
+
+def _response_cache_stats():
+    from response_cache import get_response_cache
+
+    return get_response_cache().stats()
+
+
+def _youtube_cache_stats():
+    import youtube_cache
+
+    # Le cache n'est pas créé pour la collecte s'il n'a pas encore servi
+    cache = youtube_cache._youtube_cache
+    return cache.stats() if cache is not None else None
+
+
+REGISTRY = [
+    HTTP_REQUESTS,
+    HTTP_LATENCY,
+    HTTP_IN_PROGRESS,
+    DB_QUERIES,
+    DB_QUERY_LATENCY,
+    DB_QUERIES_PER_REQUEST,
+    DB_SECONDS_PER_REQUEST,
+    DB_QUERY_BUDGET_EXCEEDED,
+    Collected("db_pool_size", "Taille du pool de connexions.", "gauge", ("engine",), _pool_values("size")),
+    Collected("db_pool_checked_out", "Connexions actuellement prises.", "gauge", ("engine",), _pool_values("checked_out")),
+    Collected("db_pool_idle", "Connexions libres dans le pool.", "gauge", ("engine",), _pool_values("idle")),
+    Collected(
+        "db_pool_overflow", "Connexions ouvertes au-delà de la taille du pool.", "gauge", ("engine",), _pool_values("overflow")
+    ),
+    Collected(
+        "db_pool_checkouts_total", "Obtentions de connexion depuis le pool.", "counter", ("engine",), _pool_values("checkouts")
+    ),
+    Collected(
+        "db_pool_timeouts_total", "Attentes de connexion ayant dépassé le délai.", "counter", ("engine",),
+        _pool_values("timeouts"),
+    ),
+    Collected(
+        "db_pool_wait_seconds_total", "Temps cumulé d'attente d'une connexion libre.", "counter", ("engine",),
+        _pool_values("wait_ms_total", scale=0.001),
+    ),
+    YOUTUBE_REQUESTS,
+    YOUTUBE_LATENCY,
+    Collected("response_cache_entries", "Réponses en cache.", "gauge", (), _cache_values(_response_cache_stats, "entries")),
+    Collected("response_cache_hits_total", "Réponses servies depuis le cache.", "counter", (),
+              _cache_values(_response_cache_stats, "hits")),
+    Collected("response_cache_misses_total", "Réponses absentes du cache.", "counter", (),
+              _cache_values(_response_cache_stats, "misses")),
+    Collected("response_cache_not_modified_total", "Réponses 304 (If-None-Match).", "counter", (),
+              _cache_values(_response_cache_stats, "not_modified")),
+    Collected("youtube_cache_entries", "Métadonnées YouTube en cache.", "gauge", (),
+              _cache_values(_youtube_cache_stats, "entries")),
+    Collected("youtube_cache_hits_total", "Métadonnées YouTube servies depuis le cache.", "counter", (),
+              _cache_values(_youtube_cache_stats, "hits")),
+    Collected("youtube_cache_negative_hits_total", "Vidéos introuvables servies depuis le cache.", "counter", (),
+              _cache_values(_youtube_cache_stats, "negative_hits")),
+    Collected("youtube_cache_misses_total", "Métadonnées YouTube absentes du cache.", "counter", (),
+              _cache_values(_youtube_cache_stats, "misses")),
+]
+
+
+def render() -> str:
+    """Renvoie toutes les métriques au format texte de Prometheus (version 0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ==============================================================================
+# Requêtes SQL par requête HTTP
+# ==============================================================================
+class QueryStats:
+    """Nombre et durée cumulée des requêtes SQL d'une requête HTTP."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Statistiques de la requête HTTP en cours ; la valeur (objet mutable) est
+# partagée avec le threadpool et les greenlets SQLAlchemy, qui copient le contexte
+current_queries: ContextVar = ContextVar("current_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = current_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(engine):
+    """Compte et chronomètre les requêtes SQL d'un moteur (synchrone, ou sync_engine d'un moteur asynchrone)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ==============================================================================
+# Middleware HTTP
+# ==============================================================================
+class MetricsMiddleware:
+    """
+    Mesure chaque requête HTTP : durée, code de statut, requêtes SQL exécutées.
+
+    La route est le gabarit de chemin de la route FastAPI (scope["route"]),
+    ou "unmatched" si aucune route ne correspond (évite une étiquette par URL).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        queries = QueryStats()
+        token = current_queries.set(queries)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec((method,))
+            current_queries.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc((method, route, str(status)))
+            HTTP_LATENCY.observe(elapsed, (method, route))
+            DB_QUERIES_PER_REQUEST.observe(queries.count, (route,))
+            DB_SECONDS_PER_REQUEST.observe(queries.seconds, (route,))
@@ -0,0 +1,17 @@
+-- ======================================================================
+-- Migration 001 : agrégats des avis sur la table "videos"
+-- Ajoute le nombre d'avis, la somme des étoiles et l'histogramme par note,
+-- maintenus par crud.add_review. Après application, lancer une fois :
+--     python manage.py reconcile-ratings
+-- pour remplir les agrégats à partir des avis existants.
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE videos
+    ADD COLUMN review_count INT NOT NULL DEFAULT 0,   -- Nombre total d'avis
+    ADD COLUMN stars_sum INT NOT NULL DEFAULT 0,      -- Somme des étoiles de tous les avis
+    ADD COLUMN stars_1 INT NOT NULL DEFAULT 0,        -- Nombre d'avis à 1 étoile
+    ADD COLUMN stars_2 INT NOT NULL DEFAULT 0,        -- Nombre d'avis à 2 étoiles
+    ADD COLUMN stars_3 INT NOT NULL DEFAULT 0,        -- Nombre d'avis à 3 étoiles
+    ADD COLUMN stars_4 INT NOT NULL DEFAULT 0,        -- Nombre d'avis à 4 étoiles
+    ADD COLUMN stars_5 INT NOT NULL DEFAULT 0;        -- Nombre d'avis à 5 étoiles
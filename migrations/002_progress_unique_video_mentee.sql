@@ -0,0 +1,26 @@
+-- ======================================================================
+-- Migration 002 : unicité de la progression par couple (vidéo, mentee)
+-- crud.track_progress effectue un upsert (INSERT ... ON DUPLICATE KEY UPDATE)
+-- qui nécessite cette contrainte unique. Les doublons éventuels sont d'abord
+-- fusionnés dans la ligne la plus ancienne (somme des visionnages).
+-- ======================================================================
+USE elimu;
+
+-- Reporte la somme des visionnages des doublons sur la ligne la plus ancienne
+UPDATE progress p
+JOIN (
+    SELECT MIN(id) AS id, SUM(watched) AS total
+    FROM progress
+    GROUP BY video_id, mentee_email
+    HAVING COUNT(*) > 1
+) d ON p.id = d.id
+SET p.watched = d.total;
+
+-- Supprime les doublons restants
+DELETE p FROM progress p
+JOIN progress k
+  ON k.video_id = p.video_id
+ AND k.mentee_email = p.mentee_email
+ AND k.id < p.id;
+
+ALTER TABLE progress ADD CONSTRAINT uq_progress_video_mentee UNIQUE (video_id, mentee_email);
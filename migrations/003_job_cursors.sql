@@ -0,0 +1,12 @@
+-- ======================================================================
+-- Migration 003 : table "job_cursors"
+-- Conserve la position de reprise des tâches de fond (ex : rafraîchissement
+-- des statistiques des vidéos) entre deux passes et deux redémarrages.
+-- ======================================================================
+USE elimu;
+
+CREATE TABLE IF NOT EXISTS job_cursors (
+    name VARCHAR(100) PRIMARY KEY,                  -- Nom de la tâche
+    position INT NOT NULL DEFAULT 0,                -- Dernier identifiant traité
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP   -- Date de la dernière mise à jour
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,27 @@
+-- ======================================================================
+-- Migration 004 : index composites alignés sur les requêtes fréquentes
+-- - videos (mentor_email, category, `order`) : calcul de l'ordre à la création
+--   d'une vidéo et catalogue filtré par mentor ; remplace idx_mentor_email,
+--   dont il couvre le préfixe ;
+-- - videos (category, `order`, id) : catalogue paginé ;
+-- - reviews (video_id, mentee_email) : avis d'une vidéo ; index unique, un
+--   seul avis par mentee et par vidéo même pour deux envois simultanés. Les
+--   doublons éventuels sont d'abord supprimés (l'avis le plus ancien est
+--   conservé) : lancer ensuite python manage.py reconcile-ratings.
+-- La progression est déjà couverte par uq_progress_video_mentee (migration 002).
+-- Vérification : python -m benchmarks.explain_hot_queries --database-url <URL MySQL>
+-- ======================================================================
+USE elimu;
+
+CREATE INDEX ix_videos_mentor_category_order ON videos (mentor_email, category, `order`);
+CREATE INDEX ix_videos_category_order_id ON videos (category, `order`, id);
+
+-- Supprime les avis en double (conserve le plus ancien)
+DELETE r FROM reviews r
+JOIN reviews k
+  ON k.video_id = r.video_id
+ AND k.mentee_email = r.mentee_email
+ AND k.id < r.id;
+
+CREATE UNIQUE INDEX ix_reviews_video_mentee ON reviews (video_id, mentee_email);
+DROP INDEX idx_mentor_email ON videos;
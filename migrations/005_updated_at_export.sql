@@ -0,0 +1,17 @@
+-- ======================================================================
+-- Migration 005 : date de dernière modification, pour l'export incrémental
+-- - videos.updated_at et progress.updated_at, renseignées par l'application
+--   à chaque écriture (UTC) ; les lignes existantes reçoivent la date courante ;
+-- - index sur ces colonnes et sur reviews.created_at (un avis n'est jamais
+--   modifié) pour GET /export/<table>?updated_since=...
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE videos ADD COLUMN updated_at DATETIME NULL;   -- Date de la dernière modification
+ALTER TABLE progress ADD COLUMN updated_at DATETIME NULL; -- Date de la dernière modification
+UPDATE videos SET updated_at = UTC_TIMESTAMP();
+UPDATE progress SET updated_at = UTC_TIMESTAMP();
+
+CREATE INDEX ix_videos_updated_at ON videos (updated_at);
+CREATE INDEX ix_progress_updated_at ON progress (updated_at);
+CREATE INDEX ix_reviews_created_at ON reviews (created_at);
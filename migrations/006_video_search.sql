@@ -0,0 +1,11 @@
+-- ======================================================================
+-- Migration 006 : recherche plein texte dans les vidéos
+-- Index FULLTEXT sur le titre et la description, utilisé par
+-- GET /videos/search (MATCH ... AGAINST en mode booléen). MySQL le tient
+-- à jour à chaque INSERT, UPDATE et DELETE sur videos.
+-- Sous SQLite (développement), l'index équivalent (table FTS5 videos_fts)
+-- est créé avec les tables, ou par `python manage.py rebuild-search-index`.
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE videos ADD FULLTEXT INDEX ix_videos_search (title, description);
@@ -0,0 +1,28 @@
+-- ======================================================================
+-- Migration 007 : classements précalculés des vidéos
+-- "video_activity" : nombre de visionnages (POST /progress/) par vidéo et
+-- par jour, écrit périodiquement par la tâche de fond de leaderboards.py
+-- et conservé 31 jours.
+-- "leaderboard_entries" : classements calculés par cette même tâche, lus
+-- par GET /leaderboards/{board} sur leur clé primaire (board, category, rank).
+-- ======================================================================
+USE elimu;
+
+CREATE TABLE IF NOT EXISTS video_activity (
+    video_id INT NOT NULL,                          -- Vidéo regardée
+    day DATE NOT NULL,                              -- Journée (UTC)
+    watched INT NOT NULL DEFAULT 0,                 -- Nombre de visionnages ce jour-là
+    PRIMARY KEY (video_id, day),
+    INDEX ix_video_activity_day_video (day, video_id),
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS leaderboard_entries (
+    board VARCHAR(30) NOT NULL,                     -- Nom du classement (ex : top-rated, trending)
+    category VARCHAR(100) NOT NULL,                 -- Catégorie ('' : toutes catégories)
+    `rank` INT NOT NULL,                            -- Rang, à partir de 1
+    video_id INT NOT NULL,                          -- Vidéo classée
+    score FLOAT NOT NULL,                           -- Score ayant déterminé le rang
+    PRIMARY KEY (board, category, `rank`),
+    FOREIGN KEY (video_id) REFERENCES videos(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,13 @@
+-- ======================================================================
+-- Migration 008 : compteurs d'engagement sur la table "videos"
+-- Ajoute le nombre de mentees ayant regardé la vidéo et le nombre total
+-- de visionnages, maintenus par crud.track_progress (et par les écritures
+-- groupées : tampon de progression, import). Après application, lancer une fois :
+--     python manage.py reconcile-counters
+-- pour remplir les compteurs à partir des progressions existantes.
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE videos
+    ADD COLUMN viewer_count INT NOT NULL DEFAULT 0,   -- Nombre de mentees ayant regardé la vidéo
+    ADD COLUMN watch_count INT NOT NULL DEFAULT 0;    -- Nombre total de visionnages (somme des progressions)
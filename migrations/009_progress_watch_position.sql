@@ -0,0 +1,13 @@
+-- ======================================================================
+-- Migration 009 : position de lecture sur la table "progress"
+-- Ajoute la position de reprise, la position maximale atteinte (secondes)
+-- et l'indicateur de fin de lecture, écrits par les battements de lecture
+-- groupés (POST /progress/heartbeat, crud.record_heartbeats). Les
+-- progressions existantes partent de la position 0, non terminées.
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE progress
+    ADD COLUMN last_position INT NOT NULL DEFAULT 0,      -- Position du dernier battement (point de reprise)
+    ADD COLUMN max_position INT NOT NULL DEFAULT 0,       -- Position la plus avancée atteinte ; ne diminue jamais
+    ADD COLUMN completed BOOLEAN NOT NULL DEFAULT FALSE;  -- Vidéo regardée jusqu'au bout ; ne repasse jamais à faux
@@ -0,0 +1,11 @@
+-- ======================================================================
+-- Migration 010 : quota quotidien des tâches de fond dans "job_cursors"
+-- Le nombre d'appels à l'API YouTube effectués dans la journée par le
+-- rafraîchissement des statistiques est conservé avec son curseur : il est
+-- partagé entre les workers et les exécutions de `manage.py refresh-stats`.
+-- ======================================================================
+USE elimu;
+
+ALTER TABLE job_cursors
+    ADD COLUMN quota_day DATE NULL,                 -- Jour auquel se rapporte quota_used
+    ADD COLUMN quota_used INT NOT NULL DEFAULT 0;   -- Appels à l'API déjà effectués ce jour-là
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import (
+    DDL, Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint, event,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -8,6 +10,18 @@ from database import Base
 # ==============================================================================
 class Video(Base):
     __tablename__ = "videos"  # Nom de la table dans la base de données
+    # Index composites correspondant aux requêtes fréquentes :
+    # - dernier ordre d'un couple (mentor_email, category) lors de la création d'une vidéo,
+    #   et catalogue filtré par mentor ;
+    # - catalogue trié par (category, order, id), éventuellement filtré par catégorie.
+    __table_args__ = (
+        Index("ix_videos_mentor_category_order", "mentor_email", "category", "order"),
+        Index("ix_videos_category_order_id", "category", "order", "id"),
+        # Export incrémental (GET /export/videos?updated_since=...)
+        Index("ix_videos_updated_at", "updated_at"),
+        # Recherche plein texte (GET /videos/search), MySQL ; sous SQLite : table FTS5 videos_fts ci-dessous
+        Index("ix_videos_search", "title", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     # --------------------------------------------------------------------------
     # Définition des colonnes
@@ -21,6 +35,22 @@ class Video(Base):
     category = Column(String, nullable=False)
     # Note moyenne calculée à partir des avis (stars), initialisée à 0.0
     stars = Column(Float, default=0.0)
+    # Agrégats des avis, maintenus à chaque ajout d'avis (voir crud.add_review)
+    # Nombre total d'avis
+    review_count = Column(Integer, nullable=False, default=0)
+    # Somme des étoiles de tous les avis
+    stars_sum = Column(Integer, nullable=False, default=0)
+    # Histogramme : nombre d'avis pour chaque note de 1 à 5
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
+    # Compteurs d'engagement, maintenus à chaque suivi de progression (voir crud.engagement_update)
+    # Nombre de mentees ayant regardé la vidéo (progression avec watched > 0)
+    viewer_count = Column(Integer, nullable=False, default=0)
+    # Nombre total de visionnages (somme des `watched` des progressions)
+    watch_count = Column(Integer, nullable=False, default=0)
     # Nombre de likes
     likes = Column(Integer, default=0)
     # Nombre de vues
@@ -33,6 +63,8 @@ class Video(Base):
     description = Column(String, nullable=True)
     # Ordre d'affichage de la vidéo (le nom "order" étant un mot réservé, on le définit explicitement)
     order = Column("order", Integer, nullable=False)
+    # Date de la dernière modification de la ligne (export incrémental)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # --------------------------------------------------------------------------
     # Relations avec d'autres tables
@@ -43,11 +75,43 @@ class Video(Base):
     progresses = relationship("Progress", back_populates="video", cascade="all, delete-orphan")
 
 
+# ------------------------------------------------------------------------------
+# Index plein texte SQLite (développement local) : table FTS5 à contenu externe
+# indexant le titre et la description des vidéos, tenue à jour par des triggers
+# à chaque INSERT, UPDATE et DELETE sur videos. Les accents sont ignorés
+# (remove_diacritics) : "video" trouve "vidéo".
+# ------------------------------------------------------------------------------
+VIDEO_SEARCH_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5("
+    "title, description, content='videos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN "
+    "INSERT INTO videos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN "
+    "INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, description ON videos BEGIN "
+    "INSERT INTO videos_fts(videos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO videos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+# Reconstruit l'index à partir de la table videos (base créée avant l'index)
+VIDEO_SEARCH_SQLITE_REBUILD = "INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')"
+
+for _statement in VIDEO_SEARCH_SQLITE_DDL:
+    event.listen(Video.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Video.__table__, "before_drop", DDL("DROP TABLE IF EXISTS videos_fts").execute_if(dialect="sqlite"))
+
+
 # ==============================================================================
 # Classe représentant la progression du visionnage d'une vidéo
 # ==============================================================================
 class Progress(Base):
     __tablename__ = "progress"  # Nom de la table dans la base de données
+    # Une seule ligne de progression par couple (vidéo, mentee) : sert de cible
+    # à l'upsert atomique de crud.track_progress.
+    __table_args__ = (
+        UniqueConstraint("video_id", "mentee_email", name="uq_progress_video_mentee"),
+        # Export incrémental (GET /export/progress?updated_since=...)
+        Index("ix_progress_updated_at", "updated_at"),
+    )
 
     # --------------------------------------------------------------------------
     # Définition des colonnes
@@ -60,6 +124,16 @@ class Progress(Base):
     mentee_email = Column(String, nullable=False)
     # Indique la quantité de la vidéo regardée (par exemple en secondes ou en pourcentage).
     watched = Column(Integer, default=0)
+    # Suivi de la position de lecture (POST /progress/heartbeat), en secondes
+    # Position du dernier battement reçu : point de reprise de la lecture
+    last_position = Column(Integer, nullable=False, default=0)
+    # Position la plus avancée atteinte ; ne diminue jamais
+    max_position = Column(Integer, nullable=False, default=0)
+    # Vidéo regardée jusqu'au bout (voir PROGRESS_COMPLETION_RATIO) ; ne repasse jamais à faux
+    completed = Column(Boolean, nullable=False, default=False)
+    # Date de la dernière modification de la ligne (export incrémental) ;
+    # renseignée explicitement par l'upsert de crud.progress_upsert_statement
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # --------------------------------------------------------------------------
     # Relation avec la table Video
@@ -73,6 +147,12 @@ class Progress(Base):
 # ==============================================================================
 class Review(Base):
     __tablename__ = "reviews"  # Nom de la table dans la base de données
+    # Avis d'une vidéo, et unicité de l'avis d'un mentee sur une vidéo (anti-doublon)
+    __table_args__ = (
+        Index("ix_reviews_video_mentee", "video_id", "mentee_email", unique=True),
+        # Export incrémental (GET /export/reviews?updated_since=...) ; un avis n'est jamais modifié
+        Index("ix_reviews_created_at", "created_at"),
+    )
 
     # --------------------------------------------------------------------------
     # Définition des colonnes
@@ -120,3 +200,66 @@ class User(Base):
     mentor = Column(String, nullable=False)
     # Date de création du compte ; par défaut, la date et l'heure actuelles.
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ==============================================================================
+# Classe représentant la position de reprise d'une tâche de fond
+# ==============================================================================
+class JobCursor(Base):
+    __tablename__ = "job_cursors"  # Nom de la table dans la base de données
+
+    # --------------------------------------------------------------------------
+    # Définition des colonnes
+    # --------------------------------------------------------------------------
+    # Nom de la tâche (ex : "video_stats_refresh")
+    name = Column(String(100), primary_key=True)
+    # Dernier identifiant traité ; la tâche reprend juste après
+    position = Column(Integer, nullable=False, default=0)
+    # Date de la dernière mise à jour du curseur
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Quota d'appels à une API externe : jour en cours et nombre d'appels déjà effectués ce jour-là
+    # (partagé entre les workers et les exécutions de manage.py)
+    quota_day = Column(Date, nullable=True)
+    quota_used = Column(Integer, nullable=False, default=0)
+
+
+# ==============================================================================
+# Classe représentant le nombre de visionnages d'une vidéo sur une journée
+# ==============================================================================
+class VideoActivity(Base):
+    __tablename__ = "video_activity"  # Nom de la table dans la base de données
+    # Lecture des N derniers jours pour le calcul des classements (leaderboards.py)
+    __table_args__ = (
+        Index("ix_video_activity_day_video", "day", "video_id"),
+    )
+
+    # --------------------------------------------------------------------------
+    # Définition des colonnes
+    # --------------------------------------------------------------------------
+    # Vidéo regardée ; les compteurs disparaissent avec la vidéo
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    # Journée (UTC) des visionnages
+    day = Column(Date, primary_key=True)
+    # Nombre d'appels à POST /progress/ pour la vidéo ce jour-là
+    watched = Column(Integer, nullable=False, default=0)
+
+
+# ==============================================================================
+# Classe représentant une ligne d'un classement précalculé
+# ==============================================================================
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard_entries"  # Nom de la table dans la base de données
+
+    # --------------------------------------------------------------------------
+    # Définition des colonnes
+    # --------------------------------------------------------------------------
+    # Nom du classement (ex : "top-rated", "trending")
+    board = Column(String(30), primary_key=True)
+    # Catégorie classée ; chaîne vide : toutes catégories confondues
+    category = Column(String(100), primary_key=True)
+    # Rang dans le classement, à partir de 1 : la clé primaire sert la lecture des k premiers
+    rank = Column(Integer, primary_key=True)
+    # Vidéo classée
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    # Score ayant déterminé le rang (note bayésienne, visionnages...)
+    score = Column(Float, nullable=False)
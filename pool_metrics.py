@@ -0,0 +1,106 @@
+"""
+Instrumentation du pool de connexions SQLAlchemy.
+
+Les pools QueuePool (moteur synchrone) et AsyncAdaptedQueuePool (moteur
+asynchrone) sont remplacés par des sous-classes qui chronomètrent l'attente
+d'une connexion libre. pool_stats() renvoie, pour un moteur, l'état du pool
+(connexions prises, libres, en débordement) et ces temps d'attente, ce qui
+permet de dimensionner DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW par worker
+uvicorn : des attentes non nulles signifient que le pool est trop petit pour
+la charge du worker.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolWaitStats:
+    """
+    Compteurs des attentes de connexion d'un pool (nombre, durée totale et maximale, délais dépassés).
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / waits, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """Chronomètre chaque obtention de connexion depuis le pool."""
+
+    @property
+    def wait_stats(self) -> PoolWaitStats:
+        # Créé à la demande : le pool est construit par SQLAlchemy (et recréé par recreate())
+        stats = self.__dict__.get("_wait_stats")
+        if stats is None:
+            stats = self.__dict__.setdefault("_wait_stats", PoolWaitStats())
+        return stats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    """
+    Renvoie l'état du pool d'un moteur (synchrone ou asynchrone) et ses temps d'attente.
+
+    Les compteurs sont propres au processus : chaque worker uvicorn a son pool.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {"pid": os.getpid(), "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        overflow = pool.overflow()
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # overflow() est négatif tant que le pool n'a pas ouvert toutes ses connexions
+            "overflow": max(overflow, 0),
+            "timeout_seconds": pool.timeout(),
+        })
+    else:
+        stats["status"] = pool.status()
+    if isinstance(pool, _TimedPoolMixin):
+        stats.update(pool.wait_stats.stats())
+    return stats
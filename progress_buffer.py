@@ -0,0 +1,255 @@
+"""
+Tampon d'écriture différée (write-behind) pour le suivi de progression.
+
+Au lieu d'une transaction par POST /progress/, les incréments sont regroupés
+en mémoire par couple (video_id, mentee_email), puis écrits en un seul upsert
+groupé (voir crud.progress_upsert_statement) :
+- toutes les PROGRESS_BUFFER_FLUSH_INTERVAL_MS millisecondes,
+- dès que PROGRESS_BUFFER_MAX_EVENTS incréments sont en attente,
+- à l'arrêt de l'application (lifespan FastAPI).
+
+Bornes de durabilité : en cas d'arrêt brutal, on perd au plus les incréments
+des FLUSH_INTERVAL_MS dernières millisecondes. Si la base est indisponible,
+les incréments non écrits sont remis dans le tampon ; au-delà de
+PROGRESS_BUFFER_MAX_PENDING incréments en attente (par défaut 2 x MAX_EVENTS),
+les nouveaux sont refusés (ProgressBufferFull) plutôt que d'accumuler de la
+mémoire sans limite : c'est aussi le nombre maximal d'incréments perdus en
+cas d'arrêt brutal pendant une indisponibilité de la base.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from config import get_settings
+from database import SessionLocal
+from models import Video
+from response_cache import invalidate_video_progress
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de lignes par requête d'upsert groupé
+FLUSH_CHUNK_SIZE = 500
+
+
+class ProgressBufferFull(Exception):
+    """Levée quand le tampon a atteint sa borne et refuse de nouveaux incréments."""
+
+
+class ProgressBuffer:
+    """
+    Regroupe les incréments de progression en mémoire et les écrit périodiquement.
+
+    Args:
+        session_factory: Fabrique de sessions SQLAlchemy utilisée pour les écritures.
+        flush_interval_ms (int): Délai maximal entre deux écritures.
+        max_events (int): Nombre d'incréments en attente déclenchant une écriture immédiate.
+        max_pending (int): Nombre d'incréments en attente au-delà duquel les nouveaux sont refusés
+            (None : 2 x max_events).
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        flush_interval_ms: int = 500,
+        max_events: int = 1000,
+        max_pending: int = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.max_pending = max_pending if max_pending is not None else 2 * max_events
+        self._pending = {}
+        self._pending_events = 0
+        self._lock = threading.Lock()
+        # Sérialise les écritures : un seul flush à la fois
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # Métriques
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.flushed_events = 0
+        self.dropped_events = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    # --------------------------------------------------------------------------
+    # Cycle de vie
+    # --------------------------------------------------------------------------
+    def start(self):
+        """Démarre le thread d'écriture périodique."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread d'écriture puis écrit les incréments restants."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Échec de l'écriture du tampon de progression")
+
+    # --------------------------------------------------------------------------
+    # Ajout et écriture
+    # --------------------------------------------------------------------------
+    def add(self, video_id: int, mentee_email: str, count: int = 1) -> int:
+        """
+        Ajoute un incrément au tampon.
+
+        Returns:
+            Le nombre d'incréments en attente pour ce couple (video_id, mentee_email).
+
+        Raises:
+            ProgressBufferFull: Si le tampon a atteint sa borne (base indisponible ou trop lente).
+        """
+        with self._lock:
+            if self._pending_events >= self.max_pending:
+                raise ProgressBufferFull()
+            key = (video_id, mentee_email)
+            pending = self._pending.get(key, 0) + count
+            self._pending[key] = pending
+            self._pending_events += count
+            should_wake = self._pending_events >= self.max_events
+        if should_wake:
+            self._wake.set()
+        return pending
+
+    def flush(self) -> int:
+        """
+        Écrit tous les incréments en attente en upserts groupés, dans une seule transaction.
+
+        Les lignes dont la vidéo n'existe plus sont écartées (et comptées dans
+        dropped_events). En cas d'erreur, les incréments sont remis dans le tampon.
+
+        Returns:
+            Le nombre d'incréments écrits.
+        """
+        # Import local : crud importe ce module (import circulaire)
+        import crud
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_events = 0
+            if not pending:
+                return 0
+
+            # Tri par clé : ordre de verrouillage stable, limite les interblocages MySQL
+            rows = [
+                {"video_id": video_id, "mentee_email": mentee_email, "watched": watched}
+                for (video_id, mentee_email), watched in sorted(pending.items())
+            ]
+            start = time.perf_counter()
+            db = self.session_factory()
+            try:
+                try:
+                    self._write(db, crud, rows)
+                except IntegrityError:
+                    # Au moins une vidéo a été supprimée : on écarte ses lignes et on réessaie
+                    db.rollback()
+                    video_ids = {row["video_id"] for row in rows}
+                    existing = {video_id for (video_id,) in db.query(Video.id).filter(Video.id.in_(video_ids))}
+                    kept = [row for row in rows if row["video_id"] in existing]
+                    dropped = sum(row["watched"] for row in rows if row["video_id"] not in existing)
+                    if kept:
+                        self._write(db, crud, kept)
+                    self.dropped_events += dropped
+                    rows = kept
+                    logger.warning("%d incrément(s) de progression écarté(s) : vidéo inexistante", dropped)
+            except Exception:
+                db.rollback()
+                self.failed_flushes += 1
+                self._requeue(pending)
+                raise
+            finally:
+                db.close()
+            # Les progressions font partie de la réponse de GET /videos/{id}
+            invalidate_video_progress(*{row["video_id"] for row in rows})
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            written = sum(row["watched"] for row in rows)
+            self.flush_count += 1
+            self.flushed_events += written
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return written
+
+    def _write(self, db, crud, rows: list):
+        # Upserts groupés et compteurs d'engagement des vidéos, dans la même transaction
+        crud.write_progress_batch(db, rows, chunk_size=FLUSH_CHUNK_SIZE)
+        db.commit()
+
+    def _requeue(self, pending: dict):
+        with self._lock:
+            for key, watched in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + watched
+                self._pending_events += watched
+
+    # --------------------------------------------------------------------------
+    # Métriques
+    # --------------------------------------------------------------------------
+    def stats(self) -> dict:
+        """Renvoie la profondeur du tampon et les statistiques d'écriture."""
+        with self._lock:
+            depth_keys = len(self._pending)
+            depth_events = self._pending_events
+        return {
+            "depth_keys": depth_keys,
+            "depth_events": depth_events,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "flushed_events": self.flushed_events,
+            "dropped_events": self.dropped_events,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+        }
+
+
+# ==============================================================================
+# Instance globale, créée au démarrage de l'application si le mode est activé
+# ==============================================================================
+_buffer = None
+
+
+def get_progress_buffer():
+    """Renvoie le tampon actif, ou None si le mode tampon est désactivé."""
+    return _buffer
+
+
+def start_progress_buffer():
+    """Crée et démarre le tampon global si PROGRESS_BUFFER_ENABLED est activé."""
+    global _buffer
+    settings = get_settings()
+    if settings.PROGRESS_BUFFER_ENABLED and _buffer is None:
+        _buffer = ProgressBuffer(
+            flush_interval_ms=settings.PROGRESS_BUFFER_FLUSH_INTERVAL_MS,
+            max_events=settings.PROGRESS_BUFFER_MAX_EVENTS,
+            max_pending=settings.PROGRESS_BUFFER_MAX_PENDING,
+        )
+        _buffer.start()
+    return _buffer
+
+
+def stop_progress_buffer():
+    """Arrête le tampon global en écrivant les incréments restants."""
+    global _buffer
+    if _buffer is not None:
+        buffer, _buffer = _buffer, None
+        buffer.stop()
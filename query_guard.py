@@ -0,0 +1,256 @@
+"""
+Budget de requêtes SQL par requête HTTP et détection des motifs N+1 (mode debug/test).
+
+Les relations de models.py (Video.reviews, Video.progresses, Progress.video,
+Review.video) sont chargées à la demande : sérialiser une liste d'objets avec
+un schéma orm_mode qui les parcourt exécute une requête par objet (N+1).
+Activé par QUERY_GUARD_MODE, ce module compte les requêtes SQL de chaque
+requête HTTP (événement after_cursor_execute) et signale :
+- le dépassement du budget de la route (QUERY_BUDGET, ou sa valeur dans
+  QUERY_BUDGET_ROUTES) ;
+- une même forme de requête (texte SQL, listes IN (...) ramenées à un seul
+  paramètre) exécutée au moins QUERY_REPEAT_THRESHOLD fois : motif N+1.
+
+En mode "warn", un avertissement est journalisé à la fin de la requête ; en
+mode "raise", la requête SQL fautive lève QueryBudgetExceeded : la requête
+HTTP échoue (ce qui fait échouer un test) et la trace désigne le code fautif.
+Chaque dépassement est aussi compté dans la métrique
+db_query_budget_exceeded_total (GET /metrics).
+
+Une route qui répète légitimement la même requête (imports par lots) déclare
+son propre budget avec la dépendance query_budget().
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from config import get_settings
+from metrics import DB_QUERY_BUDGET_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+# Paramètre de requête : ?, %s, %(nom)s ou :nom
+_PARAMETER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PARAMETER_LIST = re.compile(rf"\(\s*{_PARAMETER}(?:\s*,\s*{_PARAMETER})*\s*\)")
+_REPEATED_GROUPS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Levée quand une requête HTTP (ou un bloc track_queries) dépasse son budget ou répète une requête SQL."""
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Forme d'une requête SQL : les listes de paramètres (IN (?, ?, ?), VALUES
+    multi-lignes) sont ramenées à un seul paramètre, pour que les requêtes ne
+    différant que par le nombre de valeurs soient reconnues comme identiques.
+    """
+    shape = _PARAMETER_LIST.sub("(?)", statement)
+    shape = _REPEATED_GROUPS.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def parse_route_budgets(value: str) -> dict:
+    """
+    Lit QUERY_BUDGET_ROUTES : "gabarit=budget" séparés par des virgules,
+    ex : "/videos/{video_id}=2,/users/{email}/progress=1".
+    """
+    budgets = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, separator, budget = item.rpartition("=")
+        if not separator or not route.strip():
+            raise ValueError(f"QUERY_BUDGET_ROUTES : entrée invalide {item!r} (attendu : gabarit=budget)")
+        budgets[route.strip()] = int(budget)
+    return budgets
+
+
+class QueryTally:
+    """
+    Requêtes SQL d'une requête HTTP (ou d'un bloc track_queries), regroupées par forme.
+
+    Args:
+        label (str): Nom utilisé dans les messages, à défaut du gabarit de la route.
+        max_queries (int): Budget ; None : pas de limite.
+        max_repeats (int): Nombre d'exécutions d'une même forme signalé comme N+1 ; None : pas de limite.
+        raise_errors (bool): Lève QueryBudgetExceeded dès la requête fautive.
+        scope (dict): Scope ASGI de la requête HTTP, d'où est lue la route.
+        route_budgets (dict): Budgets par gabarit de route, prioritaires sur `max_queries`.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        max_queries: int = None,
+        max_repeats: int = None,
+        raise_errors: bool = False,
+        scope: dict = None,
+        route_budgets: dict = None,
+    ):
+        self.label = label
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.raise_errors = raise_errors
+        self.scope = scope
+        self.route_budgets = route_budgets or {}
+        self.count = 0
+        self.shapes = Counter()
+        # Budget déjà résolu (budget de la route, ou fixé par query_budget())
+        self.configured = False
+        self._reported = set()
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route") if self.scope is not None else None
+        return getattr(route, "path_format", None) or getattr(route, "path", None) or self.label
+
+    def configure(self, max_queries: int = None, max_repeats: int = None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.configured = True
+
+    def record(self, statement: str):
+        if not self.configured:
+            # La route est connue dès le routage, avant la première requête de l'endpoint
+            self.configured = True
+            self.max_queries = self.route_budgets.get(self.route, self.max_queries)
+        self.count += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.raise_errors:
+            if self.max_queries is not None and self.count > self.max_queries:
+                self._report("budget", "budget")
+            if self.max_repeats is not None and self.shapes[shape] >= self.max_repeats:
+                self._report("n_plus_one", shape)
+
+    def _exceeded(self) -> list:
+        """Dépassements constatés : couples (motif, clé), la clé étant "budget" ou la forme répétée."""
+        found = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            found.append(("budget", "budget"))
+        if self.max_repeats is not None:
+            found += [("n_plus_one", shape) for shape, repeats in self.shapes.most_common() if repeats >= self.max_repeats]
+        return found
+
+    def _message(self, key: str) -> str:
+        if key == "budget":
+            return f"{self.count} requête(s) SQL pour un budget de {self.max_queries}"
+        return f"requête exécutée {self.shapes[key]} fois (N+1 probable) : {key[:300]}"
+
+    def violations(self) -> list:
+        """Dépassements constatés, sous forme de messages."""
+        return [self._message(key) for _, key in self._exceeded()]
+
+    def report(self):
+        """Signale les dépassements pas encore signalés (fin de la requête HTTP)."""
+        for reason, key in self._exceeded():
+            self._report(reason, key)
+
+    def _report(self, reason: str, key: str):
+        # Un seul signalement par dépassement (budget, ou forme de requête répétée)
+        if key in self._reported:
+            return
+        self._reported.add(key)
+        DB_QUERY_BUDGET_EXCEEDED.inc((self.route, reason))
+        if self.raise_errors:
+            raise QueryBudgetExceeded(f"{self.route} : {self._message(key)}")
+        logger.warning("%s : %s", self.route, self._message(key))
+
+
+# Décompte de la requête HTTP en cours ; l'objet est partagé avec le
+# threadpool et les greenlets SQLAlchemy, qui copient le contexte
+current_tally: ContextVar = ContextVar("current_tally", default=None)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tally = current_tally.get()
+    if tally is not None:
+        tally.record(statement)
+
+
+def instrument_engine(engine):
+    """Compte les requêtes SQL du moteur, si QUERY_GUARD_MODE n'est pas "off" (aucun coût sinon)."""
+    if get_settings().QUERY_GUARD_MODE != "off":
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries(label: str = "bloc", max_queries: int = None, max_repeats: int = None):
+    """
+    Compte les requêtes SQL exécutées dans le bloc et lève QueryBudgetExceeded
+    à sa sortie si le budget est dépassé ou si une requête est répétée
+    `max_repeats` fois. Pour les scripts et les tests ; nécessite
+    QUERY_GUARD_MODE différent de "off" (sinon rien n'est compté) :
+
+        with track_queries("tableau de bord", max_queries=1) as tally:
+            crud.get_mentee_dashboard(db, email)
+    """
+    tally = QueryTally(label)
+    tally.configure(max_queries, max_repeats)
+    token = current_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        current_tally.reset(token)
+    violations = tally.violations()
+    if violations:
+        raise QueryBudgetExceeded(f"{label} : " + " ; ".join(violations))
+
+
+def query_budget(max_queries: int = None, max_repeats: int = None):
+    """
+    Dépendance FastAPI fixant le budget d'une route, à la place de QUERY_BUDGET
+    et QUERY_REPEAT_THRESHOLD (None : pas de limite). Exemple, pour un import
+    qui exécute les mêmes requêtes pour chaque lot :
+
+        @router.post("/import", dependencies=[Depends(query_budget())])
+    """
+    async def set_query_budget():
+        tally = current_tally.get()
+        if tally is not None:
+            tally.configure(max_queries, max_repeats)
+    return set_query_budget
+
+
+class QueryGuardMiddleware:
+    """
+    Ouvre le décompte des requêtes SQL de chaque requête HTTP et signale les
+    dépassements ; sans effet si QUERY_GUARD_MODE vaut "off".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._settings = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._settings is None:
+            # Lue à la première requête : importer l'application ne lit pas la configuration
+            settings = get_settings()
+            self._settings = (
+                settings.QUERY_GUARD_MODE,
+                settings.QUERY_BUDGET,
+                settings.QUERY_REPEAT_THRESHOLD,
+                parse_route_budgets(settings.QUERY_BUDGET_ROUTES),
+            )
+        mode, budget, repeat_threshold, route_budgets = self._settings
+        if mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        tally = QueryTally(
+            scope["path"], budget, repeat_threshold,
+            raise_errors=mode == "raise", scope=scope, route_budgets=route_budgets,
+        )
+        token = current_tally.set(tally)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tally.reset(token)
+        tally.report()
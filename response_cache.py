@@ -0,0 +1,267 @@
+"""
+Cache des réponses HTTP des endpoints de lecture, avec ETag et requêtes conditionnelles.
+
+- Les corps JSON sont mis en cache côté serveur sous une clé logique (route +
+  paramètres, ex : "video:12"), dans un LRU en mémoire avec expiration
+  (youtube_cache.MemoryCacheBackend) : un GET déjà en cache ne touche pas la base.
+- Chaque réponse porte un ETag fort (empreinte SHA-256 du corps) et un en-tête
+  Cache-Control ; un client qui renvoie l'ETag dans If-None-Match reçoit un
+  304 sans corps.
+- Les écritures (crud.create_video, update_video, delete_video, add_review,
+  track_progress, ...) invalident les clés concernées après leur commit. Les
+  écritures de progression, de loin les plus fréquentes, n'invalident que la
+  vidéo concernée (invalidate_video_progress) : la liste des vidéos et ses
+  compteurs d'engagement (?fields=viewer_count,...) peuvent avoir jusqu'à
+  RESPONSE_CACHE_TTL_SECONDS secondes de retard.
+
+Le cache est propre au processus : avec plusieurs workers uvicorn, une
+écriture n'invalide que le cache du worker qui la traite ; les autres
+servent l'ancienne réponse au plus RESPONSE_CACHE_TTL_SECONDS secondes.
+"""
+import hashlib
+import json
+import threading
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import get_settings
+from youtube_cache import MemoryCacheBackend
+
+# Clé de la liste complète des vidéos (GET /videos/videos/)
+VIDEOS_KEY = "videos:all"
+
+
+def video_key(video_id: int) -> str:
+    """Clé de GET /videos/{video_id}."""
+    return f"video:{video_id}"
+
+
+def reviews_key(video_id: int) -> str:
+    """Clé de GET /reviews/{video_id}."""
+    return f"reviews:{video_id}"
+
+
+def rating_key(video_id: int) -> str:
+    """Clé de GET /videos/{video_id}/rating."""
+    return f"rating:{video_id}"
+
+
+def leaderboard_key(board: str) -> str:
+    """Clé de GET /leaderboards/{board} (variantes : catégorie et taille)."""
+    return f"leaderboard:{board}"
+
+
+class CachedBody:
+    """Corps JSON sérialisé d'une réponse et son ETag."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+
+
+class ResponseCache:
+    """
+    Cache des corps de réponse, avec compteurs de succès/échecs.
+
+    Args:
+        backend (CacheBackend): Stockage utilisé (None : aucune mise en cache, seuls les ETag sont calculés).
+        ttl (float): Durée de vie (secondes) d'une réponse en cache.
+        max_age (int): Valeur max-age (secondes) de l'en-tête Cache-Control envoyé aux clients.
+    """
+
+    def __init__(self, backend=None, ttl: float = 60, max_age: int = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        # Génération de chaque clé, incrémentée à son invalidation (et de toutes
+        # les clés par clear()) : une réponse calculée pendant une écriture
+        # concurrente sur la même clé n'est pas mise en cache (elle pourrait être
+        # périmée) ; les écritures sur d'autres clés sont sans effet
+        self._epoch = 0
+        self._generations = {}
+        # Clé logique -> clés des variantes en cache (mêmes données, paramètres différents) ;
+        # une variante évincée ou expirée en est retirée (forget), l'index reste borné par le cache
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cache_control(self) -> str:
+        # must-revalidate : une fois max-age écoulé, le client revalide avec If-None-Match
+        return f"public, max-age={self.max_age}, must-revalidate"
+
+    def generation(self, key: str) -> tuple:
+        """Génération de `key`, à lire avant de calculer la réponse à mettre en cache."""
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    @staticmethod
+    def variant_key(key: str, variant: str = None) -> str:
+        return f"{key}?{variant}" if variant else key
+
+    def get(self, key: str, variant: str = None):
+        key = self.variant_key(key, variant)
+        found, entry = self.backend.get(key) if self.backend is not None else (False, None)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry if found else None
+
+    def set(self, key: str, value, generation: tuple = None, variant: str = None) -> CachedBody:
+        """
+        Sérialise `value` (modèle Pydantic, liste, nombre...) et le met en cache,
+        sauf si une invalidation a eu lieu depuis `generation` (lue avant le calcul).
+
+        `variant` distingue les réponses d'une même clé selon les paramètres de
+        la requête (ex : ?fields=) ; invalider la clé invalide toutes ses variantes.
+        """
+        body = json.dumps(
+            jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        entry = CachedBody(body)
+        if self.backend is None:
+            return entry
+        full_key = self.variant_key(key, variant)
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                return entry
+            if variant:
+                self._variants.setdefault(key, set()).add(full_key)
+        self.backend.set(full_key, entry, self.ttl)
+        return entry
+
+    def forget(self, full_key: str):
+        """Retire de l'index des variantes une entrée évincée ou expirée du stockage."""
+        key, separator, _ = full_key.partition("?")
+        if not separator:
+            return
+        with self._lock:
+            variants = self._variants.get(key)
+            if variants is not None:
+                variants.discard(full_key)
+                if not variants:
+                    del self._variants[key]
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            variants = [self._variants.pop(key, set()) for key in keys]
+        if self.backend is not None:
+            for key, key_variants in zip(keys, variants):
+                self.backend.delete(key)
+                for full_key in key_variants:
+                    self.backend.delete(full_key)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._variants.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def respond(self, request: Request, entry: CachedBody) -> Response:
+        """Renvoie 304 si le client possède déjà cette version (If-None-Match), sinon le corps."""
+        headers = {"ETag": entry.etag, "Cache-Control": self.cache_control}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.backend is not None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match utilise la comparaison faible : W/"x" correspond à "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# ==============================================================================
+# Cache global, créé à la première utilisation
+# ==============================================================================
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Renvoie le cache global des réponses, en le créant au besoin."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                settings = get_settings()
+                cache = ResponseCache(
+                    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+                    max_age=settings.RESPONSE_CACHE_MAX_AGE_SECONDS,
+                )
+                if settings.RESPONSE_CACHE_ENABLED:
+                    cache.backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, on_evict=cache.forget)
+                _response_cache = cache
+    return _response_cache
+
+
+def cached_response(request: Request, key: str, load, variant: str = None) -> Response:
+    """
+    Renvoie la réponse en cache pour `key` (et `variant`), ou l'obtient via `load()` et la met en cache.
+
+    `load` renvoie la valeur à sérialiser ; une HTTPException qu'il lève (ex : 404)
+    est propagée et rien n'est mis en cache.
+    """
+    cache = get_response_cache()
+    generation = cache.generation(key)
+    entry = cache.get(key, variant)
+    if entry is None:
+        entry = cache.set(key, load(), generation, variant)
+    return cache.respond(request, entry)
+
+
+async def cached_response_async(request: Request, key: str, load, variant: str = None) -> Response:
+    """Variante de cached_response pour un `load` asynchrone (endpoints AsyncSession)."""
+    cache = get_response_cache()
+    generation = cache.generation(key)
+    entry = cache.get(key, variant)
+    if entry is None:
+        entry = cache.set(key, await load(), generation, variant)
+    return cache.respond(request, entry)
+
+
+def invalidate_videos(*video_ids: int):
+    """
+    Invalide la liste des vidéos et, pour chaque ID fourni, la vidéo, ses avis et sa note.
+    À appeler après le commit de toute écriture qui modifie ces réponses.
+    """
+    keys = [VIDEOS_KEY]
+    for video_id in video_ids:
+        keys += [video_key(video_id), reviews_key(video_id), rating_key(video_id)]
+    get_response_cache().invalidate(*keys)
+
+
+def invalidate_video_progress(*video_ids: int):
+    """
+    Invalide, pour chaque ID fourni, la seule réponse de la vidéo (et ses pages de
+    progressions). À appeler après le commit d'une écriture de progression :
+    ni la liste des vidéos, ni les avis, ni la note ne dépendent de la progression.
+    """
+    if video_ids:
+        get_response_cache().invalidate(*[video_key(video_id) for video_id in video_ids])
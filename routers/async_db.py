@@ -0,0 +1,314 @@
+"""
+Endpoints `async def` sur AsyncSession, utilisés lorsque DATABASE_ASYNC est activé.
+
+Ils reprennent les chemins et les schémas des routeurs synchrones (video,
+progress, reviews, user) pour les opérations courantes ; main.py les place
+devant ceux-ci au démarrage, si bien qu'ils les remplacent. Les endpoints
+absents d'ici (ex : POST /videos/bulk) restent servis par les routeurs
+synchrones.
+
+Les identifiants de chemin utilisent le convertisseur `:int` : un chemin
+comme /videos/catalog ne peut pas être capturé par /videos/{video_id}.
+"""
+from typing import List, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, crud_async, progress_buffer, schemas
+from database import get_async_db
+from response_cache import VIDEOS_KEY, cached_response_async, rating_key, reviews_key, video_key
+from routers.video import (
+    CATALOG_DEFAULT_PAGE_SIZE,
+    CATALOG_MAX_PAGE_SIZE,
+    NESTED_DEFAULT_PAGE_SIZE,
+    NESTED_MAX_PAGE_SIZE,
+    children_page,
+    parse_video_fields,
+    parse_video_includes,
+    search_page,
+    video_variant,
+)
+
+router = APIRouter()
+
+
+# ==============================================================================
+# Vidéos
+# ==============================================================================
+@router.post("/videos/", response_model=schemas.VideoResponse, status_code=201, tags=["Videos"])
+async def create_video(video: schemas.VideoCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Crée une nouvelle vidéo à partir des données YouTube.
+    """
+    return await crud_async.create_video(db, video.youtube_url, video.mentor_email, video.category, video.order)
+
+
+@router.get("/videos/catalog", response_model=schemas.VideoPage, tags=["Videos"])
+async def get_catalog(
+    limit: int = Query(CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    mentor_email: Optional[str] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Récupère une page du catalogue de vidéos, paginée par curseur.
+    """
+    videos, next_cursor = await crud_async.list_videos_page(db, limit, cursor, mentor_email, category)
+    return {"items": videos, "next_cursor": next_cursor}
+
+
+@router.get("/videos/search", response_model=schemas.VideoSearchPage, tags=["Videos"])
+async def search_videos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    mentor_email: Optional[str] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Recherche des vidéos par mots du titre ou de la description, triées par pertinence.
+    """
+    return search_page(*await crud_async.search_videos(db, q, limit, cursor, mentor_email, category))
+
+
+@router.get(
+    "/videos/{video_id:int}", response_model=schemas.VideoDetail, response_model_exclude_unset=True, tags=["Videos"]
+)
+async def get_video(
+    video_id: int,
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Récupère les champs demandés d'une vidéo et, sur demande (include), la
+    première page de ses progressions et avis (réponse en cache, avec ETag).
+    """
+    selected = parse_video_fields(fields)
+    includes = parse_video_includes(include)
+
+    async def load():
+        video = await crud_async.get_video_fields(db, video_id, selected)
+        if not video:
+            raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+        data = crud.video_to_dict(video, selected)
+        if "progress" in includes:
+            data["progress"] = children_page(
+                *await crud_async.get_video_progress_page(db, video_id, limit), schemas.ProgressResponse
+            )
+        if "reviews" in includes:
+            data["reviews"] = children_page(
+                *await crud_async.get_video_reviews_page(db, video_id, limit), schemas.ReviewResponse
+            )
+        return data
+
+    return await cached_response_async(request, video_key(video_id), load, video_variant(selected, includes, limit))
+
+
+@router.get("/videos/{video_id:int}/progress", response_model=schemas.ProgressPage, tags=["Videos"])
+async def get_video_progress(
+    video_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Récupère une page des progressions d'une vidéo, triées par ID.
+    """
+    async def load():
+        return children_page(
+            *await crud_async.get_video_progress_page(db, video_id, limit, cursor), schemas.ProgressResponse
+        )
+
+    return await cached_response_async(request, video_key(video_id), load, f"progress&cursor={cursor or ''}&limit={limit}")
+
+
+@router.get("/videos/{video_id:int}/reviews", response_model=schemas.ReviewPage, tags=["Videos"])
+async def get_video_reviews(
+    video_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Récupère une page des avis d'une vidéo, triés par ID.
+    """
+    async def load():
+        return children_page(
+            *await crud_async.get_video_reviews_page(db, video_id, limit, cursor), schemas.ReviewResponse
+        )
+
+    return await cached_response_async(request, reviews_key(video_id), load, f"page&cursor={cursor or ''}&limit={limit}")
+
+
+@router.put("/videos/{video_id:int}", response_model=schemas.VideoResponse, tags=["Videos"])
+async def update_video(video_id: int, video_update: schemas.VideoUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Met à jour les informations d'une vidéo.
+    """
+    return await crud_async.update_video(
+        db, video_id, video_update.title, video_update.description, video_update.category
+    )
+
+
+@router.put("/videos/{video_id:int}/update_order", response_model=schemas.VideoResponse, tags=["Videos"])
+async def update_video_order(video_id: int, new_order: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Met à jour l'ordre d'une vidéo.
+    """
+    video = await crud_async.update_video_order(db, video_id, new_order)
+    if not video:
+        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+    return video
+
+
+@router.delete("/videos/{video_id:int}", status_code=204, tags=["Videos"])
+async def delete_video(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Supprime une vidéo en fonction de son ID.
+    """
+    await crud_async.delete_video(db, video_id)
+    return {"message": "Vidéo supprimée avec succès"}
+
+
+@router.get(
+    "/videos/videos/", response_model=list[schemas.VideoDetail], response_model_exclude_unset=True, tags=["Videos"]
+)
+async def get_all_videos(request: Request, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    Récupère les champs demandés de l'ensemble des vidéos, triées par catégorie
+    puis par ordre (réponse en cache, avec ETag).
+    """
+    selected = parse_video_fields(fields)
+
+    async def load():
+        return [crud.video_to_dict(video, selected) for video in await crud_async.list_videos_fields(db, selected)]
+
+    return await cached_response_async(request, VIDEOS_KEY, load, video_variant(selected))
+
+
+# ==============================================================================
+# Progression
+# ==============================================================================
+@router.post(
+    "/progress/", response_model=Union[schemas.ProgressResponse, schemas.ProgressQueued], tags=["Progression"]
+)
+async def track_progress(progress: schemas.ProgressCreate, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    Enregistre la progression d'une vidéo pour un utilisateur (202 en mode tampon).
+    """
+    buffer = progress_buffer.get_progress_buffer()
+    if buffer is not None:
+        response.status_code = 202
+    return await crud_async.track_progress(db, progress.video_id, progress.mentee_email, buffer=buffer)
+
+
+@router.post("/progress/heartbeat", response_model=schemas.HeartbeatResult, tags=["Progression"])
+async def record_heartbeats(batch: schemas.HeartbeatBatch, db: AsyncSession = Depends(get_async_db)):
+    """
+    Enregistre un lot de battements de lecture d'un mentee en un seul upsert.
+    """
+    return await crud_async.record_heartbeats(db, batch.mentee_email, batch.samples)
+
+
+# ==============================================================================
+# Avis
+# ==============================================================================
+@router.post("/reviews/", response_model=schemas.ReviewResponse, tags=["Reviews"])
+async def create_review(review_data: schemas.ReviewCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Ajoute un avis à une vidéo.
+    """
+    try:
+        return await crud_async.add_review(db, review_data)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Une erreur interne est survenue lors de la création de l'avis"
+        )
+
+
+@router.get("/reviews/{video_id:int}", response_model=List[schemas.ReviewResponse], tags=["Reviews"])
+async def list_reviews(video_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Récupère les avis d'une vidéo (réponse en cache, avec ETag).
+    """
+    async def load():
+        return [schemas.ReviewResponse.from_orm(review) for review in await crud_async.get_reviews_for_video(db, video_id)]
+
+    try:
+        return await cached_response_async(request, reviews_key(video_id), load)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de la récupération des avis"
+        )
+
+
+@router.get("/videos/{video_id:int}/rating", response_model=float, tags=["Reviews"])
+async def video_rating(video_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Renvoie la note moyenne d'une vidéo (réponse en cache, avec ETag).
+    """
+    async def load():
+        return float(await crud_async.get_average_rating(db, video_id))
+
+    try:
+        return await cached_response_async(request, rating_key(video_id), load)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors du calcul de la note moyenne"
+        )
+
+
+@router.get("/videos/{video_id:int}/rating/summary", response_model=schemas.RatingSummary, tags=["Reviews"])
+async def video_rating_summary(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Renvoie le nombre d'avis, la note moyenne et la répartition des notes d'une vidéo.
+    """
+    return await crud_async.get_rating_summary(db, video_id)
+
+
+# ==============================================================================
+# Utilisateurs
+# ==============================================================================
+@router.post("/users/", response_model=schemas.UserResponse, tags=["Users"])
+async def create_new_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Crée un nouvel utilisateur.
+    """
+    if await crud_async.get_user_by_email(db, user.email):
+        raise HTTPException(status_code=400, detail="Email déjà enregistré")
+    return await crud_async.create_user(db, user.dict())
+
+
+@router.get("/users/{user_id:int}", response_model=schemas.UserResponse, tags=["Users"])
+async def read_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Récupère un utilisateur par son ID.
+    """
+    return await crud_async.get_user(db, user_id)
+
+
+@router.put("/users/{user_id:int}", response_model=schemas.UserResponse, tags=["Users"])
+async def update_existing_user(user_id: int, user_update: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Met à jour les informations d'un utilisateur.
+    """
+    return await crud_async.update_user(db, user_id, user_update.dict(exclude_unset=True))
+
+
+@router.delete("/users/{user_id:int}", response_model=schemas.UserResponse, tags=["Users"])
+async def delete_existing_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Supprime un utilisateur de la base de données.
+    """
+    return await crud_async.delete_user(db, user_id)
@@ -0,0 +1,134 @@
+"""
+Export en flux des tables videos, reviews et progress, au format NDJSON ou CSV.
+
+Destiné aux outils d'analyse et réservé à ceux-ci : chaque requête doit
+porter le jeton EXPORT_API_TOKEN (en-tête Authorization: Bearer <jeton>) ;
+sans jeton configuré, l'export est désactivé.
+
+Les lignes sont lues par lots de EXPORT_YIELD_PER, une requête par lot
+paginée par clé (WHERE id > :dernier ORDER BY id LIMIT n), et envoyées au fil
+de l'eau (StreamingResponse). La mémoire utilisée ne dépend pas de la taille
+de la table, y compris avec un pilote qui lit tout le résultat d'une requête
+côté client (mysql-connector n'a pas de curseur côté serveur).
+
+Pour un export incrémental, passer ?updated_since= la valeur de l'en-tête
+X-Export-Started-At de l'export précédent. Les dates de modification sont
+fixées par l'application avant le commit : une transaction datée juste avant
+le début d'un export peut n'être validée qu'après. L'en-tête est donc reculé
+de EXPORT_WATERMARK_LAG_SECONDS, et le filtre est inclusif (>=) : un export
+incrémental peut renvoyer des lignes déjà reçues, à dédoublonner par ID.
+"""
+import csv
+import hmac
+import io
+import json
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+import database
+from config import get_settings
+from crud import export_columns, export_key, export_statement
+
+
+def require_export_token(authorization: Optional[str] = Header(None)):
+    """
+    Vérifie le jeton d'export (en-tête Authorization: Bearer <EXPORT_API_TOKEN>).
+
+    Raises:
+        HTTPException: 403 si l'export est désactivé (aucun jeton configuré),
+            401 si le jeton est absent ou invalide.
+    """
+    token = get_settings().EXPORT_API_TOKEN
+    if not token:
+        raise HTTPException(status_code=403, detail="Export désactivé : définissez EXPORT_API_TOKEN")
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=401, detail="Jeton d'export invalide", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+router = APIRouter(dependencies=[Depends(require_export_token)])
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_export(table: str, export_format: str, updated_since: datetime = None):
+    """
+    Générateur des morceaux de l'export : un morceau par lot de lignes lu en base.
+
+    La session est ouverte ici et non par la dépendance get_db : celle-ci est
+    refermée avant l'envoi du corps d'une StreamingResponse. Chaque lot est lu
+    dans sa propre transaction : la connexion est rendue au pool pendant l'envoi.
+    """
+    batch_size = get_settings().EXPORT_YIELD_PER
+    columns = export_columns(table)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if export_format == "csv":
+        writer.writerow(columns)
+
+    after = None
+    with database.SessionLocal() as db:
+        while True:
+            rows = db.execute(export_statement(table, updated_since, after, batch_size)).all()
+            db.commit()
+            if export_format == "csv":
+                writer.writerows([[_export_value(value) for value in row] for row in rows])
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(
+                        {column: _export_value(value) for column, value in zip(columns, row)},
+                        ensure_ascii=False,
+                    ))
+                    buffer.write("\n")
+            # Lot non vide, ou en-tête CSV d'une table vide
+            if buffer.tell():
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if len(rows) < batch_size:
+                break
+            after = export_key(table, rows[-1], updated_since)
+
+
+@router.get("/{table}")
+def export_table(
+    table: Literal["videos", "reviews", "progress"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    updated_since: Optional[datetime] = None,
+):
+    """
+    Exporte en flux toutes les lignes d'une table (videos, reviews ou progress).
+
+    Args:
+        table (str): Table à exporter.
+        format (str): "ndjson" (un objet JSON par ligne) ou "csv" (avec ligne d'en-tête).
+        updated_since (datetime, optionnel): N'exporte que les lignes modifiées
+            (créées, pour les avis) depuis cette date UTC, triées par date de modification.
+
+    Returns:
+        StreamingResponse: Les lignes de la table. L'en-tête X-Export-Started-At
+        donne la valeur de updated_since à utiliser pour l'export incrémental
+        suivant (début de l'export moins EXPORT_WATERMARK_LAG_SECONDS).
+    """
+    # Marge pour les transactions datées avant le début de l'export mais validées après
+    started_at = datetime.utcnow() - timedelta(seconds=get_settings().EXPORT_WATERMARK_LAG_SECONDS)
+    return StreamingResponse(
+        stream_export(table, format, updated_since),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{table}.{format}"',
+            "X-Export-Started-At": started_at.isoformat(),
+        },
+    )
@@ -0,0 +1,54 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+import crud, schemas
+from database import get_db
+from response_cache import cached_response, leaderboard_key
+
+router = APIRouter()
+
+# Taille par défaut et maximale d'un classement renvoyé
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+
+@router.get("/{board}", response_model=schemas.Leaderboard)
+def get_leaderboard(
+    board: Literal["top-rated", "most-watched-7d", "most-watched-30d", "trending"],
+    request: Request,
+    category: Optional[str] = None,
+    limit: int = Query(LEADERBOARD_DEFAULT_LIMIT, ge=1, le=LEADERBOARD_MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Renvoie les premières vidéos d'un classement :
+    - top-rated : meilleure note (note bayésienne, pondérée par le nombre d'avis) ;
+    - most-watched-7d / most-watched-30d : les plus regardées sur 7 / 30 jours ;
+    - trending : les plus regardées ces derniers jours, les visionnages récents comptant davantage.
+
+    Les classements sont précalculés périodiquement (LEADERBOARD_REFRESH_INTERVAL_SECONDS) :
+    une lecture ne coûte qu'une requête sur les `limit` premiers rangs, quel que
+    soit le nombre de vidéos ou de progressions. Au plus LEADERBOARD_SIZE vidéos
+    sont classées. La réponse est mise en cache et porte un ETag.
+
+    Args:
+        board (str): Nom du classement.
+        request (Request): Requête HTTP (en-tête If-None-Match).
+        category (str, optionnel): Classement limité à une catégorie.
+        limit (int): Nombre de vidéos renvoyées (entre 1 et LEADERBOARD_MAX_LIMIT).
+        db (Session): Session de base de données.
+
+    Returns:
+        schemas.Leaderboard: Les vidéos classées, du premier au dernier rang, et la date du calcul.
+    """
+    def load():
+        rows, refreshed_at = crud.get_leaderboard(db, board, limit, category)
+        items = [
+            schemas.LeaderboardItem(rank=rank, score=score, video=schemas.VideoSummary.from_orm(video))
+            for rank, score, video in rows
+        ]
+        return schemas.Leaderboard(board=board, category=category, refreshed_at=refreshed_at, items=items)
+
+    return cached_response(request, leaderboard_key(board), load, f"category={category or ''}&limit={limit}")
@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+import database
+import metrics
+from response_cache import get_response_cache
+
+router = APIRouter()
+# Exposé à la racine (GET /metrics), chemin attendu par Prometheus
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Renvoie les métriques du worker courant au format texte de Prometheus :
+    latences et nombre de requêtes par route, requêtes en cours, requêtes SQL
+    par requête HTTP, pools de connexions, appels à l'API YouTube, caches.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/database/pool")
+def database_pool_stats():
+    """
+    Renvoie l'état des pools de connexions du worker courant : connexions prises,
+    libres et en débordement, nombre d'obtentions et temps d'attente d'une connexion.
+
+    Les valeurs sont propres au processus qui répond (un pool par worker uvicorn).
+    """
+    return database.get_pool_stats()
+
+
+@router.get("/response-cache")
+def response_cache_stats():
+    """
+    Renvoie les métriques du cache de réponses du worker courant (entrées, succès, échecs, réponses 304).
+    """
+    return get_response_cache().stats()
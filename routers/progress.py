@@ -1,42 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Union
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-import crud, database, schemas, models
+from starlette.concurrency import run_in_threadpool
+import bulk_import, crud, schemas, progress_buffer
+from database import get_db
+from query_guard import query_budget
 
 router = APIRouter()
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/")
-def track_progress(progress: schemas.ProgressCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=Union[schemas.ProgressResponse, schemas.ProgressQueued])
+def track_progress(progress: schemas.ProgressCreate, response: Response, db: Session = Depends(get_db)):
     """
     Enregistre la progression d'une vidéo pour un utilisateur.
 
-    Étapes :
-    1. Vérifie si la vidéo existe dans la base de données.
-    2. Si la vidéo n'existe pas, lève une exception HTTP 404 avec un message d'erreur approprié.
-    3. Si la vidéo existe, appelle la fonction CRUD pour enregistrer la progression et retourne le résultat.
+    L'incrément est délégué à la couche CRUD : une transaction met à jour les
+    compteurs d'engagement de la vidéo (ce qui révèle une vidéo inexistante)
+    puis incrémente la progression par un upsert atomique.
+
+    En mode tampon (PROGRESS_BUFFER_ENABLED), l'incrément est mis en attente
+    et écrit plus tard en lot : la réponse est alors 202 avec le nombre
+    d'incréments en attente.
 
     Args:
         progress (schemas.ProgressCreate): Objet contenant les informations sur la progression (ID de la vidéo, email du mentee, etc.).
         db (Session, optionnel): Session de base de données injectée par la dépendance get_db.
 
     Returns:
-        Le résultat de l'opération de suivi de progression, tel que défini dans la couche CRUD.
+        La progression à jour du mentee pour cette vidéo, ou l'accusé de mise en tampon.
 
     Raises:
         HTTPException: Si la vidéo correspondant à progress.video_id n'est pas trouvée.
     """
-    # Vérification de l'existence de la vidéo en interrogeant la base de données
-    video = db.query(models.Video).filter(models.Video.id == progress.video_id).first()
+    buffer = progress_buffer.get_progress_buffer()
+    if buffer is not None:
+        response.status_code = 202
+    return crud.track_progress(db, progress.video_id, progress.mentee_email, buffer=buffer)
 
-    # Si la vidéo n'existe pas, on lève une exception HTTP 404
-    if not video:
-        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
 
-    # Enregistrement de la progression via la fonction CRUD et retour du résultat
-    return crud.track_progress(db, progress.video_id, progress.mentee_email)
+@router.post("/heartbeat", response_model=schemas.HeartbeatResult)
+def record_heartbeats(batch: schemas.HeartbeatBatch, db: Session = Depends(get_db)):
+    """
+    Enregistre un lot de battements de lecture d'un mentee : positions de
+    lecture (en secondes) relevées périodiquement par le lecteur, pour une ou
+    plusieurs vidéos.
+
+    Les échantillons sont fusionnés par vidéo puis écrits en un seul upsert :
+    la position de reprise est celle du dernier échantillon, la position
+    maximale et l'indicateur de fin de lecture ne reculent jamais. Le compteur
+    `watched` (sessions de visionnage, POST /progress/) n'est pas incrémenté,
+    mais passe à 1 au moins : une vidéo d'abord suivie par battements compte
+    une fois comme regardée (spectateur, visionnage et classements).
+
+    Returns:
+        Le nombre de progressions écrites et les IDs des vidéos inexistantes, ignorées.
+    """
+    return crud.record_heartbeats(db, batch.mentee_email, batch.samples)
+
+
+@router.post("/import", response_model=schemas.ImportResult, dependencies=[Depends(query_budget())])
+async def import_progress(
+    request: Request, format: Literal["csv", "ndjson"] = "ndjson", db: Session = Depends(get_db)
+):
+    """
+    Importe en masse un historique de progression depuis le corps de la requête
+    (CSV avec ligne d'en-tête, ou NDJSON), colonnes video_id, mentee_email, watched.
+
+    Les lignes sont validées et écrites par lots (un upsert et un commit par
+    lot). Pour un couple (vidéo, mentee) déjà suivi, la plus grande valeur de
+    `watched` est conservée : réimporter le même fichier est sans effet. Les
+    lignes invalides ou portant sur une vidéo inexistante sont renvoyées dans
+    "errors" sans interrompre l'import.
+    """
+    lines = await bulk_import.read_request_lines(request)
+    return await run_in_threadpool(bulk_import.import_progress, db, lines, format)
+
+
+@router.get("/buffer/stats")
+def progress_buffer_stats():
+    """
+    Renvoie les métriques du tampon de progression (profondeur, latence des écritures).
+    """
+    buffer = progress_buffer.get_progress_buffer()
+    if buffer is None:
+        return {"enabled": False}
+    return {"enabled": True, **buffer.stats()}
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
-from schemas import ReviewCreate, ReviewResponse
-from crud import add_review, get_reviews_for_video, get_average_rating
+from schemas import ReviewCreate, ReviewResponse, RatingSummary
+from crud import add_review, get_reviews_for_video, get_average_rating, get_rating_summary
 from database import get_db
+from response_cache import cached_response, rating_key, reviews_key
 
 router = APIRouter()
 
@@ -28,18 +29,21 @@ def create_review(review_data: ReviewCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/reviews/{video_id}", response_model=List[ReviewResponse])
-def list_reviews(video_id: int, db: Session = Depends(get_db)):
+def list_reviews(video_id: int, request: Request, db: Session = Depends(get_db)):
     """
-    Récupère les avis d'une vidéo.
+    Récupère les avis d'une vidéo (réponse en cache, avec ETag).
     """
-    try:
+    def load():
         reviews = get_reviews_for_video(db, video_id)
         if reviews is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Aucun avis trouvé pour cette vidéo"
             )
-        return reviews
+        return [ReviewResponse.from_orm(review) for review in reviews]
+
+    try:
+        return cached_response(request, reviews_key(video_id), load)
     except Exception as e:
         # Log de l'exception si nécessaire
         raise HTTPException(
@@ -48,21 +52,31 @@ def list_reviews(video_id: int, db: Session = Depends(get_db)):
         )
 
 @router.get("/videos/{video_id}/rating", response_model=float)
-def video_rating(video_id: int, db: Session = Depends(get_db)):
+def video_rating(video_id: int, request: Request, db: Session = Depends(get_db)):
     """
-    Renvoie la note moyenne d'une vidéo.
+    Renvoie la note moyenne d'une vidéo (réponse en cache, avec ETag).
     """
-    try:
+    def load():
         rating = get_average_rating(db, video_id)
         if rating is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Vidéo introuvable ou pas d'avis pour cette vidéo"
             )
-        return rating
+        return float(rating)
+
+    try:
+        return cached_response(request, rating_key(video_id), load)
     except Exception as e:
         # Log de l'exception si besoin
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erreur lors du calcul de la note moyenne"
         )
+
+@router.get("/videos/{video_id}/rating/summary", response_model=RatingSummary)
+def video_rating_summary(video_id: int, db: Session = Depends(get_db)):
+    """
+    Renvoie le nombre d'avis, la note moyenne et la répartition des notes d'une vidéo.
+    """
+    return get_rating_summary(db, video_id)
@@ -1,20 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from schemas import UserCreate, UserResponse
+from starlette.concurrency import run_in_threadpool
+
+import bulk_import
+from schemas import ImportResult, MenteeDashboard, UserCreate, UserResponse
 from models import User
-from database import SessionLocal
-from crud import create_user, get_user, update_user, delete_user
+from query_guard import query_budget
+from database import get_db
+from crud import create_user, get_user, update_user, delete_user, get_mentee_dashboard
 
 router = APIRouter()
 
-# Dépendance pour obtenir une session de base de données
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @router.post("/", response_model=UserResponse, tags=["Users"])
 def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -28,6 +26,22 @@ def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     return create_user(db, user.dict())
 
 
+@router.post("/import", response_model=ImportResult, tags=["Users"], dependencies=[Depends(query_budget())])
+async def import_users(
+    request: Request, format: Literal["csv", "ndjson"] = "ndjson", db: Session = Depends(get_db)
+):
+    """
+    Importe en masse des utilisateurs depuis le corps de la requête (CSV avec
+    ligne d'en-tête, ou NDJSON : un objet JSON par ligne), avec les champs de UserCreate.
+
+    Les lignes sont validées et insérées par lots (un INSERT multi-lignes et
+    un commit par lot) ; les lignes invalides, les emails en double ou déjà
+    enregistrés sont renvoyés dans "errors" sans interrompre l'import.
+    """
+    lines = await bulk_import.read_request_lines(request)
+    return await run_in_threadpool(bulk_import.import_users, db, lines, format)
+
+
 @router.get("/{user_id}", response_model=UserResponse, tags=["Users"])
 def read_user(user_id: int, db: Session = Depends(get_db)):
     """
@@ -36,6 +50,18 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
     return get_user(db, user_id)
 
 
+@router.get("/{email}/progress", response_model=MenteeDashboard, tags=["Users"])
+def read_mentee_dashboard(email: str, category: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Tableau de bord d'un mentee : avancement par catégorie (vidéos regardées
+    et notées), liste des vidéos regardées et note laissée pour chacune.
+
+    Calculé en une seule requête (jointure externe videos / progress / reviews
+    restreinte au mentee), au lieu d'un GET /videos/{id} par vidéo.
+    """
+    return get_mentee_dashboard(db, email, category)
+
+
 @router.put("/{user_id}", response_model=UserResponse, tags=["Users"])
 def update_existing_user(user_id: int, user_update: UserCreate, db: Session = Depends(get_db)):
     """
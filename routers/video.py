@@ -1,30 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-import crud, database, schemas, models
+import crud, schemas, models
+from database import get_db
+from response_cache import VIDEOS_KEY, cached_response, invalidate_videos, reviews_key, video_key
 
 # Création du routeur FastAPI. Vous pouvez ajouter un préfixe et des tags si nécessaire,
 # par exemple : APIRouter(prefix="/videos", tags=["Videos"])
 router = APIRouter()
 
+# Taille de page par défaut et maximale du catalogue paginé
+CATALOG_DEFAULT_PAGE_SIZE = 20
+CATALOG_MAX_PAGE_SIZE = 100
+
+# Collections imbriquées disponibles via ?include= et taille de leurs pages
+VIDEO_INCLUDES = ("progress", "reviews")
+NESTED_DEFAULT_PAGE_SIZE = 20
+NESTED_MAX_PAGE_SIZE = 100
+
 
-# Dépendance pour obtenir une session de base de données
-def get_db():
+def parse_video_fields(fields: Optional[str]) -> tuple:
+    """
+    Convertit le paramètre ?fields= (liste séparée par des virgules) en tuple de
+    champs, dans l'ordre de crud.VIDEO_FIELDS. Sans paramètre : champs par défaut.
+
+    Raises:
+        HTTPException: Si un champ est inconnu (erreur 400).
     """
-    Générateur de sessions de base de données.
-    Récupère une session depuis database.SessionLocal et s'assure de sa fermeture après utilisation.
+    if not fields:
+        return crud.DEFAULT_VIDEO_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(crud.VIDEO_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Champ(s) inconnu(s) : {', '.join(sorted(unknown))}. Champs disponibles : {', '.join(crud.VIDEO_FIELDS)}",
+        )
+    return tuple(field for field in crud.VIDEO_FIELDS if field in requested)
+
+
+def parse_video_includes(include: Optional[str]) -> tuple:
     """
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    Convertit le paramètre ?include= en tuple de collections (progress, reviews).
+
+    Raises:
+        HTTPException: Si une collection est inconnue (erreur 400).
+    """
+    requested = {name.strip() for name in (include or "").split(",") if name.strip()}
+    unknown = requested - set(VIDEO_INCLUDES)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Inclusion(s) inconnue(s) : {', '.join(sorted(unknown))}. Valeurs possibles : {', '.join(VIDEO_INCLUDES)}",
+        )
+    return tuple(name for name in VIDEO_INCLUDES if name in requested)
+
+
+def video_variant(fields: tuple, includes: tuple = (), limit: int = None) -> str:
+    """Variante de cache d'une réponse vidéo ("" pour la réponse par défaut)."""
+    if fields == crud.DEFAULT_VIDEO_FIELDS and not includes:
+        return ""
+    variant = "fields=" + ",".join(fields)
+    if includes:
+        variant += f"&include={','.join(includes)}&limit={limit}"
+    return variant
+
+
+def children_page(items: list, next_cursor: Optional[str], schema) -> dict:
+    """Sérialise une page de progressions ou d'avis."""
+    return {"items": [schema.from_orm(item) for item in items], "next_cursor": next_cursor}
 
 
 @router.post("/", response_model=schemas.VideoResponse, status_code=201)
-def create_video(video: schemas.VideoCreate, db: Session = Depends(get_db)):
+async def create_video(video: schemas.VideoCreate, db: Session = Depends(get_db)):
     """
     Crée une nouvelle vidéo dans la base de données.
 
+    L'endpoint est asynchrone : l'appel à l'API YouTube est attendu sans
+    bloquer de thread, et les accès à la base passent par le threadpool.
+
     Étapes :
     1. Vérifie si une vidéo avec la même URL YouTube existe déjà.
        Si c'est le cas, renvoie une erreur HTTP 400 pour éviter les doublons.
@@ -41,34 +96,226 @@ def create_video(video: schemas.VideoCreate, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Si une vidéo avec la même URL existe déjà.
     """
-    # Vérification si la vidéo existe déjà dans la base de données
-    existing_video = db.query(models.Video).filter(models.Video.youtube_url == video.youtube_url).first()
-    if existing_video:
-        raise HTTPException(status_code=400, detail="Une vidéo avec cette URL existe déjà")
-
     # Appel à la couche CRUD pour créer la vidéo
-    return crud.create_video(db, video.youtube_url, video.mentor_email, video.category, video.order)
+    return await crud.create_video_async(db, video.youtube_url, video.mentor_email, video.category, video.order)
+
+
+@router.post("/bulk", response_model=schemas.VideoBulkResult, status_code=201)
+def create_videos_bulk(payload: schemas.VideoBulkCreate, db: Session = Depends(get_db)):
+    """
+    Crée plusieurs vidéos d'un coup (ex : toute une playlist).
+
+    Les métadonnées sont récupérées par paquets de 50 IDs auprès de YouTube et
+    toutes les vidéos sont insérées dans une seule transaction. Les entrées
+    invalides, en double ou introuvables sont renvoyées dans "errors" sans
+    bloquer les autres.
+
+    Args:
+        payload (schemas.VideoBulkCreate): Liste des vidéos à créer.
+        db (Session): Session de base de données.
+
+    Returns:
+        schemas.VideoBulkResult: Les vidéos créées et les entrées refusées.
+    """
+    return crud.create_videos_bulk(db, payload.videos)
+
+
+@router.put("/reorder", response_model=schemas.VideoReorderResult)
+def reorder_videos(payload: schemas.VideoReorder, db: Session = Depends(get_db)):
+    """
+    Réordonne en une seule transaction toutes les vidéos d'un parcours
+    (vidéos d'un mentor dans une catégorie).
+
+    `video_ids` doit contenir chaque vidéo du parcours exactement une fois,
+    dans le nouvel ordre : les ordres deviennent 1, 2, 3... (uniques et sans
+    trou). Seules les vidéos dont l'ordre change sont mises à jour, par une
+    seule requête UPDATE ... CASE.
+
+    Args:
+        payload (schemas.VideoReorder): Parcours et IDs des vidéos dans le nouvel ordre.
+        db (Session): Session de base de données.
+
+    Returns:
+        schemas.VideoReorderResult: Le nouvel ordre et le nombre de vidéos modifiées.
+
+    Raises:
+        HTTPException: Si la liste ne correspond pas exactement aux vidéos du parcours (erreur 400).
+    """
+    return crud.reorder_videos(db, payload.mentor_email, payload.category, payload.video_ids)
+
+
+@router.get("/catalog", response_model=schemas.VideoPage)
+def get_catalog(
+    limit: int = Query(CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    mentor_email: Optional[str] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Récupère une page du catalogue de vidéos, paginée par curseur.
+
+    Les vidéos sont triées par catégorie, ordre puis identifiant, et renvoyées
+    sans leurs progressions ni leurs avis : une page coûte une seule requête.
+
+    Args:
+        limit (int): Nombre de vidéos par page (entre 1 et CATALOG_MAX_PAGE_SIZE).
+        cursor (str, optionnel): Curseur renvoyé par la page précédente.
+        mentor_email (str, optionnel): Filtre sur le mentor.
+        category (str, optionnel): Filtre sur la catégorie.
+        db (Session): Session de base de données.
+
+    Returns:
+        schemas.VideoPage: Les vidéos de la page et le curseur de la page suivante.
+
+    Raises:
+        HTTPException: Si le curseur est invalide (erreur 400).
+    """
+    videos, next_cursor = crud.list_videos_page(db, limit, cursor, mentor_email, category)
+    return {"items": videos, "next_cursor": next_cursor}
+
+
+def search_page(rows: list, next_cursor: Optional[str]) -> dict:
+    """Sérialise une page de résultats de recherche (lignes (Video, score))."""
+    items = [schemas.VideoSearchResult(**schemas.VideoSummary.from_orm(video).dict(), score=score) for video, score in rows]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/search", response_model=schemas.VideoSearchPage)
+def search_videos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    mentor_email: Optional[str] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Recherche des vidéos par mots du titre ou de la description.
 
+    Chaque mot doit apparaître (au début d'un mot : "flut" trouve "Flutter"),
+    sans tenir compte de la casse ni des accents. Les résultats sont triés par
+    pertinence décroissante et paginés par curseur ; une page coûte une seule
+    requête, servie par l'index plein texte (FULLTEXT sous MySQL, FTS5 sous SQLite).
 
-@router.get("/{video_id}", response_model=schemas.VideoResponse)
-def get_video(video_id: int, db: Session = Depends(get_db)):
+    Args:
+        q (str): Mots recherchés.
+        limit (int): Nombre de résultats par page (entre 1 et CATALOG_MAX_PAGE_SIZE).
+        cursor (str, optionnel): Curseur renvoyé par la page précédente.
+        mentor_email (str, optionnel): Filtre sur le mentor.
+        category (str, optionnel): Filtre sur la catégorie.
+        db (Session): Session de base de données.
+
+    Returns:
+        schemas.VideoSearchPage: Les résultats de la page et le curseur de la page suivante.
+
+    Raises:
+        HTTPException: Si la recherche ne contient aucun mot ou si le curseur est invalide (erreur 400).
+    """
+    return search_page(*crud.search_videos(db, q, limit, cursor, mentor_email, category))
+
+
+@router.get("/{video_id}", response_model=schemas.VideoDetail, response_model_exclude_unset=True)
+def get_video(
+    video_id: int,
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
     """
     Récupère une vidéo en fonction de son ID.
 
+    Seules les colonnes demandées sont lues en base (load_only) :
+    - fields : champs à renvoyer, séparés par des virgules (par défaut tous
+      sauf description et les compteurs review_count, viewer_count et watch_count) ;
+    - include : collections imbriquées à joindre (progress, reviews), renvoyées
+      par pages de `limit` éléments ; la suite se lit via GET /videos/{id}/progress
+      et GET /videos/{id}/reviews avec le curseur renvoyé.
+
+    La réponse est mise en cache (invalidée à chaque écriture sur la vidéo) et
+    porte un ETag : un client qui renvoie If-None-Match reçoit 304 si rien n'a changé.
+
     Args:
         video_id (int): L'identifiant de la vidéo.
+        request (Request): Requête HTTP (en-tête If-None-Match).
+        fields (str, optionnel): Champs à renvoyer.
+        include (str, optionnel): Collections imbriquées à renvoyer.
+        limit (int): Taille de la première page des collections imbriquées.
         db (Session): Session de base de données.
 
     Returns:
-        schemas.VideoResponse: La vidéo correspondante.
+        schemas.VideoDetail: Les champs demandés de la vidéo.
 
     Raises:
-        HTTPException: Si la vidéo n'est pas trouvée (erreur 404).
+        HTTPException: Si la vidéo n'est pas trouvée (404) ou si un paramètre est invalide (400).
     """
-    video = db.query(models.Video).filter(models.Video.id == video_id).first()
-    if not video:
-        raise HTTPException(status_code=404, detail="Vidéo non trouvée")
-    return video
+    selected = parse_video_fields(fields)
+    includes = parse_video_includes(include)
+
+    def load():
+        video = crud.get_video_fields(db, video_id, selected)
+        if not video:
+            raise HTTPException(status_code=404, detail="Vidéo non trouvée")
+        data = crud.video_to_dict(video, selected)
+        if "progress" in includes:
+            data["progress"] = children_page(
+                *crud.get_video_progress_page(db, video_id, limit), schemas.ProgressResponse
+            )
+        if "reviews" in includes:
+            data["reviews"] = children_page(*crud.get_video_reviews_page(db, video_id, limit), schemas.ReviewResponse)
+        return data
+
+    return cached_response(request, video_key(video_id), load, video_variant(selected, includes, limit))
+
+
+@router.get("/{video_id}/progress", response_model=schemas.ProgressPage)
+def get_video_progress(
+    video_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Récupère une page des progressions d'une vidéo, triées par ID.
+
+    Args:
+        cursor (str, optionnel): Curseur renvoyé par la page précédente.
+        limit (int): Nombre de progressions par page.
+
+    Returns:
+        schemas.ProgressPage: Les progressions de la page et le curseur de la page suivante.
+    """
+    def load():
+        return children_page(*crud.get_video_progress_page(db, video_id, limit, cursor), schemas.ProgressResponse)
+
+    return cached_response(request, video_key(video_id), load, f"progress&cursor={cursor or ''}&limit={limit}")
+
+
+@router.get("/{video_id}/reviews", response_model=schemas.ReviewPage)
+def get_video_reviews(
+    video_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(NESTED_DEFAULT_PAGE_SIZE, ge=1, le=NESTED_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Récupère une page des avis d'une vidéo, triés par ID.
+
+    Args:
+        cursor (str, optionnel): Curseur renvoyé par la page précédente.
+        limit (int): Nombre d'avis par page.
+
+    Returns:
+        schemas.ReviewPage: Les avis de la page et le curseur de la page suivante.
+    """
+    def load():
+        return children_page(*crud.get_video_reviews_page(db, video_id, limit, cursor), schemas.ReviewResponse)
+
+    return cached_response(request, reviews_key(video_id), load, f"page&cursor={cursor or ''}&limit={limit}")
 
 
 @router.put("/{video_id}", response_model=schemas.VideoResponse)
@@ -98,6 +345,8 @@ def update_video_order(video_id: int, new_order: int, db: Session = Depends(get_
     """
     Met à jour l'ordre d'une vidéo.
 
+    Pour réordonner tout un parcours, préférer PUT /videos/reorder (une seule requête).
+
     Args:
         video_id (int): L'identifiant de la vidéo.
         new_order (int): La nouvelle valeur de l'ordre.
@@ -116,6 +365,7 @@ def update_video_order(video_id: int, new_order: int, db: Session = Depends(get_
     # Mise à jour de l'ordre de la vidéo
     video.order = new_order
     db.commit()  # Validation des modifications en base
+    invalidate_videos(video_id)
     db.refresh(video)  # Rafraîchit l'objet vidéo avec les données mises à jour
     return video
 
@@ -144,18 +394,29 @@ def delete_video(video_id: int, db: Session = Depends(get_db)):
     return {"message": "Vidéo supprimée avec succès"}
 
 
-@router.get("/videos/", response_model=list[schemas.VideoResponse])
-def get_all_videos(db: Session = Depends(get_db)):
+@router.get("/videos/", response_model=list[schemas.VideoDetail], response_model_exclude_unset=True)
+def get_all_videos(request: Request, fields: Optional[str] = None, db: Session = Depends(get_db)):
     """
     Récupère l'ensemble des vidéos de la base de données.
 
     Trie les vidéos par catégorie, puis par ordre défini dans chaque catégorie.
+    Seules les colonnes demandées (fields, mêmes valeurs que GET /videos/{id})
+    sont lues ; les progressions et avis ne sont pas inclus : ils se lisent
+    par pages via GET /videos/{id}/progress et GET /videos/{id}/reviews.
+    Préférer GET /videos/catalog pour les listes paginées.
+    La réponse est mise en cache et porte un ETag (If-None-Match -> 304).
 
     Args:
+        request (Request): Requête HTTP (en-tête If-None-Match).
+        fields (str, optionnel): Champs à renvoyer.
         db (Session): Session de base de données.
 
     Returns:
-        list[schemas.VideoResponse]: Liste des vidéos.
+        list[schemas.VideoDetail]: Liste des vidéos.
     """
-    videos = db.query(models.Video).order_by(models.Video.category, models.Video.order).all()
-    return videos
+    selected = parse_video_fields(fields)
+
+    def load():
+        return [crud.video_to_dict(video, selected) for video in crud.list_videos_fields(db, selected)]
+
+    return cached_response(request, VIDEOS_KEY, load, video_variant(selected))
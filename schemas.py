@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -45,6 +45,148 @@ class VideoResponse(VideoCreate):
         # Permet de travailler avec des objets ORM (ex : SQLAlchemy) sans conversion explicite
         orm_mode = True
 
+# ==============================================================================
+# Schéma allégé d'une vidéo pour les listes (catalogue)
+# Ne contient aucune collection imbriquée (progressions, avis) afin qu'une page
+# du catalogue ne déclenche aucun chargement paresseux supplémentaire.
+# ==============================================================================
+class VideoSummary(BaseModel):
+    id: int
+    youtube_url: str
+    mentor_email: str
+    category: str
+    order: int
+    title: Optional[str] = None
+    publication_date: datetime
+    views: int
+    likes: int
+    stars: float
+    # Compteurs dénormalisés sur la vidéo : aucune progression ni aucun avis à charger
+    # Nombre de mentees ayant regardé la vidéo ("N apprenants l'ont regardée")
+    viewer_count: int = 0
+    # Nombre total de visionnages
+    watch_count: int = 0
+    # Nombre d'avis
+    review_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+# ==============================================================================
+# Vidéo avec sélection de champs (GET /videos/{id}?fields=...&include=...)
+# Seuls les champs demandés sont présents dans la réponse ; les progressions et
+# avis ne sont renvoyés que sur demande (include), par pages.
+# ==============================================================================
+class ProgressPage(BaseModel):
+    items: List["ProgressResponse"] = []
+    # Curseur à passer à GET /videos/{id}/progress pour la page suivante
+    next_cursor: Optional[str] = None
+
+class ReviewPage(BaseModel):
+    items: List["ReviewResponse"] = []
+    # Curseur à passer à GET /videos/{id}/reviews pour la page suivante
+    next_cursor: Optional[str] = None
+
+class VideoDetail(BaseModel):
+    id: Optional[int] = None
+    youtube_url: Optional[str] = None
+    mentor_email: Optional[str] = None
+    category: Optional[str] = None
+    order: Optional[int] = None
+    title: Optional[str] = None
+    # Non renvoyée par défaut (fields=description)
+    description: Optional[str] = None
+    publication_date: Optional[datetime] = None
+    views: Optional[int] = None
+    likes: Optional[int] = None
+    stars: Optional[float] = None
+    # Non renvoyé par défaut (fields=review_count)
+    review_count: Optional[int] = None
+    # Non renvoyés par défaut (fields=viewer_count,watch_count)
+    viewer_count: Optional[int] = None
+    watch_count: Optional[int] = None
+    # Première page des progressions (include=progress)
+    progress: Optional[ProgressPage] = None
+    # Première page des avis (include=reviews)
+    reviews: Optional[ReviewPage] = None
+
+# ==============================================================================
+# Page du catalogue paginé par curseur (keyset)
+# ==============================================================================
+class VideoPage(BaseModel):
+    # Vidéos de la page courante
+    items: List[VideoSummary] = []
+    # Curseur opaque à renvoyer pour obtenir la page suivante (None s'il n'y en a plus)
+    next_cursor: Optional[str] = None
+
+# ==============================================================================
+# Résultats de recherche plein texte (GET /videos/search)
+# ==============================================================================
+class VideoSearchResult(VideoSummary):
+    # Pertinence du résultat (plus grand = plus pertinent), propre au moteur de recherche
+    score: float
+
+class VideoSearchPage(BaseModel):
+    # Résultats de la page courante, du plus au moins pertinent
+    items: List[VideoSearchResult] = []
+    # Curseur opaque à renvoyer pour obtenir la page suivante (None s'il n'y en a plus)
+    next_cursor: Optional[str] = None
+
+# ==============================================================================
+# Classements précalculés (GET /leaderboards/{board})
+# ==============================================================================
+class LeaderboardItem(BaseModel):
+    # Rang dans le classement, à partir de 1
+    rank: int
+    # Score ayant déterminé le rang (note bayésienne, nombre de visionnages...)
+    score: float
+    video: VideoSummary
+
+class Leaderboard(BaseModel):
+    board: str
+    # Catégorie classée (None : toutes catégories confondues)
+    category: Optional[str] = None
+    # Date (UTC) du dernier calcul ; None si le classement n'a jamais été calculé
+    refreshed_at: Optional[datetime] = None
+    items: List[LeaderboardItem] = []
+
+# ==============================================================================
+# Import groupé de vidéos (ex : toute une playlist)
+# ==============================================================================
+class VideoBulkCreate(BaseModel):
+    # Vidéos à créer, dans l'ordre souhaité
+    videos: List[VideoCreate] = Field(..., min_items=1, max_items=500)
+
+class VideoBulkError(BaseModel):
+    # URL ou ID fourni en entrée
+    youtube_url: str
+    # Raison du refus
+    detail: str
+
+class VideoBulkResult(BaseModel):
+    # Vidéos créées
+    created: List[VideoSummary] = []
+    # Vidéos refusées, avec la raison
+    errors: List[VideoBulkError] = []
+
+# ==============================================================================
+# Schémas de réordonnancement d'un parcours (vidéos d'un mentor dans une catégorie)
+# ==============================================================================
+class VideoReorder(BaseModel):
+    # Parcours à réordonner
+    mentor_email: str
+    category: str
+    # IDs de toutes les vidéos du parcours, dans le nouvel ordre (positions 1, 2, 3...)
+    video_ids: List[int] = Field(..., min_items=1, max_items=1000)
+
+class VideoReorderResult(BaseModel):
+    mentor_email: str
+    category: str
+    # IDs des vidéos dans leur nouvel ordre
+    video_ids: List[int]
+    # Nombre de vidéos dont l'ordre a changé
+    updated: int
+
 # ==============================================================================
 # Schéma de mise à jour d'une vidéo
 # Chaque champ est optionnel pour permettre une mise à jour partielle
@@ -80,11 +222,51 @@ class ProgressResponse(BaseModel):
     mentee_email: str
     # Temps ou nombre de secondes regardées (ou autre métrique de suivi)
     watched: int
+    # Position de reprise et position maximale atteinte (secondes), fin de lecture (POST /progress/heartbeat)
+    last_position: int = 0
+    max_position: int = 0
+    completed: bool = False
+    # Date de la dernière modification
+    updated_at: Optional[datetime] = None
 
     class Config:
         # Active le mode ORM pour faciliter la conversion des objets SQLAlchemy
         orm_mode = True
 
+# ==============================================================================
+# Schéma de réponse d'une progression mise en tampon (écriture différée)
+# ==============================================================================
+class ProgressQueued(BaseModel):
+    video_id: int
+    mentee_email: str
+    # Nombre d'incréments en attente d'écriture pour ce couple (vidéo, mentee)
+    pending: int
+
+# ==============================================================================
+# Battements de lecture groupés (POST /progress/heartbeat)
+# Le lecteur envoie périodiquement, en un seul appel, la position de lecture
+# de chaque vidéo en cours ; les échantillons sont fusionnés côté serveur.
+# ==============================================================================
+class HeartbeatSample(BaseModel):
+    video_id: int
+    # Position de lecture (secondes, 24 h au plus)
+    position: float = Field(..., ge=0, le=86400)
+    # Durée de la vidéo (secondes, 24 h au plus), connue du lecteur : permet de détecter la fin de lecture
+    duration: Optional[float] = Field(None, gt=0, le=86400)
+    # Fin de lecture signalée par le lecteur
+    completed: bool = False
+
+class HeartbeatBatch(BaseModel):
+    mentee_email: str
+    # Échantillons dans l'ordre où ils ont été relevés (le dernier d'une vidéo donne sa position de reprise)
+    samples: List[HeartbeatSample] = Field(..., min_items=1, max_items=500)
+
+class HeartbeatResult(BaseModel):
+    # Nombre de progressions (une par vidéo) mises à jour
+    updated: int
+    # Vidéos inexistantes, dont les échantillons ont été ignorés
+    unknown_video_ids: List[int] = []
+
 # ==============================================================================
 # Schéma de création d'une review (avis)
 # ==============================================================================
@@ -108,6 +290,18 @@ class ReviewResponse(BaseModel):
     class Config:
         orm_mode = True
 
+# ==============================================================================
+# Schéma du résumé des notes d'une vidéo
+# ==============================================================================
+class RatingSummary(BaseModel):
+    video_id: int
+    # Nombre total d'avis
+    review_count: int
+    # Note moyenne arrondie à 2 décimales
+    average: float
+    # Nombre d'avis par note ("1" à "5")
+    histogram: Dict[str, int]
+
 # ==============================================================================
 # Schéma de création d'un utilisateur
 # ==============================================================================
@@ -149,5 +343,72 @@ class UserResponse(BaseModel):
     class Config:
         orm_mode = True
 
+# ==============================================================================
+# Import en masse d'utilisateurs et de progressions (POST /users/import, /progress/import)
+# ==============================================================================
+class ProgressImport(BaseModel):
+    # Ligne d'historique de progression
+    video_id: int
+    mentee_email: str
+    watched: int = Field(..., ge=0)
+
+class ImportRowError(BaseModel):
+    # Numéro de la ligne dans le fichier (en-tête CSV compris)
+    line: int
+    # Raison du refus
+    detail: str
+
+class ImportResult(BaseModel):
+    # Nombre de lignes du fichier importées
+    imported: int = 0
+    # Lignes refusées, avec la raison (au plus IMPORT_MAX_ERRORS, les premières du fichier)
+    errors: List[ImportRowError] = []
+    # Nombre total de lignes refusées
+    error_count: int = 0
+
+# ==============================================================================
+# Tableau de bord d'un mentee (GET /users/{email}/progress)
+# ==============================================================================
+class WatchedVideo(BaseModel):
+    video_id: int
+    title: Optional[str] = None
+    category: str
+    order: Optional[int] = None
+    # Nombre de visionnages enregistrés par le mentee
+    watched: int
+    # Position de reprise et position maximale atteinte (secondes)
+    last_position: int = 0
+    max_position: int = 0
+    # Vidéo regardée jusqu'au bout
+    completed: bool = False
+    # Note laissée par le mentee (None s'il n'a pas laissé d'avis)
+    review_stars: Optional[int] = None
+
+class CategoryProgress(BaseModel):
+    category: str
+    # Nombre de vidéos de la catégorie
+    total_videos: int
+    # Nombre de vidéos regardées au moins une fois par le mentee
+    watched_videos: int
+    # Nombre de vidéos regardées jusqu'au bout
+    completed_videos: int = 0
+    # Nombre de vidéos notées par le mentee
+    reviewed_videos: int
+    # Part des vidéos regardées (entre 0 et 1)
+    completion: float
+
+class MenteeDashboard(BaseModel):
+    mentee_email: str
+    total_videos: int
+    watched_videos: int
+    completed_videos: int = 0
+    reviewed_videos: int
+    # Avancement par catégorie, triées par nom
+    categories: List[CategoryProgress] = []
+    # Vidéos regardées, dans l'ordre du catalogue (category, order)
+    videos: List[WatchedVideo] = []
+
 # Mise à jour des références en avant pour résoudre "ProgressResponse" et "ReviewResponse"
 VideoResponse.update_forward_refs()
+ProgressPage.update_forward_refs()
+ReviewPage.update_forward_refs()
@@ -0,0 +1,283 @@
+"""
+Rafraîchissement en tâche de fond des statistiques (vues, likes) des vidéos.
+
+Les vues et likes sont copiés depuis YouTube à la création de la vidéo ; cette
+tâche les remet à jour sans appel à l'API pendant les requêtes utilisateur :
+- les vidéos récemment regardées (POST /progress/) passent en priorité ;
+- ensuite, la table videos est parcourue par ID croissant, par paquets de 50
+  (un seul appel à l'API par paquet), en reprenant là où la passe précédente
+  s'est arrêtée (curseur persistant dans la table job_cursors) ;
+- seules les lignes dont les valeurs ont changé sont mises à jour, en lot ;
+- le nombre d'appels est borné par passe et par jour (quota YouTube) ; le
+  compteur du jour est conservé avec le curseur, partagé entre les workers
+  et les exécutions de manage.py.
+
+La tâche tourne dans un thread démarré par le lifespan FastAPI si
+STATS_REFRESH_ENABLED est activé, ou ponctuellement via
+`python manage.py refresh-stats` (ex : tâche cron).
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from config import get_settings
+from database import SessionLocal
+from models import JobCursor, Video
+from response_cache import invalidate_videos
+from youtube_api import MAX_IDS_PER_REQUEST, fetch_youtube_videos_statistics
+
+logger = logging.getLogger(__name__)
+
+# Nom de la tâche dans la table job_cursors
+CURSOR_NAME = "video_stats_refresh"
+
+
+class RecentViews:
+    """
+    Ensemble borné des IDs de vidéos récemment regardées, du plus ancien au plus récent.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, video_id: int):
+        with self._lock:
+            self._ids[video_id] = None
+            self._ids.move_to_end(video_id)
+            if len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def take(self, limit: int) -> list:
+        """Retire et renvoie jusqu'à `limit` IDs, les plus récents d'abord."""
+        with self._lock:
+            taken = []
+            while self._ids and len(taken) < limit:
+                taken.append(self._ids.popitem(last=True)[0])
+            return taken
+
+    def requeue(self, video_ids: list):
+        """Remet des IDs retirés par take() et non traités (échec de l'appel à l'API, quota épuisé)."""
+        for video_id in reversed(video_ids):
+            self.mark(video_id)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# Vidéos regardées depuis la dernière passe (alimenté par crud.track_progress)
+recent_views = RecentViews()
+
+
+class StatsRefresher:
+    """
+    Met à jour les vues et likes des vidéos à partir de l'API YouTube.
+
+    Les budgets non fournis sont lus dans la configuration (get_settings).
+
+    Args:
+        session_factory: Fabrique de sessions SQLAlchemy.
+        max_calls_per_run (int): Nombre maximal d'appels à l'API par passe.
+        daily_quota (int): Nombre maximal d'appels à l'API par jour.
+        fetch (callable): Fonction {IDs} -> {ID: {"views", "likes"}} (modifiable pour les tests).
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_calls_per_run: int = None,
+        daily_quota: int = None,
+        fetch=fetch_youtube_videos_statistics,
+    ):
+        settings = get_settings()
+        self.session_factory = session_factory
+        self.max_calls_per_run = settings.STATS_REFRESH_MAX_CALLS_PER_RUN if max_calls_per_run is None else max_calls_per_run
+        self.daily_quota = settings.STATS_REFRESH_DAILY_QUOTA if daily_quota is None else daily_quota
+        self.fetch = fetch
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # --------------------------------------------------------------------------
+    # Passe de rafraîchissement
+    # --------------------------------------------------------------------------
+    def _ensure_cursor(self, db):
+        if db.get(JobCursor, CURSOR_NAME) is None:
+            try:
+                db.add(JobCursor(name=CURSOR_NAME, position=0, quota_used=0))
+                db.commit()
+            except IntegrityError:
+                # Créé au même moment par un autre worker
+                db.rollback()
+
+    def _reserve_call(self, db) -> bool:
+        """
+        Réserve un appel sur le quota du jour, par une mise à jour conditionnelle
+        du compteur de job_cursors, validée aussitôt : deux workers (ou un worker
+        et manage.py) ne peuvent pas dépasser ensemble le quota.
+
+        Returns:
+            False si le quota du jour est épuisé.
+        """
+        if self.daily_quota <= 0:
+            return False
+        today = date.today()
+        new_day = or_(JobCursor.quota_day.is_(None), JobCursor.quota_day != today)
+        reserved = db.execute(
+            update(JobCursor)
+            .where(JobCursor.name == CURSOR_NAME, or_(new_day, JobCursor.quota_used < self.daily_quota))
+            .values(quota_day=today, quota_used=case((new_day, 1), else_=JobCursor.quota_used + 1))
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.commit()
+        return reserved
+
+    def _refresh_rows(self, db, rows) -> list:
+        """
+        Récupère les statistiques d'au plus 50 vidéos et met à jour celles qui ont changé.
+
+        Returns:
+            Les changements appliqués ({"id", "views", "likes"}).
+        """
+        stats = self.fetch([row.youtube_url for row in rows])
+        changes = []
+        for row in rows:
+            fresh = stats.get(row.youtube_url)
+            if fresh and (fresh["views"] != row.views or fresh["likes"] != row.likes):
+                changes.append({"id": row.id, "views": fresh["views"], "likes": fresh["likes"]})
+        if changes:
+            db.execute(update(Video), changes)
+        return changes
+
+    def _committed(self, summary: dict, changes: list):
+        summary["updated"] += len(changes)
+        if changes:
+            invalidate_videos(*[change["id"] for change in changes])
+
+    def run_once(self, max_calls: int = None) -> dict:
+        """
+        Effectue une passe de rafraîchissement dans la limite du budget d'appels.
+
+        Returns:
+            Résumé de la passe : appels effectués, vidéos vérifiées et mises à jour, position du curseur.
+        """
+        if max_calls is None:
+            max_calls = self.max_calls_per_run
+        summary = {"calls": 0, "checked": 0, "updated": 0, "cursor": None}
+        columns = (Video.id, Video.youtube_url, Video.views, Video.likes)
+        db = self.session_factory()
+        try:
+            self._ensure_cursor(db)
+            quota_left = True
+
+            # 1. Vidéos récemment regardées ; celles qui n'ont pas pu être
+            # vérifiées (erreur de l'API, quota épuisé) sont remises en file
+            priority = recent_views.take(max_calls * MAX_IDS_PER_REQUEST // 2)
+            done = 0
+            try:
+                while done < len(priority) and summary["calls"] < max_calls:
+                    batch = priority[done:done + MAX_IDS_PER_REQUEST]
+                    rows = db.query(*columns).filter(Video.id.in_(batch)).all()
+                    if rows:
+                        quota_left = self._reserve_call(db)
+                        if not quota_left:
+                            break
+                        changes = self._refresh_rows(db, rows)
+                        summary["calls"] += 1
+                        summary["checked"] += len(rows)
+                        db.commit()
+                        self._committed(summary, changes)
+                    done += len(batch)
+            finally:
+                recent_views.requeue(priority[done:])
+
+            # 2. Parcours de la table par ID croissant, à partir du curseur
+            cursor = db.get(JobCursor, CURSOR_NAME)
+            wrapped = False
+            while quota_left and summary["calls"] < max_calls:
+                rows = (
+                    db.query(*columns)
+                    .filter(Video.id > cursor.position)
+                    .order_by(Video.id)
+                    .limit(MAX_IDS_PER_REQUEST)
+                    .all()
+                )
+                if not rows:
+                    # Fin de la table : on repart du début (une seule fois par passe)
+                    if wrapped or cursor.position == 0:
+                        break
+                    cursor.position = 0
+                    wrapped = True
+                    continue
+                quota_left = self._reserve_call(db)
+                if not quota_left:
+                    break
+                changes = self._refresh_rows(db, rows)
+                summary["calls"] += 1
+                summary["checked"] += len(rows)
+                cursor.position = rows[-1].id
+                # Le curseur est validé avec les mises à jour du paquet
+                db.commit()
+                self._committed(summary, changes)
+            summary["cursor"] = cursor.position
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return summary
+
+    # --------------------------------------------------------------------------
+    # Exécution périodique
+    # --------------------------------------------------------------------------
+    def start(self, interval_seconds: float = None):
+        """Démarre les passes périodiques dans un thread de fond."""
+        if interval_seconds is None:
+            interval_seconds = get_settings().STATS_REFRESH_INTERVAL_SECONDS
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval_seconds,), name="stats-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de fond après la passe en cours."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval_seconds: float):
+        while not self._stopped.wait(interval_seconds):
+            try:
+                summary = self.run_once()
+                logger.info("Rafraîchissement des statistiques : %s", summary)
+            except Exception:
+                logger.exception("Échec du rafraîchissement des statistiques des vidéos")
+
+
+# ==============================================================================
+# Instance globale, créée au démarrage de l'application si la tâche est activée
+# ==============================================================================
+_refresher = None
+
+
+def start_stats_refresher():
+    """Crée et démarre la tâche de fond si STATS_REFRESH_ENABLED est activé."""
+    global _refresher
+    if get_settings().STATS_REFRESH_ENABLED and _refresher is None:
+        _refresher = StatsRefresher()
+        _refresher.start()
+    return _refresher
+
+
+def stop_stats_refresher():
+    """Arrête la tâche de fond si elle a été démarrée."""
+    global _refresher
+    if _refresher is not None:
+        refresher, _refresher = _refresher, None
+        refresher.stop()
@@ -1,6 +1,37 @@
+import time
+
 import requests
-from config import YOUTUBE_API_KEY
+from config import get_settings
+from metrics import YOUTUBE_LATENCY, YOUTUBE_REQUESTS
+from youtube_cache import get_youtube_cache
 from urllib.parse import urlparse, parse_qs
+from requests.adapters import HTTPAdapter
+
+# Endpoint "videos" de l'API YouTube Data v3
+YOUTUBE_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+# Nombre maximal d'IDs acceptés par l'API en une seule requête
+MAX_IDS_PER_REQUEST = 50
+
+# Session HTTP partagée, créée au premier appel : réutilise les connexions (keep-alive)
+_session = None
+
+
+def get_session() -> requests.Session:
+    """Renvoie la session HTTP partagée, en la créant au besoin."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+        _session = session
+    return _session
+
+
+def close_session():
+    """Ferme la session HTTP partagée si elle a été créée."""
+    global _session
+    if _session is not None:
+        session, _session = _session, None
+        session.close()
 
 
 def extract_video_id(youtube_url: str) -> str:
@@ -25,12 +56,105 @@ def extract_video_id(youtube_url: str) -> str:
         raise ValueError(f"Erreur lors de l'extraction de l'ID de la vidéo : {e}")
 
 
+def parse_video_item(item: dict) -> dict:
+    """
+    Convertit un élément "items" de la réponse de l'API YouTube en données de vidéo.
+    """
+    snippet = item.get("snippet", {})
+    stats = item.get("statistics", {})
+
+    return {
+        "video_id": item["id"],
+        "title": snippet.get("title", "Titre inconnu"),
+        "description": snippet.get("description", "Pas de description"),
+        "publication_date": snippet.get("publishedAt", ""),
+        "views": int(stats.get("viewCount", 0)),
+        "likes": int(stats.get("likeCount", 0))
+    }
+
+
+def _request_videos(video_ids: list, part: str = "snippet,statistics", parse=None) -> dict:
+    """
+    Appelle l'endpoint "videos" de l'API YouTube pour au plus MAX_IDS_PER_REQUEST IDs.
+
+    Args:
+        part (str): Parties de la ressource demandées à l'API.
+        parse (callable, optionnel): Conversion d'un élément "items" (parse_video_item par défaut).
+
+    Returns:
+        Dictionnaire {ID: données} des vidéos trouvées.
+
+    Raises:
+        ConnectionError: En cas d'échec de la requête HTTP.
+        ValueError: Si l'API renvoie une erreur.
+    """
+    params = {"part": part, "id": ",".join(video_ids), "key": get_settings().YOUTUBE_API_KEY}
+    start = time.perf_counter()
+    try:
+        response = get_session().get(YOUTUBE_VIDEOS_URL, params=params, timeout=5)  # Timeout pour éviter un blocage infini
+        response.raise_for_status()  # Vérifie si la requête a échoué
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        YOUTUBE_REQUESTS.inc(("sync", "error"))
+        raise ConnectionError(f"Erreur lors de la requête API YouTube : {e}")
+    finally:
+        YOUTUBE_LATENCY.observe(time.perf_counter() - start, ("sync",))
+
+    # Une réponse 200 peut aussi porter une erreur de l'API
+    if "error" in data:
+        YOUTUBE_REQUESTS.inc(("sync", "error"))
+        raise ValueError(f"Erreur API YouTube : {data['error']}")
+    YOUTUBE_REQUESTS.inc(("sync", "ok"))
+
+    parse = parse or parse_video_item
+    return {item["id"]: parse(item) for item in data.get("items", [])}
+
+
+def parse_video_statistics(item: dict) -> dict:
+    """
+    Extrait les statistiques (vues, likes) d'un élément "items" de la réponse de l'API YouTube.
+    """
+    stats = item.get("statistics", {})
+    return {"views": int(stats.get("viewCount", 0)), "likes": int(stats.get("likeCount", 0))}
+
+
+def fetch_youtube_videos_statistics(video_ids: list) -> dict:
+    """
+    Récupère uniquement les statistiques d'au plus MAX_IDS_PER_REQUEST vidéos, sans passer par le cache.
+
+    Returns:
+        Dictionnaire {ID: {"views", "likes"}} des vidéos trouvées.
+
+    Raises:
+        ConnectionError: En cas d'échec de la requête HTTP.
+        ValueError: Si l'API renvoie une erreur.
+    """
+    return _request_videos(video_ids, part="statistics", parse=parse_video_statistics)
+
+
+def fetch_youtube_video_data(video_id: str):
+    """
+    Interroge l'API YouTube pour un ID de vidéo, sans passer par le cache.
+
+    Returns:
+        Les données de la vidéo, ou None si l'API ne connaît pas cet ID.
+
+    Raises:
+        ConnectionError: En cas d'échec de la requête HTTP.
+        ValueError: Si l'API renvoie une erreur.
+    """
+    return _request_videos([video_id]).get(video_id)
+
+
 def get_youtube_video_data(video_input: str) -> dict:
     """
     Récupère les informations d'une vidéo YouTube en utilisant son URL ou directement son ID.
 
     Si l'entrée est une URL, l'ID sera extrait automatiquement.
     Sinon, on considère que l'entrée est directement un ID.
+
+    Les résultats sont mis en cache par ID (voir youtube_cache), y compris
+    les vidéos introuvables ; les erreurs réseau ne sont jamais mises en cache.
     """
     try:
         # Vérification si l'entrée ressemble à une URL YouTube
@@ -42,34 +166,20 @@ def get_youtube_video_data(video_input: str) -> dict:
         if not video_id:
             raise ValueError("Impossible d'extraire un ID de vidéo valide.")
 
-        # Construction de l'URL pour appeler l'API YouTube
-        url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet,statistics&id={video_id}&key={YOUTUBE_API_KEY}"
+        youtube_cache = get_youtube_cache()
+        found, cached = youtube_cache.get(video_id)
+        if found:
+            if cached is None:
+                raise ValueError(f"Aucune vidéo trouvée pour l'ID {video_id} (cache)")
+            return cached
 
-        try:
-            response = requests.get(url, timeout=5)  # Timeout pour éviter un blocage infini
-            response.raise_for_status()  # Vérifie si la requête a échoué
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError(f"Erreur lors de la requête API YouTube : {e}")
-
-        if "error" in data:
-            raise ValueError(f"Erreur API YouTube : {data['error']}")
-
-        if "items" not in data or not data["items"]:
+        video_data = fetch_youtube_video_data(video_id)
+        if video_data is None:
+            youtube_cache.set_not_found(video_id)
             raise ValueError(f"Aucune vidéo trouvée pour l'ID {video_id}")
 
-        video_data = data["items"][0]
-        snippet = video_data.get("snippet", {})
-        stats = video_data.get("statistics", {})
-
-        return {
-            "video_id": video_id,
-            "title": snippet.get("title", "Titre inconnu"),
-            "description": snippet.get("description", "Pas de description"),
-            "publication_date": snippet.get("publishedAt", ""),
-            "views": int(stats.get("viewCount", 0)),
-            "likes": int(stats.get("likeCount", 0))
-        }
+        youtube_cache.set(video_id, video_data)
+        return video_data
 
     except ValueError as ve:
         print(f"Erreur de validation : {ve}")
@@ -81,11 +191,57 @@ def get_youtube_video_data(video_input: str) -> dict:
     return None  # Retourne None en cas d'erreur
 
 
-# Exemple d'utilisation
-url_video = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
-video_info = get_youtube_video_data(url_video)
+def get_youtube_videos_data(video_ids: list):
+    """
+    Récupère les informations de plusieurs vidéos YouTube en un minimum d'appels.
+
+    L'API accepte jusqu'à 50 IDs par requête : les IDs absents du cache sont
+    regroupés par paquets de MAX_IDS_PER_REQUEST, via la session HTTP partagée.
+    Une erreur sur un paquet n'affecte que les IDs de ce paquet.
 
-if video_info:
-    print(video_info)
-else:
-    print("Impossible de récupérer les données de la vidéo.")
+    Args:
+        video_ids (list): IDs de vidéos YouTube (les doublons sont ignorés).
+
+    Returns:
+        Tuple (résultats, erreurs) : {ID: données} et {ID: message d'erreur}.
+    """
+    youtube_cache = get_youtube_cache()
+    results, errors = {}, {}
+    to_fetch = []
+    for video_id in dict.fromkeys(video_ids):
+        found, cached = youtube_cache.get(video_id)
+        if not found:
+            to_fetch.append(video_id)
+        elif cached is None:
+            errors[video_id] = f"Aucune vidéo trouvée pour l'ID {video_id}"
+        else:
+            results[video_id] = cached
+
+    for i in range(0, len(to_fetch), MAX_IDS_PER_REQUEST):
+        chunk = to_fetch[i:i + MAX_IDS_PER_REQUEST]
+        try:
+            videos = _request_videos(chunk)
+        except (ConnectionError, ValueError) as e:
+            for video_id in chunk:
+                errors[video_id] = str(e)
+            continue
+        for video_id in chunk:
+            if video_id in videos:
+                youtube_cache.set(video_id, videos[video_id])
+                results[video_id] = videos[video_id]
+            else:
+                youtube_cache.set_not_found(video_id)
+                errors[video_id] = f"Aucune vidéo trouvée pour l'ID {video_id}"
+
+    return results, errors
+
+
+# Exemple d'utilisation : python youtube_api.py
+if __name__ == "__main__":
+    url_video = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    video_info = get_youtube_video_data(url_video)
+
+    if video_info:
+        print(video_info)
+    else:
+        print("Impossible de récupérer les données de la vidéo.")
@@ -0,0 +1,213 @@
+"""
+Client asynchrone de l'API YouTube.
+
+Contrairement à youtube_api (requests, bloquant), ce client n'occupe pas de
+thread pendant l'attente réseau : un endpoint `async def` peut donc attendre
+YouTube sans consommer un worker du threadpool de Starlette.
+
+- connexions HTTP réutilisées (pool + keep-alive) via httpx.AsyncClient ;
+- nombre de requêtes simultanées borné par un sémaphore ;
+- nouvelles tentatives avec attente exponentielle sur 429, 5xx et erreurs réseau ;
+- même cache que le client synchrone (youtube_cache).
+
+L'URL de base est configurable, ce qui permet de le tester contre un serveur HTTP local.
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+
+from config import get_settings
+from metrics import YOUTUBE_LATENCY, YOUTUBE_REQUESTS
+from youtube_api import MAX_IDS_PER_REQUEST, YOUTUBE_VIDEOS_URL, parse_video_item
+from youtube_cache import get_youtube_cache
+
+# Codes HTTP pour lesquels une nouvelle tentative a un sens
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncYouTubeClient:
+    """
+    Client asynchrone de l'endpoint "videos" de l'API YouTube.
+
+    Les paramètres non fournis sont lus dans la configuration (get_settings).
+
+    Args:
+        api_key (str): Clé API YouTube.
+        base_url (str): URL de l'endpoint "videos" (modifiable pour les tests).
+        max_concurrency (int): Nombre maximal de requêtes simultanées.
+        max_retries (int): Nombre de nouvelles tentatives après un échec temporaire.
+        backoff (float): Délai de base (secondes) de l'attente exponentielle.
+        timeout (float): Délai maximal (secondes) d'une requête.
+        cache: Cache des métadonnées (cache global par défaut, False pour le désactiver).
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = YOUTUBE_VIDEOS_URL,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        backoff: float = None,
+        timeout: float = 5.0,
+        cache=None,
+    ):
+        settings = get_settings()
+        max_concurrency = max_concurrency or settings.YOUTUBE_MAX_CONCURRENCY
+        self._api_key = api_key
+        self.base_url = base_url
+        self.max_retries = settings.YOUTUBE_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.YOUTUBE_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+        self.cache = get_youtube_cache() if cache is None else cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    @property
+    def api_key(self) -> str:
+        # Résolue à la première requête : la clé n'est pas exigée pour créer le client
+        return self._api_key or get_settings().YOUTUBE_API_KEY
+
+    async def aclose(self):
+        """Ferme les connexions du pool."""
+        await self._client.aclose()
+
+    async def _request_videos(self, video_ids: list) -> dict:
+        """
+        Appelle l'endpoint "videos" pour au plus MAX_IDS_PER_REQUEST IDs, avec nouvelles tentatives.
+
+        Returns:
+            Dictionnaire {ID: données} des vidéos trouvées.
+
+        Raises:
+            ConnectionError: Si la requête échoue après toutes les tentatives.
+            ValueError: Si l'API renvoie une erreur non temporaire.
+        """
+        params = {"part": "snippet,statistics", "id": ",".join(video_ids), "key": self.api_key}
+        attempt = 0
+        while True:
+            delay = self.backoff * (2 ** attempt)
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await self._client.get(self.base_url, params=params)
+                    finally:
+                        YOUTUBE_LATENCY.observe(time.perf_counter() - start, ("async",))
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    break
+                # Respecte l'en-tête Retry-After s'il est fourni (en secondes)
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                error = f"réponse HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                YOUTUBE_REQUESTS.inc(("async", "error"))
+                raise ValueError(f"Erreur API YouTube : {e}")
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            YOUTUBE_REQUESTS.inc(("async", "retry" if attempt < self.max_retries else "error"))
+
+            if attempt >= self.max_retries:
+                raise ConnectionError(f"Erreur lors de la requête API YouTube : {error}")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            YOUTUBE_REQUESTS.inc(("async", "error"))
+            raise ValueError(f"Réponse invalide de l'API YouTube : {e}")
+        # Une réponse 200 peut aussi porter une erreur de l'API
+        if "error" in data:
+            YOUTUBE_REQUESTS.inc(("async", "error"))
+            raise ValueError(f"Erreur API YouTube : {data['error']}")
+        YOUTUBE_REQUESTS.inc(("async", "ok"))
+
+        videos = {}
+        for item in data.get("items", []):
+            video = parse_video_item(item)
+            videos[video["video_id"]] = video
+        return videos
+
+    async def get_videos_data(self, video_ids: list):
+        """
+        Récupère les informations de plusieurs vidéos, par paquets de 50 IDs envoyés en parallèle.
+
+        Returns:
+            Tuple (résultats, erreurs) : {ID: données} et {ID: message d'erreur}.
+        """
+        results, errors = {}, {}
+        to_fetch = []
+        for video_id in dict.fromkeys(video_ids):
+            found, cached = self.cache.get(video_id) if self.cache else (False, None)
+            if not found:
+                to_fetch.append(video_id)
+            elif cached is None:
+                errors[video_id] = f"Aucune vidéo trouvée pour l'ID {video_id}"
+            else:
+                results[video_id] = cached
+
+        chunks = [to_fetch[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(to_fetch), MAX_IDS_PER_REQUEST)]
+        responses = await asyncio.gather(*[self._request_videos(chunk) for chunk in chunks], return_exceptions=True)
+        for chunk, videos in zip(chunks, responses):
+            if isinstance(videos, Exception):
+                for video_id in chunk:
+                    errors[video_id] = str(videos)
+                continue
+            for video_id in chunk:
+                if video_id in videos:
+                    if self.cache:
+                        self.cache.set(video_id, videos[video_id])
+                    results[video_id] = videos[video_id]
+                else:
+                    if self.cache:
+                        self.cache.set_not_found(video_id)
+                    errors[video_id] = f"Aucune vidéo trouvée pour l'ID {video_id}"
+
+        return results, errors
+
+    async def get_video_data(self, video_id: str):
+        """
+        Récupère les informations d'une vidéo.
+
+        Returns:
+            Les données de la vidéo, ou None si elle est introuvable ou en cas d'erreur.
+        """
+        results, errors = await self.get_videos_data([video_id])
+        if video_id in errors:
+            logger.warning("Erreur YouTube : %s", errors[video_id])
+        return results.get(video_id)
+
+
+# ==============================================================================
+# Client global, créé au démarrage de l'application (lifespan FastAPI)
+# ==============================================================================
+_client = None
+
+
+def start_async_client() -> AsyncYouTubeClient:
+    """Crée le client global (appelé par le lifespan FastAPI)."""
+    return get_async_client()
+
+
+def get_async_client() -> AsyncYouTubeClient:
+    """Renvoie le client global, en le créant au besoin (scripts, tests)."""
+    global _client
+    if _client is None:
+        _client = AsyncYouTubeClient()
+    return _client
+
+
+async def close_async_client():
+    """Ferme le client global s'il a été créé."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
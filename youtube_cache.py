@@ -0,0 +1,246 @@
+"""
+Cache des métadonnées YouTube, indexé par ID de vidéo.
+
+Évite de rappeler l'API YouTube (latence réseau et quota) pour une vidéo déjà
+récupérée récemment. Les vidéos introuvables sont aussi mises en cache
+(cache négatif), avec une durée de vie plus courte.
+
+Deux stockages sont fournis :
+- MemoryCacheBackend : LRU en mémoire, borné en nombre d'entrées (par défaut) ;
+- SQLiteCacheBackend : fichier SQLite local, conservé entre deux redémarrages,
+  borné lui aussi en nombre d'entrées.
+Tout autre stockage peut être branché en implémentant CacheBackend.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import get_settings
+
+
+class CacheBackend:
+    """
+    Interface d'un stockage de cache. Les valeurs sont des objets sérialisables en JSON
+    (ou None pour une entrée négative).
+    """
+
+    def get(self, key: str):
+        """
+        Returns:
+            Tuple (trouvé, valeur). `trouvé` est False si la clé est absente ou expirée.
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Cache LRU en mémoire avec expiration : au-delà de max_entries, l'entrée la
+    moins récemment utilisée est évincée.
+
+    Args:
+        max_entries (int): Nombre maximal d'entrées.
+        on_evict (callable, optionnel): Appelée avec la clé de chaque entrée évincée
+            ou expirée (pas pour delete() ni clear()), hors du verrou du cache.
+    """
+
+    def __init__(self, max_entries: int = 1024, on_evict=None):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            expired = expires_at <= time.monotonic()
+            if expired:
+                del self._entries[key]
+            else:
+                self._entries.move_to_end(key)
+        if expired:
+            if self.on_evict is not None:
+                self.on_evict(key)
+            return False, None
+        return True, value
+
+    def set(self, key: str, value, ttl: float):
+        evicted = []
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        if self.on_evict is not None:
+            for evicted_key in evicted:
+                self.on_evict(evicted_key)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache persistant dans un fichier SQLite local. Les entrées expirées sont
+    ignorées à la lecture et purgées à l'écriture ; au-delà de max_entries,
+    les entrées les plus proches de leur expiration sont évincées.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS youtube_cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+            )
+            # Purge des entrées expirées et éviction sans parcourir toute la table
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_youtube_cache_expires_at ON youtube_cache (expires_at)"
+            )
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM youtube_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM youtube_cache WHERE expires_at <= ?", (now,))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO youtube_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+            excess = self._connection.execute("SELECT COUNT(*) FROM youtube_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._connection.execute(
+                    "DELETE FROM youtube_cache WHERE key IN "
+                    "(SELECT key FROM youtube_cache WHERE key != ? ORDER BY expires_at LIMIT ?)",
+                    (key, excess),
+                )
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM youtube_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM youtube_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM youtube_cache").fetchone()[0]
+
+
+class YouTubeCache:
+    """
+    Cache des métadonnées YouTube avec compteurs de succès/échecs.
+
+    Args:
+        backend (CacheBackend): Stockage utilisé.
+        ttl (float): Durée de vie (secondes) d'une vidéo trouvée.
+        negative_ttl (float): Durée de vie (secondes) d'une vidéo introuvable.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 86400, negative_ttl: float = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, video_id: str):
+        """
+        Returns:
+            Tuple (trouvé, données). Les données valent None pour une vidéo connue comme introuvable.
+        """
+        found, value = self.backend.get(video_id)
+        if not found:
+            self.misses += 1
+        elif value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return found, value
+
+    def set(self, video_id: str, data: dict):
+        self.backend.set(video_id, data, self.ttl)
+
+    def set_not_found(self, video_id: str):
+        self.backend.set(video_id, None, self.negative_ttl)
+
+    def invalidate(self, video_id: str):
+        self.backend.delete(video_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+        }
+
+
+def build_cache_backend(kind: str = None) -> CacheBackend:
+    """Crée le stockage de cache configuré ("memory" ou "sqlite")."""
+    settings = get_settings()
+    kind = kind or settings.YOUTUBE_CACHE_BACKEND
+    if kind == "sqlite":
+        return SQLiteCacheBackend(settings.YOUTUBE_CACHE_PATH, settings.YOUTUBE_CACHE_MAX_ENTRIES)
+    if kind == "memory":
+        return MemoryCacheBackend(settings.YOUTUBE_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Stockage de cache YouTube inconnu : {kind}")
+
+
+# Cache global utilisé par youtube_api, créé à la première utilisation
+_youtube_cache = None
+_youtube_cache_lock = threading.Lock()
+
+
+def get_youtube_cache() -> YouTubeCache:
+    """Renvoie le cache global des métadonnées YouTube, en le créant au besoin."""
+    global _youtube_cache
+    if _youtube_cache is None:
+        with _youtube_cache_lock:
+            if _youtube_cache is None:
+                settings = get_settings()
+                _youtube_cache = YouTubeCache(
+                    build_cache_backend(),
+                    ttl=settings.YOUTUBE_CACHE_TTL_SECONDS,
+                    negative_ttl=settings.YOUTUBE_CACHE_NEGATIVE_TTL_SECONDS,
+                )
+    return _youtube_cache